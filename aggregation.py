@@ -0,0 +1,193 @@
+# AGGREGATION.py
+
+import re
+from expression import to_numeric
+
+# An aggregate in a select list or HAVING clause, e.g. "AVG(monthly_state_population) AS average"
+AGGREGATE_PATTERN = re.compile(r"(\w+)\(\s*(\*|[\w.]+)\s*\)(?:\s+AS\s+(\w+))?", re.IGNORECASE)
+
+AGGREGATE_FUNCTIONS = {'COUNT', 'SUM', 'AVG', 'MIN', 'MAX'}
+
+# Accumulator slots per aggregate: SUM and AVG keep (total, count), the others a single value
+INITIAL_STATES = {'COUNT': [0], 'SUM': [0, 0], 'AVG': [0, 0], 'MIN': [None], 'MAX': [None]}
+
+
+def numeric(value):
+    """Return value as an int or float, or None if it is not numeric."""
+    value = to_numeric(value)
+    return value if isinstance(value, (int, float)) else None
+
+
+class Aggregate:
+    """One aggregate function applied to a column, with the output names it is stored under."""
+
+    def __init__(self, function, column, alias=None):
+        self.function = function.upper()
+        self.column = column
+        self.alias = alias
+        self.key = f"{self.function}({column})"  # How HAVING and ORDER BY refer to it
+
+    @classmethod
+    def parse(cls, text):
+        """
+        Parse a select-list item such as "COUNT(*)" or "AVG(col) AS avg_col".
+
+        Returns:
+            Aggregate or None: The aggregate, or None if the item is not an aggregate function.
+        """
+        match = AGGREGATE_PATTERN.match(text.strip())
+        if not match or match.group(1).upper() not in AGGREGATE_FUNCTIONS:
+            return None
+        function, column, alias = match.groups()
+        return cls(function, column, alias)
+
+    def output_names(self):
+        return (self.key, self.alias) if self.alias else (self.key,)
+
+
+def parse_aggregates(columns, having=None):
+    """
+    Collect the distinct aggregates a query needs from its select list and HAVING clause.
+
+    Several aggregates over the same column (e.g. MIN(x), MAX(x)) are all kept.
+
+    Args:
+        columns (list of str): The select-list items.
+        having (iterable of str): The columns the parsed HAVING condition refers to;
+            aggregate keys among them, such as COUNT(*), are computed too.
+
+    Returns:
+        list of Aggregate: The aggregates, in order of first appearance.
+    """
+    texts = list(columns)
+    if having:
+        texts += sorted(having)
+    aggregates = []
+    seen = set()
+    for text in texts:
+        aggregate = Aggregate.parse(text)
+        if aggregate is None or (aggregate.key, aggregate.alias) in seen:
+            continue
+        seen.add((aggregate.key, aggregate.alias))
+        aggregates.append(aggregate)
+    return aggregates
+
+
+class HashAggregation:
+    """
+    Streaming hash aggregation: rows are folded into per-group accumulators in one
+    pass, so memory grows with the number of groups rather than the number of rows.
+
+    Each group holds one flat list of accumulator slots; the update loop is
+    specialized per function instead of dispatching to an object per aggregate.
+    """
+
+    def __init__(self, group_columns, aggregates):
+        self.group_columns = list(group_columns)
+        self.aggregates = list(aggregates)
+        self.groups = {}  # group key -> flat list of accumulator slots
+        self.initial = []
+        self.plan = []  # (function, column, first slot) per aggregate
+        for aggregate in self.aggregates:
+            self.plan.append((aggregate.function, aggregate.column, len(self.initial)))
+            self.initial.extend(INITIAL_STATES[aggregate.function])
+
+    def consume(self, rows):
+        """Fold an iterable of rows into the groups."""
+        groups = self.groups
+        initial = self.initial
+        plan = self.plan
+        group_columns = self.group_columns
+        single = group_columns[0] if len(group_columns) == 1 else None
+
+        for row in rows:
+            if single is not None:
+                key = row.get(single)
+            else:
+                key = tuple([row.get(column) for column in group_columns])
+            state = groups.get(key)
+            if state is None:
+                state = groups[key] = initial.copy()
+
+            for function, column, slot in plan:
+                if column == '*':
+                    state[slot] += 1  # COUNT(*) counts rows, NULLs included
+                    continue
+                value = row.get(column)
+                if value is None:
+                    continue
+                if function == 'COUNT':
+                    state[slot] += 1
+                elif function == 'SUM' or function == 'AVG':
+                    if type(value) is not int and type(value) is not float:
+                        value = numeric(value)
+                        if value is None:
+                            continue  # Non-numeric text does not contribute
+                    state[slot] += value
+                    state[slot + 1] += 1
+                elif function == 'MIN':
+                    current = state[slot]
+                    if current is None or value < current:
+                        state[slot] = value
+                else:
+                    current = state[slot]
+                    if current is None or value > current:
+                        state[slot] = value
+        return self
+
+    def add(self, row):
+        self.consume((row,))
+
+    def merge(self, groups):
+        """
+        Fold in the groups of another aggregation over the same columns and aggregates,
+        e.g. a partial result computed by a worker over one chunk of a table. Counts,
+        sums and AVG's (total, count) pairs add up; MIN and MAX keep the extreme value.
+        Groups new to this aggregation keep their order of first appearance.
+        """
+        for key, state in groups.items():
+            current = self.groups.get(key)
+            if current is None:
+                self.groups[key] = state
+                continue
+            for function, _, slot in self.plan:
+                if function == 'MIN' or function == 'MAX':
+                    value = state[slot]
+                    if value is not None and (current[slot] is None or
+                                              (value < current[slot] if function == 'MIN' else value > current[slot])):
+                        current[slot] = value
+                else:
+                    current[slot] += state[slot]
+                    if function != 'COUNT':
+                        current[slot + 1] += state[slot + 1]
+        return self
+
+    def results(self):
+        """
+        Build one output row per group, in order of first appearance.
+
+        Without GROUP BY columns there is always exactly one row, even for empty input.
+
+        Returns:
+            list of dict: Group columns plus each aggregate under its FUNC(col) key and alias.
+        """
+        if not self.group_columns and not self.groups:
+            self.groups[()] = self.initial.copy()
+        single = len(self.group_columns) == 1
+        rows = []
+        for key, state in self.groups.items():
+            if single:
+                row = {self.group_columns[0]: key}
+            else:
+                row = dict(zip(self.group_columns, key))
+            for aggregate, (function, _, slot) in zip(self.aggregates, self.plan):
+                if function == 'SUM':
+                    value = state[slot] if state[slot + 1] else None
+                elif function == 'AVG':
+                    value = state[slot] / state[slot + 1] if state[slot + 1] else None
+                else:
+                    value = state[slot]
+                for name in aggregate.output_names():
+                    row[name] = value
+            rows.append(row)
+        return rows
@@ -0,0 +1,82 @@
+# CACHE.py
+
+import collections
+import threading
+
+
+class LRUCache:
+    """
+    A bounded mapping that evicts its least recently used entries when full.
+
+    Each entry has a size, given to put(); by default every entry counts 1, so the
+    capacity is a number of entries. The cache is shared by the server's query
+    threads, so every operation takes a lock. Lookups are counted for stats().
+    """
+
+    def __init__(self, capacity=256):
+        """
+        Args:
+            capacity (int): Most total size of the entries kept at once.
+        """
+        self.capacity = capacity
+        self.entries = collections.OrderedDict()  # Key -> (value, size), least recently used first
+        self.size = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key, default=None, valid=None):
+        """
+        Return the value cached under key, or default.
+
+        Args:
+            valid (callable): If given, a value for which valid(value) is false is
+                dropped and counted as a miss.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and valid is not None and not valid(entry[0]):
+                self.remove(key)
+                self.invalidations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size=1):
+        """Cache a value, evicting the least recently used entries to make room; one larger than the whole cache is not kept."""
+        with self.lock:
+            if key in self.entries:
+                self.remove(key)
+            if size > self.capacity:
+                return
+            self.entries[key] = (value, size)
+            self.size += size
+            while self.size > self.capacity:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def remove(self, key):
+        _, size = self.entries.pop(key)
+        self.size -= size
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Counts of hits, misses (invalidations among them) and entries, and the size and capacity.
+        """
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'invalidations': self.invalidations,
+                    'entries': len(self.entries), 'size': self.size, 'capacity': self.capacity}
@@ -0,0 +1,76 @@
+# client.py
+import argparse
+import socket
+import time
+from protocol import DEFAULT_HOST, DEFAULT_PORT, encode_message, receive_message
+
+
+class Client:
+    """A thin client for server.py: sends SQL text and returns (result, error) like handle_input."""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None, timeout=None):
+        if path:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(timeout)
+            self.sock.connect(path)
+        else:
+            self.sock = socket.create_connection((host, port), timeout=timeout)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def execute(self, sql, params=None):
+        """
+        Run one statement on the server.
+
+        Args:
+            sql (str): The statement; it may contain '?' placeholders.
+            params (list): Values for the placeholders, in order.
+
+        Returns:
+            tuple: (result, error), as returned by query_input_manager.handle_input.
+        """
+        request = {'sql': sql} if params is None else {'sql': sql, 'params': list(params)}
+        self.sock.sendall(encode_message(request))
+        response = receive_message(self.sock)
+        if response is None:
+            raise ConnectionError("Server closed the connection")
+        return response['result'], response['error']
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Connect to a MyDBMS server.")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--socket', help="Connect to this Unix socket path instead of TCP")
+    args = parser.parse_args()
+
+    with Client(args.host, args.port, args.socket) as client:
+        print("Connected to MyDBMS")
+        print("Type SQL commands or 'exit' to quit.")
+        while True:
+            user_input = input("dbms> ").strip()
+            if user_input.lower() == 'exit':
+                print("Exiting MyDBMS.")
+                break
+            if user_input.startswith("'") and user_input.endswith("'"):
+                user_input = user_input[1:-1]  # Remove single quotes around the command
+            start_time = time.time()
+            result, error = client.execute(user_input)
+            if error:
+                print("Error:", error)
+            elif result:
+                print("Query results:", result)
+            else:
+                print("No results returned.")
+            print("--- %s seconds ---" % (time.time() - start_time))
+
+if __name__ == "__main__":
+    main()
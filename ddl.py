@@ -1,15 +1,15 @@
 import os
 import csv
 import json
-from storage import StorageManager
+from storage import get_storage_manager
 import logging
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
 class DDLManager:
-    def __init__(self):
-        self.ddlstorage = StorageManager()
+    def __init__(self, storage_manager=None):
+        self.ddlstorage = storage_manager or get_storage_manager()
         
     def create_table(self, table_name, columns):
         tables = self.ddlstorage.schemas
@@ -38,9 +38,8 @@ class DDLManager:
                                 schema['primary_key'].append(col_name)
                         elif key == 'foreign_keys' and value is not None:
                                 schema['foreign_keys'].append(col_name)
-                        else:
-                            if value:
-                                schema['indexes'].append(col_name)
+                        elif key == 'index' and value:
+                                schema['indexes'].append({'name': f"{col_name}_index", 'column': col_name})
                 self.ddlstorage.create_schema(table_name, schema)
                 writer.writerow(headers)
             
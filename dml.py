@@ -2,8 +2,10 @@
 
 import logging
 import re
-from storage import StorageManager
+from storage import get_storage_manager
 from ddl import DDLManager
+from table import INTEGER_TYPES, RowCursor, convert_value
+from expression import condition_to_function, compile_value_expression, parse_value_expression
 import os
 import csv
 
@@ -11,17 +13,20 @@ import csv
 # logging.basicConfig(filename='dbms_debug.log', level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
 class DMLManager:
-    def __init__(self):
-        self.storage_manager = StorageManager()  # Use the passed instance
-        self.ddl_manager = DDLManager() 
+    def __init__(self, storage_manager=None, ddl_manager=None):
+        self.storage_manager = storage_manager or get_storage_manager()  # Use the passed instance
+        self.ddl_manager = ddl_manager or DDLManager(self.storage_manager)
         #logging.debug("DMLManager initialized with provided storage manager.")
 
 
     
+    def refresh_tables(self, table_name):
+        """Reload a table, and the tables linked to it by foreign keys, if their files changed on disk."""
+        self.storage_manager.refresh([table_name, *self.storage_manager.foreign_key_tables(table_name)])
+
     def insert(self, table_name, data):
         # Load the latest data to make sure the insertion checks against all existing records
-        self.storage_manager.load_latest_data()
-        self.storage_manager.load_latest_schema()
+        self.refresh_tables(table_name)
         schema = self.storage_manager.get_schema(table_name)
 
         if table_name not in self.storage_manager.schemas:
@@ -34,33 +39,108 @@ class DMLManager:
             return "Error: Data validation failed due to primary key duplication or type mismatch."
 
         try:
-            self.storage_manager.insert_data(table_name, data)
-            return "Data inserted successfully."
+            return self.storage_manager.insert_data(table_name, data)
         except Exception as e:
             #logging.error(f"Insert operation failed: {e}")
             return "Error: Failed to insert data."
 
         
+    def insert_many(self, table_name, rows):
+        """
+        Insert a batch of rows, e.g. from a multi-row INSERT or a COPY.
+
+        The whole batch is validated in one pass, with types and primary keys checked
+        against the table and against the other rows of the batch. It is then written
+        with one append to the table file. Nothing is inserted if any row fails.
+
+        Args:
+            table_name (str): The table to insert into.
+            rows (list of dict): Rows keyed by column name, with raw (string) values.
+
+        Returns:
+            str: A message with the number of rows inserted, or an error.
+        """
+        self.refresh_tables(table_name)
+        schema = self.storage_manager.get_schema(table_name)
+        if table_name not in self.storage_manager.schemas:
+            return "Error: Table does not exist."
+
+        columns = schema['columns']
+        primary_keys = self.storage_manager.primary_key_columns(table_name)
+        existing = self.storage_manager.primary_key_index(table_name) if primary_keys else None
+        batch_keys = set()
+        for number, row in enumerate(rows, 1):
+            if any(not self.validate_type(value, columns[key]['type']) for key, value in row.items() if key in columns):
+                return f"Error: Data validation failed due to type mismatch in row {number}."
+            if primary_keys:
+                try:
+                    key = tuple(convert_value(row[column], columns[column]['type']) for column in primary_keys)
+                except (ValueError, KeyError):
+                    return f"Error: Data validation failed due to a missing or invalid primary key in row {number}."
+                if key in existing or key in batch_keys:
+                    return f"Error: Data validation failed due to primary key duplication in row {number}."
+                batch_keys.add(key)
+
+        if not rows:
+            return "No rows to insert."
+        try:
+            result = self.storage_manager.insert_rows(table_name, rows)
+        except Exception as e:
+            #logging.error(f"Insert operation failed: {e}")
+            return "Error: Failed to insert data."
+        if result is not None:
+            return result
+        return f"Inserted {len(rows)} rows into {table_name}."
+
+    def copy(self, table_name, path):
+        """
+        Bulk load a CSV file with a header row into a table (COPY / LOAD DATA).
+
+        Args:
+            table_name (str): The table to load into.
+            path (str): The CSV file; its header names the table columns it holds.
+
+        Returns:
+            str: A message with the number of rows loaded, or an error.
+        """
+        schema = self.storage_manager.get_schema(table_name)
+        if not schema:
+            return "Error: Table does not exist."
+        try:
+            with open(path, newline='', encoding='utf-8') as file:
+                reader = csv.DictReader(file, skipinitialspace=True)
+                header = [name.strip() for name in (reader.fieldnames or [])]
+                unknown = [name for name in header if name not in schema['columns']]
+                if not header or unknown:
+                    return f"Error: Columns {unknown or header} in {path} do not match table {table_name}."
+                reader.fieldnames = header
+                rows = list(reader)
+        except OSError as e:
+            #logging.error(f"Failed to read {path}: {e}")
+            return f"Error: Failed to read {path} due to {e}"
+        return self.insert_many(table_name, rows)
+
     def check_primary_key_constraint(self, table_name, data, schema, command):
-        primary_keys = schema.get('primary_key')
-        existing_data = self.storage_manager.get_table_data(table_name)
-        #logging.debug(f"Checking PK with existing data: {existing_data}")
-        if primary_keys:
-            if isinstance(primary_keys, str):
-                primary_keys = [primary_keys]
-            for primary_key in primary_keys:
-                
-                if primary_key not in data and command == 'insert':
-                    return False
-                if primary_key not in data and command == 'update':
-                    return True
-                # if primary_key not in data:
-                #     logging.error("Primary key field missing in data provided.")
-                #     return False
-                existing_keys = [row[primary_key] for row in existing_data if primary_key in row]
-                if data[primary_key] in existing_keys:
-                    #logging.error(f"Duplicate primary key error for value {data[primary_key]}")
-                    return False
+        """
+        Check that data would not duplicate an existing primary key.
+
+        The whole key is compared as one tuple (composite keys like state_code, month, year
+        may repeat any single column) against the table's primary key hash set, with the
+        values converted to the schema types first.
+        """
+        primary_keys = self.storage_manager.primary_key_columns(table_name)
+        if not primary_keys:
+            return True
+        if any(primary_key not in data for primary_key in primary_keys):
+            # An insert must give the whole key; an update that leaves part of it alone is checked later
+            return command == 'update'
+        try:
+            key = tuple(convert_value(data[primary_key], schema['columns'][primary_key]['type']) for primary_key in primary_keys)
+        except (ValueError, KeyError):
+            return False
+        if key in self.storage_manager.primary_key_index(table_name):
+            #logging.error(f"Duplicate primary key error for value {key}")
+            return False
         return True
     
     
@@ -79,7 +159,7 @@ class DMLManager:
 
 
     def validate_type(self, value, expected_type):
-        if expected_type == 'int':
+        if expected_type in INTEGER_TYPES:
             if not isinstance(value, int):
                 try:
                     int(value)  # Try converting to int
@@ -95,34 +175,72 @@ class DMLManager:
 
     
 
-    def delete(self, table_name, conditions):
+    def delete(self, table_name, conditions, lookup=None):
+        """
+        Delete the rows matching a condition, rewriting the table file once.
+
+        Args:
+            table_name (str): The table to delete from.
+            conditions (str): The WHERE condition, or None for every row.
+            lookup (tuple): Optional (column, values or range bounds) from the planner; the
+                candidate rows then come from that column's index instead of a full scan.
+
+        Returns:
+            str: A message with the number of rows deleted, or an error.
+        """
         # Load latest data and schema
-        self.storage_manager.load_latest_data()
-        self.storage_manager.load_latest_schema()
+        self.refresh_tables(table_name)
+        table = self.storage_manager.get_table_data(table_name)
 
-        # Parse conditions to filter applicable rows
-        condition_function = self.parse_conditions(conditions)
-        data_to_delete = [d for d in self.storage_manager.get_table_data_w_datatype(table_name) if condition_function(d)]
+        # Parse conditions and collect the positions of the matching rows in one pass
+        if conditions:
+            condition_function = self.parse_conditions(conditions)
+            if condition_function is None:
+                return "Error: Invalid condition syntax"
+        else:
+            condition_function = lambda row: True  # DELETE without WHERE empties the table
+        positions = self.matching_positions(table_name, condition_function, lookup)
 
         # Check for foreign key references before deleting
-        if not self.can_delete(table_name, data_to_delete):
+        if not self.can_delete(table_name, table.rows(positions)):
             return "Error: Data cannot be deleted due to foreign key constraints."
 
         # Perform deletion if safe
         try:
-            delete_count = 0
-            for row in data_to_delete:
-                self.storage_manager.delete_data(table_name, lambda r: r == row)
-                delete_count += 1
-
-            if delete_count > 0:
-                return f"Deleted {delete_count} rows from {table_name}."
-            else:
+            if not positions:
                 return "No rows matched the conditions or needed deletion."
+            result = self.storage_manager.delete_rows(table_name, positions)
+            if result is not None:
+                return result
+            return f"Deleted {len(positions)} rows from {table_name}."
         except Exception as e:
             #logging.error(f"Delete operation failed: {str(e)}")
             return f"Error: Failed to delete data due to {str(e)}"
 
+    def matching_positions(self, table_name, predicate, lookup=None):
+        """
+        Return the sorted positions of the rows satisfying a compiled condition.
+
+        With an index lookup only the positions it yields are tested; otherwise every row is.
+        The predicate runs on a cursor, so no row dicts are built.
+        """
+        table = self.storage_manager.get_table_data(table_name)
+        candidates = None
+        if lookup is not None:
+            column, values = lookup
+            if not isinstance(values, dict):
+                values = self.index_keys(table_name, column, values)
+            candidates = self.index_positions(table_name, column, values)
+        if candidates is None:
+            candidates = range(len(table))
+        cursor = RowCursor(table)
+        positions = []
+        for position in candidates:
+            cursor.position = position
+            if predicate(cursor):
+                positions.append(position)
+        return positions
+
     def can_delete(self, table_name, data_to_delete):
         """Check if data can be deleted based on foreign key constraints."""
         schema = self.storage_manager.get_schema(table_name)
@@ -139,8 +257,11 @@ class DMLManager:
                 if fk_details['references']['table'] == table_name:
                     # Check if any data in the referencing table matches the foreign key values
                     ref_data = self.storage_manager.get_table_data(ref_table)
+                    deleted_keys = {row[fk_details['references']['column']] for row in data_to_delete}
+                    if not deleted_keys:
+                        continue
                     for ref_row in ref_data:
-                        if ref_row[fk_column] in [row[fk_details['references']['column']] for row in data_to_delete]:
+                        if ref_row[fk_column] in deleted_keys:
                             return False  # Data is referenced, cannot delete
         return True  # No references, safe to delete
 
@@ -169,7 +290,7 @@ class DMLManager:
         
     def column_in_foreign_keys(self, table_name, column_name):
         """Check if the column is used as a foreign key in any other table."""
-        self.storage_manager.load_latest_schema()  # Ensure all schemas are loaded
+        self.storage_manager.refresh_schemas()  # Ensure all schemas are loaded
         for other_table, other_schema in self.storage_manager.schemas.items():
             # Check the foreign_keys in each table to see if they reference the column in question
             foreign_keys = other_schema.get('foreign_keys', {})
@@ -181,17 +302,33 @@ class DMLManager:
         # logging.debug(f"Column {column_name} in table {table_name} is not used as a foreign key in any other tables")
         return False
     
-    def update(self, table_name, new_values, conditions):
+    def update(self, table_name, new_values, conditions, expressions=None, lookup=None):
+        """
+        Update the matching rows in place, in one pass, with a single rewrite of the table file.
+
+        Args:
+            table_name (str): The table to update.
+            new_values (dict): Column -> literal value.
+            conditions (str): The WHERE condition, or None for every row.
+            expressions (dict): Column -> value expression text, e.g. {'salary': 'salary * 2'};
+                evaluated against each row's values before the update.
+            lookup (tuple): Optional (column, values or range bounds) from the planner.
+
+        Returns:
+            str: A message with the number of rows updated, or an error.
+        """
         # logging.debug(f"Starting update operation for table {table_name} with conditions: {conditions} and new values: {new_values}")
-        self.storage_manager.load_latest_schema()
+        self.refresh_tables(table_name)
         schema = self.storage_manager.get_schema(table_name)
+        expressions = expressions or {}
 
         if not schema:
             # logging.error("Table schema not found.")
             return "Error: Table schema not found."
 
         primary_key = schema.get('primary_key')
-        if primary_key and any(key in new_values for key in (primary_key if isinstance(primary_key, list) else [primary_key])):
+        primary_keys = self.storage_manager.primary_key_columns(table_name)
+        if any(key in new_values or key in expressions for key in primary_keys):
             if self.column_in_foreign_keys(table_name, primary_key):
                 # logging.error(f"Attempt to update primary key {primary_key} that is used as a foreign key.")
                 return "Error: Cannot update primary key as it is used as a foreign key in another table."
@@ -199,23 +336,80 @@ class DMLManager:
         if not self.validate_data(table_name, new_values, 'update'):
             # logging.error("Data validation failed.")
             return "Error: Data validation failed."
+        if any(column not in schema['columns'] for column in expressions):
+            return "Error: Data validation failed."
 
-        condition_function = self.parse_conditions(conditions)
-        if not condition_function:
-            # logging.error("Invalid conditions provided.")
-            return "Error: Invalid conditions."
-
-        retrieved_data = self.storage_manager.get_table_data_w_datatype(table_name)
-        filtered_data = [d for d in retrieved_data if condition_function(d)]
-        rows_updated = self.storage_manager.update_table_data_2(table_name, new_values, filtered_data, condition_function)
+        if conditions:
+            condition_function = self.parse_conditions(conditions)
+            if not condition_function:
+                # logging.error("Invalid conditions provided.")
+                return "Error: Invalid conditions."
+        else:
+            condition_function = lambda row: True  # UPDATE without WHERE changes every row
+        try:
+            compiled = {column: compile_value_expression(parse_value_expression(text)) for column, text in expressions.items()}
+        except ValueError:
+            return "Error: Invalid expression."
 
+        # One pass: find the rows, then compute every new value from the row as it was before the update
+        table = self.storage_manager.get_table_data(table_name)
+        positions = self.matching_positions(table_name, condition_function, lookup)
+        cursor = RowCursor(table)
+        changes = {}
+        try:
+            constants = {column: convert_value(value, schema['columns'][column]['type']) for column, value in new_values.items()}
+            for position in positions:
+                cursor.position = position
+                values = dict(constants)
+                for column, evaluate in compiled.items():
+                    values[column] = self.expression_result(evaluate(cursor), schema['columns'][column]['type'])
+                changes[position] = values
+        except ValueError as e:
+            return f"Error: Data validation failed. {e}"
+
+        if any(key in expressions or key in new_values for key in primary_keys) and not self.primary_keys_unique(table_name, changes):
+            return "Error: Data validation failed due to primary key duplication."
+
+        rows_updated = len(changes)
         if rows_updated > 0:
+            result = self.storage_manager.update_rows(table_name, changes)
+            if result is not None:
+                return result
             # logging.debug(f"Updated {rows_updated} rows in {table_name}.")
             return f"Updated {rows_updated} rows in {table_name}."
         else:
             # logging.debug("No rows matched the conditions or needed updating.")
             return "No rows matched the conditions or needed updating."
 
+    @staticmethod
+    def expression_result(value, column_type):
+        """Convert a computed SET value to the column type; integer columns reject fractions."""
+        if isinstance(value, float) and column_type in INTEGER_TYPES:
+            if not value.is_integer():
+                raise ValueError(f"{value} is not an integer")
+            value = int(value)
+        return convert_value(value, column_type)
+
+    def primary_keys_unique(self, table_name, changes):
+        """
+        Check that the primary keys are still unique once the changes are applied.
+
+        Only the changed rows are looked at: their old keys are taken out of the table's
+        key set and their new keys are checked against what remains and each other.
+        """
+        primary_keys = self.storage_manager.primary_key_columns(table_name)
+        existing = self.storage_manager.primary_key_index(table_name)
+        old_keys = set()
+        new_keys = set()
+        for position, values in changes.items():
+            old_key = self.storage_manager.primary_key_of(table_name, position)
+            old_keys.add(old_key)
+            key = tuple(values.get(name, value) for name, value in zip(primary_keys, old_key))
+            if key in new_keys:
+                return False
+            new_keys.add(key)
+        return not any(key in existing and key not in old_keys for key in new_keys)
+
         
     def validate_data(self, table_name, data, command):
         schema = self.storage_manager.get_schema(table_name)
@@ -230,7 +424,6 @@ class DMLManager:
             
             #verify if the inserted data matched the datatype definition
             expected_type = schema['columns'][field]['type']
-            print(expected_type)
             if expected_type == 'int' and not isinstance(value, int):
                 try:
                     value = int(value)  # Convert to int if necessary
@@ -242,9 +435,9 @@ class DMLManager:
                 #logging.error(f"Type validation error for field '{field}': expected string, got {type(value).__name__}")
                 return False
             
-        #verify if the inserted data matched the primary key condition
-        if not self.check_primary_key_constraint(table_name, data, schema, command):
-            print(self.check_primary_key_constraint(table_name, data, schema, command))
+        #verify if the inserted data matched the primary key condition; an UPDATE's new keys are
+        #checked by primary_keys_unique instead, which leaves out the current keys of the updated rows
+        if command != 'update' and not self.check_primary_key_constraint(table_name, data, schema, command):
             #logging.error(f"Inserted data is not satisfied primary key rule for table {table_name}")
             return False
 
@@ -270,17 +463,19 @@ class DMLManager:
             return value.strip().replace("‘", "'").replace("’", "'").replace("’", "'").replace("’", "'")
         return value
 
-    def select(self, table_name, columns, conditions=None):
+    def select(self, table_name, columns, conditions=None, predicate=None):
         # Retrieve data from the storage manager
-        self.storage_manager.load_latest_data()
-        self.storage_manager.load_latest_schema()
-        data = self.storage_manager.get_table_data(table_name)
+        self.refresh_tables(table_name)
+        table = self.storage_manager.get_table_data(table_name)
         # print(f"Debug: Data retrieved from {table_name}: {data}")
 
-        # Apply conditions if specified
+        # Apply conditions if specified; rows are only built as dicts once they match
         if conditions:
-            condition_function = self.parse_conditions(conditions)
-            data = [d for d in data if condition_function(d)]
+            predicate = self.parse_conditions(conditions)
+        if predicate is not None and len(table):
+            data = list(table.scan(predicate))
+        else:
+            data = list(table)
 
         # Handle column selection
         if columns == ['*']:
@@ -302,6 +497,25 @@ class DMLManager:
             filtered_data = [{k: v for k, v in item.items() if k in processed_columns} for item in data]
             return filtered_data
         
+    def scan(self, table_name, predicate=None):
+        """
+        Stream the rows of a table that satisfy a predicate, without building a list.
+
+        Like the indexed selects, this reads the tables as they are: the engine refreshes
+        the tables a SELECT reads, once, before taking its snapshot.
+
+        Args:
+            table_name (str): The name of the table to scan.
+            predicate (callable): Optional compiled WHERE condition.
+
+        Returns:
+            iterator of dict: The matching rows, in table order.
+        """
+        table = self.storage_manager.get_table_data(table_name)
+        if not len(table):
+            return iter(())
+        return table.scan(predicate)
+
     def select_with_index(self, table_name, column, value):
         """
         Perform an indexed select on the specified table and column.
@@ -309,71 +523,101 @@ class DMLManager:
         Args:
             table_name (str): The name of the table to query.
             column (str): The column to query.
-            value (str): The value to match in the indexed column.
+            value: The value to match in the indexed column, or a list of values (for IN).
 
         Returns:
-            list[dict]: A list of dictionaries representing the rows that match the query.
+            list[dict]: A list of dictionaries representing the rows that match the query, in table order.
         """
+        table = self.storage_manager.get_table_data(table_name)
+        keys = self.index_keys(table_name, column, value)
+
         # Check if the BTree index exists for the specified column
-        index_key = (table_name, column)
-        if index_key in self.storage_manager.indexes:
+        positions = self.index_positions(table_name, column, keys)
+        if positions is not None:
             # Retrieve using BTree index
-            try:
-                # This assumes that the BTree index is keyed by the column value
-                indexed_rows = self.storage_manager.indexes[index_key][value]
-                return indexed_rows
-            except KeyError:
-                # If the value is not found in the index, return an empty list
-                return []
+            return table.rows(positions)
         else:
             # Fallback to full table scan if no index exists
-            return [row for row in self.storage_manager.get_table_data(table_name) if row[column] == value]
+            return [row for row in table if row[column] in keys]
 
-    def parse_conditions(self, conditions):
-        print(f"Parsing conditions: {conditions}")
-        operators = {
-            '=': '==',
-            '!=': '!=',
-            '>': '>',
-            '<': '<',
-            '>=': '>=',
-            '<=': '<='
-        }
-
-        conditions = re.split(r"\b(AND|OR)\b", conditions, flags=re.IGNORECASE)
-        print(f"Split conditions: {conditions}")
-        parsed_conditions = []
-
-        for part in conditions:
-            part = part.strip()
-            if part.upper() in ['AND', 'OR']:
-                parsed_conditions.append(part.lower())  # Use Python's lower case and/or
-            else:
-                match = re.search(r"(.*?)(=|!=|>|<|>=|<=)(.*)", part.strip(), re.IGNORECASE)
-                if match:
-                    column, op, value = match.groups()
-                    column, value = column.strip(), value.strip()
-
-                    """if column in ['id']:  # Add more columns if needed
-                        value = value.strip("'")
-                        condition_str = f"(d['{column}'] {operators[op]} '{value}')"
-                    el"""
-                    if value.isdigit():
-                        condition_str = f"(d['{column}'] {operators[op]} {value})"
-                    else:
-                        value = value.strip("'")
-                        condition_str = f"(d['{column}'] {operators[op]} '{value}')"
-
-                    parsed_conditions.append(condition_str)
-                else:
-                    #logging.error(f"Could not parse condition: {part}")
-                    return None  # Or raise an Exception
+    def select_index_range(self, table_name, column, low=None, high=None, include_low=True, include_high=True):
+        """
+        Perform a range select on an indexed column by iterating only the matching slice of its B-tree.
 
-        condition_str = " ".join(parsed_conditions)
-        print(f"Final condition string: {condition_str}")
-        
-        # Return a callable lambda function
-        return lambda d: eval(condition_str, {}, {"d": d})
+        Args:
+            table_name (str): The name of the table to query.
+            column (str): The indexed column.
+            low: The lower bound, or None for no lower bound.
+            high: The upper bound, or None for no upper bound.
+            include_low (bool): Whether rows equal to the lower bound match.
+            include_high (bool): Whether rows equal to the upper bound match.
+
+        Returns:
+            list[dict]: The rows whose column value lies in the range, in table order.
+        """
+        table = self.storage_manager.get_table_data(table_name)
+        index = self.storage_manager.get_index(table_name, column)
+        if index is None:
+            # Fallback to full table scan if no index exists
+            def in_range(value):
+                if value is None:
+                    return False
+                if low is not None and (value < low or (value == low and not include_low)):
+                    return False
+                return high is None or value < high or (value == high and include_high)
+            return [row for row in table if in_range(row[column])]
+
+        bounds = {'low': low, 'high': high, 'include_low': include_low, 'include_high': include_high}
+        return table.rows(self.index_positions(table_name, column, bounds))
+
+    def index_keys(self, table_name, column, value):
+        """Convert looked-up values to the native column values index keys are stored as."""
+        schema = self.storage_manager.get_schema(table_name)
+        values = value if isinstance(value, (list, tuple, set, frozenset)) else [value]
+        column_type = schema['columns'].get(column, {}).get('type', 'varchar') if schema else 'varchar'
+        keys = set()
+        for item in values:
+            try:
+                keys.add(convert_value(item, column_type))
+            except ValueError:
+                continue  # e.g. a non-numeric value for an int column matches nothing
+        keys.discard(None)
+        return keys
+
+    def index_positions(self, table_name, column, lookup):
+        """
+        Read the positions of the rows an index lookup selects, without touching the rows.
+
+        Args:
+            table_name (str): The table.
+            column (str): The indexed column.
+            lookup: A list of native key values (point lookup) or a dict of range bounds
+                ('low', 'high', 'include_low', 'include_high').
+
+        Returns:
+            list of int or None: Sorted row positions, or None if the column has no index.
+        """
+        index = self.storage_manager.get_index(table_name, column)
+        if index is None:
+            return None
+        positions = []
+        if isinstance(lookup, dict):
+            for row_positions in index.values(lookup['low'], lookup['high'],
+                                              excludemin=not lookup['include_low'], excludemax=not lookup['include_high']):
+                positions.extend(row_positions)
+        else:
+            for key in lookup:
+                positions.extend(index.get(key, ()))
+        positions.sort()
+        return positions
+
+    def parse_conditions(self, conditions):
+        try:
+            # Parsed once into an expression tree and compiled to a closure, instead of eval() per row
+            return condition_to_function(conditions)
+        except ValueError:
+            #logging.error(f"Could not parse condition: {conditions}")
+            return None  # Or raise an Exception
 
     def safe_convert(self, value):
         try:
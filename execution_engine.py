@@ -3,38 +3,162 @@
 from dml import DMLManager
 from ddl import DDLManager
 # from collections import defaultdict
-from storage import StorageManager
+from storage import get_storage_manager
+from expression import (condition_to_function, compile_condition, condition_columns, parse_condition, rename_columns,
+                        to_numeric, And, Between, Comparison, In, Like)
+from table import INTEGER_TYPES
+from spill import SpillFile
+from aggregation import Aggregate, HashAggregation, parse_aggregates
+from sorting import OrderKey, distinct, external_sort, order_key, top_n
+from parallel import ParallelExecutor
+from cache import LRUCache
+import functools
+import itertools
 import logging
 import re
+import sys
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
 class ExecutionEngine:
-    def __init__(self):
-        self.storage_manager = StorageManager()
-        self.ddl_manager = DDLManager()
-        self.dml_manager = DMLManager()
+    def __init__(self, storage_manager=None):
+        # All managers share one storage manager, so tables are loaded once per process
+        self.storage_manager = storage_manager or get_storage_manager()
+        self.ddl_manager = DDLManager(self.storage_manager)
+        self.dml_manager = DMLManager(self.storage_manager, self.ddl_manager)
+        # Largest build side (in rows) a hash join keeps in memory before partitioning to disk
+        self.hash_join_memory_rows = 200000
+        # Most rows a sort (ORDER BY, DISTINCT, merge join) holds in memory before spilling runs to disk
+        self.sort_memory_rows = 200000
+        self.spill_directory = None  # None uses the system temp directory
+        # Worker processes for large single-table scans and aggregations; 1 keeps every query in this process
+        self.parallel_degree = 1
+        self.parallel_min_rows = 100000  # Smaller tables are not worth shipping to workers
+        self.parallel_join_min_rows = 10000  # Smallest build side a join partitions across workers
+        self.parallel = None
+        # Results of SELECTs, bounded in bytes; None (the default) runs every query. See enable_result_cache
+        self.result_cache = None
 
     def execute_query(self, command):
         try:
             handler = getattr(self, f"handle_{command['type'].lower()}", self.handle_unsupported)
-            return handler(command)
+            if command['type'].lower() == 'select':
+                # Queries read a snapshot instead of holding table locks, so they never block writers
+                tables = [command['main_table']] + [join['join_table'] for join in command.get('join') or []]
+                table_names = [table.split()[0] for table in tables]
+                with self.storage_manager.locks.statement():
+                    self.storage_manager.refresh(table_names)
+                    if self.result_cache is not None:
+                        return self.cached_select(command, table_names, handler)
+                    with self.storage_manager.snapshot(table_names):
+                        return handler(command)
+            with self.statement_locks(command):
+                return handler(command)
         except Exception as e:
             #logging.error(f"Execution error: {e}", exc_info=True)
             return f"Execution error: {e}"
         
+    def enable_result_cache(self, max_bytes=64 * 1024 * 1024):
+        """
+        Cache SELECT results, keyed by the parsed statement and checked against the
+        versions of the tables it reads, which every write and DDL statement bumps.
+
+        Args:
+            max_bytes (int): Approximate memory the cached results may take; least
+                recently used results are evicted beyond it. 0 or None disables the cache.
+        """
+        self.result_cache = LRUCache(capacity=max_bytes) if max_bytes else None
+
+    def cached_select(self, command, table_names, handler):
+        """Answer a SELECT from the result cache, or run it and cache its rows."""
+        storage = self.storage_manager
+        key = self.result_cache_key(command)
+        with storage.lock:  # Versions are bumped under this lock, together with the change
+            versions = tuple(storage.table_versions.get(table_name, 0) for table_name in table_names)
+        cached = self.result_cache.get(key, valid=lambda entry: entry[0] == versions)
+        if cached is not None:
+            return [dict(row) for row in cached[1]]  # Callers get rows of their own to change
+
+        # The versions were read before the snapshot, so a write in between only makes the entry stale early
+        with storage.snapshot(table_names):
+            result = handler(command)
+        if isinstance(result, list):
+            self.result_cache.put(key, (versions, [dict(row) for row in result]), self.result_size(result))
+        return result
+
+    @staticmethod
+    def result_cache_key(command):
+        """
+        The parsed statement, rendered: keywords, spacing and case of the source text are
+        gone from the tree, so statements that differ only in formatting share an entry.
+        """
+        return repr(command['statement'])
+
+    def result_cache_stats(self):
+        """
+        Returns:
+            dict: The result cache's counts (see LRUCache.stats), or None if the cache is off.
+        """
+        return self.result_cache.stats() if self.result_cache is not None else None
+
+    @staticmethod
+    def result_size(rows):
+        """Approximate bytes held by result rows; column name strings are shared, so they are not counted."""
+        size = sys.getsizeof(rows)
+        for row in rows:
+            size += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values())
+        return size
+
+    def statement_locks(self, command):
+        """
+        Return a context manager holding the locks a command needs while it runs: an
+        exclusive lock on the table a DML statement changes (plus shared locks on the
+        tables linked to it by foreign keys), and the whole catalog for DDL. SELECT reads
+        a snapshot instead (see execute_query).
+        """
+        locks = self.storage_manager.locks
+        command_type = command['type'].lower()
+        if command_type in ('insert', 'update', 'delete', 'copy'):
+            table = command['tables'] if command_type == 'update' else command['table']
+            return locks.statement(read_tables=self.storage_manager.foreign_key_tables(table), write_tables=[table])
+        if command_type in ('show_tables', 'show_cache', 'prepare', 'deallocate'):
+            return locks.statement()
+        return locks.exclusive()
+
+    def handle_prepare(self, command):
+        # The statement was registered in the session by the parser, which EXECUTE goes through too
+        return f"Statement '{command['name']}' prepared with {command['parameters']} parameters."
+
+    def handle_deallocate(self, command):
+        return f"Statement '{command['name']}' deallocated."
+
     def handle_show_tables(self, command):
         # Assuming storage_manager is accessible within this instance
         tables = self.storage_manager.show_tables()
         return "\n".join(tables) if tables else "No tables found."
 
+    def handle_show_cache(self, command):
+        stats = self.result_cache_stats()
+        if stats is None:
+            return "Result cache is disabled."
+        return "\n".join(f"{name}: {value}" for name, value in stats.items())
+
         
     def handle_select(self, command):
         if 'main_table' not in command or not command['columns']:
             #logging.error("Select command is missing 'main_table' or 'columns'")
             return "Invalid command format"
-        
+        # The select is a pipeline of generators; only here is the result materialized
+        return list(self.select_rows(command))
+
+    def select_rows(self, command):
+        """
+        Build the streaming operator pipeline of a SELECT and return its output iterator.
+
+        Scan, filter, join probe and projection pass rows through one at a time; only
+        the blocking operators (hash join build, aggregation, sort, DISTINCT) buffer.
+        """
         main_table = command['main_table']
         # Log initial action of checking for index
         #logging.debug(f"Checking for index on table {main_table}")
@@ -47,111 +171,158 @@ class ExecutionEngine:
         
     
     def select_with_index(self, command):
-        main_table = command['main_table']
-        columns = command.get('columns', [])
-        where_clause = command.get('where_clause', '')
-        data = []
-
-        # Assuming the first column is the indexed column for simplicity in this example
-        indexed_column = columns[0] if columns else None
-
-        # Check if the main table column is indexed
-        if indexed_column and self.storage_manager.column_has_index(main_table, indexed_column):
-            # Find the value for the indexed column in the WHERE clause
-            pattern = rf"{indexed_column}\s*=\s*['\"]?([^'\"]+)['\"]?"
-            match = re.search(pattern, where_clause) if where_clause else None
-
-            if match:
-                value = match.group(1)
-                # Fetch data using the index
-                indexed_data = self.dml_manager.select_with_index(main_table, indexed_column, value)
-                data = [{col: row.get(col) for col in columns} for row in indexed_data]
-            else:
-                # If no suitable index condition is found, fall back to a full table scan for these columns
-                #logging.debug("No indexable condition found, performing a full scan on indexed columns.")
-                data = self.dml_manager.select(main_table, columns)
-        else:
-            # No index exists on the supposed indexed column, perform a full scan
-            #logging.debug("No index found on the column, performing a full table scan.")
-            data = self.dml_manager.select(main_table, columns)
+        main_table_name, _ = self.parse_table_alias(command['main_table'])
+        column, lookup = self.find_index_lookup(command['main_table'], command)
 
-        # Apply further WHERE clause filtering if necessary (for conditions not handled by the index)
-        if where_clause:
-            data = self.filter_data_by_condition(data, where_clause)
+        # Fetch data using the index, then apply the whole WHERE clause to the few rows it returns
+        if isinstance(lookup, dict):
+            data = self.dml_manager.select_index_range(main_table_name, column, **lookup)
+        else:
+            data = self.dml_manager.select_with_index(main_table_name, column, lookup)
+        data = filter(compile_condition(self.main_table_condition(command)), data)
+        return self.finish_select(data, command)
 
-        return data
-    
     def select_no_index(self, command):
-        if 'main_table' not in command or not command['columns']:
-            #logging.error("Select command is missing 'main_table' or 'columns'")
-            return "Invalid command format"
-        
-        main_table = command['main_table']
-        data = self.dml_manager.select(main_table, ['*'])  # Fetch all rows from the table
+        main_table_name, _ = self.parse_table_alias(command['main_table'])
+        table = self.storage_manager.get_table_data(main_table_name)
+        if self.parallel_degree > 1 and not command.get('join') and len(table) >= self.parallel_min_rows:
+            return self.select_parallel(command, table)
+
+        # Apply WHERE clause filtering while scanning, on the table's native column values
+        predicate, residual_where = self.split_where_clause(command)
+        data = self.dml_manager.scan(main_table_name, predicate)  # Stream matching rows from the table
+        return self.finish_select(data, command, residual_where)
+
+    def parallel_executor(self):
+        """Return the worker pool for the current parallel_degree, replacing it if the setting changed."""
+        if self.parallel is None or self.parallel.degree != self.parallel_degree:
+            if self.parallel is not None:
+                self.parallel.shutdown()
+            self.parallel = ParallelExecutor(self.parallel_degree)
+        return self.parallel
+
+    def select_parallel(self, command, table):
+        """
+        Run a single-table SELECT with the scan split across worker processes.
 
-        # Apply WHERE clause filtering at the very beginning
-        if 'where_clause' in command:
-            data = self.filter_data_by_condition(data, command['where_clause'])
+        Each worker filters one row range of the table; with aggregates or GROUP BY it
+        also aggregates its range, and the partial groups are merged here. Everything
+        after that (HAVING, DISTINCT, ORDER BY, LIMIT, projection) runs as usual.
+        """
+        executor = self.parallel_executor()
+        condition = self.main_table_condition(command) if command.get('where_clause') else None
+        if command['statement'].group_by or parse_aggregates(command['columns']):
+            group_columns, aggregates = self.aggregation_plan(command)
+            aggregation = executor.aggregate(table, condition, group_columns, aggregates)
+            return self.finish_select(None, command, aggregation=aggregation)
+        if condition is not None:
+            data = map(table.row, executor.filter_positions(table, condition))
+        else:
+            data = iter(table)
+        return self.finish_select(data, command)
+
+    def aggregation_plan(self, command):
+        """Return the GROUP BY columns and the aggregates a query computes, from its parsed statement."""
+        statement = command['statement']
+        if statement.group_by:
+            having_columns = condition_columns(statement.having) if statement.having is not None else ()
+            return list(statement.group_by), parse_aggregates(command['columns'], having_columns)
+        return [], parse_aggregates(command['columns'])
+
+    def split_where_clause(self, command):
+        """
+        Decide where the WHERE clause is evaluated.
+
+        Without joins it becomes the scan predicate. With joins it is pushed into the
+        scan of the main table when it only names main-table columns (the main alias
+        is stripped); otherwise it is applied to the joined rows.
+
+        Returns:
+            tuple: (scan predicate or None, WHERE condition tree to apply after the join or None).
+        """
+        if not command.get('where_clause'):
+            return None, None
+        if not command.get('join'):
+            return compile_condition(self.main_table_condition(command)), None
+
+        main_table_name, _ = self.parse_table_alias(command['main_table'])
+        schema = self.storage_manager.get_schema(main_table_name) or {}
+        main_columns = set(schema.get('columns', {}))
+        condition = self.main_table_condition(command)
+        if all(column in main_columns for column in condition_columns(condition)):
+            return compile_condition(condition), None
+        return None, self.where_condition(command)
+
+    @staticmethod
+    def where_condition(command):
+        """Return the WHERE clause as an expression tree, as parsed with the statement if it was."""
+        statement = command.get('statement')
+        if statement is not None:
+            return statement.where
+        return parse_condition(command['where_clause'])
+
+    def main_table_condition(self, command):
+        """Return the WHERE clause with the main table's alias stripped from its columns ('x.col' becomes 'col')."""
+        _, main_alias = self.parse_table_alias(command['main_table'])
+        return self.unqualify_columns(self.where_condition(command), main_alias)
 
+    @staticmethod
+    def unqualify_columns(condition, alias):
+        prefix = f"{alias}."
+        return rename_columns(condition, lambda column: column[len(prefix):] if column.startswith(prefix) else column)
+
+    def finish_select(self, data, command, residual_where=None, aggregation=None):
         # Process JOINs if specified
+        main_table = command['main_table']
         if 'join' in command:
             for join in command['join']:
                 data = self.handle_join(data, join, main_table, command['columns'])
+        if residual_where is not None:
+            data = filter(compile_condition(residual_where), data)
 
         # Check for the presence of aggregation functions
-        aggregation_needed = any(
-            func in col.upper() for col in command['columns'] for func in ['MAX', 'MIN', 'SUM', 'AVG', 'COUNT']
-        )
+        aggregation_needed = bool(parse_aggregates(command['columns']))
 
-        # Handle GROUP BY with or without aggregation
-        if 'group_by' in command and command['group_by'] is not None:
-            data = self.handle_group_by(data, command['group_by'], command['columns'])
+        # Handle GROUP BY with or without aggregation; the clauses come parsed with the statement
+        statement = command['statement']
+        if statement.group_by:
+            if aggregation is not None:
+                data = aggregation.results()  # Already computed, e.g. by parallel workers
+            else:
+                data = self.handle_group_by(data, command)
             # Apply HAVING clause if present
-            if 'having' in command and command['having']:
-                data = self.handle_having(data, command['having'])
+            if statement.having is not None:
+                data = self.handle_having(data, statement.having)
         elif aggregation_needed:
             # Process non-grouped aggregations
-            data = self.handle_aggregations(command, data)
+            data = aggregation.results() if aggregation is not None else self.handle_aggregations(command, data)
 
-        # If ORDER BY is specified, sort the data accordingly
-        if 'order_by' in command and command['order_by']:
-            data = self.handle_order_by(data, command['order_by'])
+        if command.get('distinct'):
+            # DISTINCT applies to the selected columns, so project first; ORDER BY then names output columns
+            data = distinct(self.filter_select_columns(data, command['columns']), self.sort_memory_rows, self.spill_directory)
 
+        # If ORDER BY is specified, sort the data accordingly
+        limit, offset = command.get('limit'), command.get('offset') or 0
+        if statement.order_by:
+            # With a LIMIT only the first offset + limit rows in sort order are ever needed
+            data = self.handle_order_by(data, statement.order_by, None if limit is None else offset + limit)
+        if limit is not None or offset:
+            data = self.handle_limit(data, limit, offset)
+
+        if command.get('distinct'):
+            return data
         # Only return the columns specified in the SELECT clause
-        final_data = self.filter_select_columns(data, command['columns'])
-        return final_data
+        return self.filter_select_columns(data, command['columns'])
     
     def handle_aggregations(self, command, data):
-        # Assume data is a list of dictionaries, each representing a row
-        results = {}
-        for column in command['columns']:
-            # Extract the function and column name (e.g., "MAX(monthly_state_population)")
-            match = re.match(r"(\w+)\((\w+)\)", column)
-            if match:
-                func, col_name = match.groups()
-                try:
-                    # Attempt to convert data to numeric types before aggregation
-                    values = [self.safe_convert_to_numeric(row[col_name]) for row in data if col_name in row and row[col_name] is not None]
-                except ValueError as e:
-                    #logging.error(f"Error converting data to numeric type for column {col_name}: {e}")
-                    continue  # Skip this column if conversion fails
-
-                # Perform the aggregation operation
-                if func.upper() == 'MAX':
-                    results[column] = max(values) if values else None
-                elif func.upper() == 'MIN':
-                    results[column] = min(values) if values else None
-                elif func.upper() == 'SUM':
-                    results[column] = sum(values) if values else None
-                elif func.upper() == 'AVG':
-                    results[column] = sum(values) / len(values) if values else None
-                elif func.upper() == 'COUNT':
-                    results[column] = len(values)
-
-        return [results]  # Return a list containing a single dictionary
+        # Non-grouped aggregation: a single group folded in one pass over the rows
+        aggregates = parse_aggregates(command['columns'])
+        return HashAggregation([], aggregates).consume(data).results()
 
     @staticmethod
     def safe_convert_to_numeric(value):
+        if isinstance(value, (int, float)):
+            return value  # Already native, as loaded from a typed column
         try:
             # Convert to float if possible, otherwise to int
             return float(value)
@@ -171,19 +342,109 @@ class ExecutionEngine:
         return data  # Return data directly without further processing
 
     def has_index(self, table, command):
-        # Retrieve column information if available from the command or assume all columns
-        requested_columns = command.get('columns', [])
-        if not requested_columns:
-            # If no specific columns are requested, consider all columns of the table
-            requested_columns = self.storage_manager.get_table_columns(table)
-
-        # Check for each column if an index exists
-        for column in requested_columns:
-            if self.storage_manager.column_has_index(table, column):
-                #logging.debug(f"Index found on column: {column}")
-                return True
-        #logging.debug("No index found on any requested columns.")
-        return False
+        # An index helps when the WHERE clause of a single-table query pins an indexed column
+        return self.find_index_lookup(table, command) is not None
+
+    def find_index_lookup(self, table, command):
+        """
+        Find a predicate in the WHERE clause that an index on the main table can answer.
+
+        Only top-level AND terms qualify, on any indexed column: 'col = value' and
+        'col IN (...)' become point lookups; '<', '<=', '>', '>=', BETWEEN and a
+        LIKE pattern with a literal prefix become a key range. Point lookups are
+        preferred, and range terms on the same column are intersected.
+
+        Args:
+            table (str): The main table as written, possibly with an alias ('t AS x'); columns
+                qualified by the alias count as the table's own.
+
+        Returns:
+            tuple or None: (column, list of values) for a point lookup, (column, dict of
+            range bounds) for a range scan, or None if no index applies.
+        """
+        where_clause = command.get('where_clause')
+        if not where_clause or command.get('join'):
+            return None
+        table, alias = self.parse_table_alias(table)
+        try:
+            condition = self.unqualify_columns(self.where_condition(command), alias)
+        except ValueError:
+            return None
+
+        conjuncts = condition.conditions if isinstance(condition, And) else [condition]
+        ranges = {}
+        for part in conjuncts:
+            if not isinstance(part, (Comparison, Between, In, Like)):
+                continue
+            if not self.storage_manager.column_has_index(table, part.column):
+                continue
+            if isinstance(part, Comparison) and part.operator in ('=', '=='):
+                #logging.debug(f"Index found on column: {part.column}")
+                return part.column, [part.value]
+            if isinstance(part, In):
+                return part.column, part.values
+            bounds = self.index_range_bounds(table, part)
+            if bounds is not None:
+                ranges[part.column] = self.intersect_ranges(ranges.get(part.column), bounds)
+
+        if ranges:
+            # Prefer a column bounded on both sides, since that is usually the narrowest slice
+            column = max(ranges, key=lambda name: (ranges[name]['low'] is not None) + (ranges[name]['high'] is not None))
+            return column, ranges[column]
+        #logging.debug("No index found on any WHERE columns.")
+        return None
+
+    def index_range_bounds(self, table, part):
+        """
+        Translate a range predicate into B-tree key bounds on the column's native values.
+
+        Returns:
+            dict or None: 'low', 'high', 'include_low' and 'include_high', or None when the
+            predicate's values are not of the column's type (the scan handles those).
+        """
+        schema = self.storage_manager.get_schema(table) or {}
+        column_type = schema.get('columns', {}).get(part.column, {}).get('type', 'varchar').lower()
+        key_types = (int, float) if column_type in INTEGER_TYPES else (str,)
+
+        if isinstance(part, Like):
+            # Everything matching 'abc%' or 'abc_x' sorts between 'abc' and 'abd'
+            prefix = re.match(r"[^%_]*", part.pattern).group(0)
+            if column_type in INTEGER_TYPES or not prefix:
+                return None
+            upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+            return {'low': prefix, 'high': upper, 'include_low': True, 'include_high': False}
+
+        if isinstance(part, Between):
+            low, high, include_low, include_high = part.low, part.high, True, True
+        elif part.operator in ('>', '>='):
+            low, high, include_low, include_high = part.value, None, part.operator == '>=', True
+        elif part.operator in ('<', '<='):
+            low, high, include_low, include_high = None, part.value, True, part.operator == '<='
+        else:
+            return None
+        if column_type in INTEGER_TYPES:
+            low, high = (to_numeric(bound) if isinstance(bound, str) else bound for bound in (low, high))
+        if not all(bound is None or isinstance(bound, key_types) for bound in (low, high)):
+            return None
+        if low is None and high is None:
+            return None
+        return {'low': low, 'high': high, 'include_low': include_low, 'include_high': include_high}
+
+    @staticmethod
+    def intersect_ranges(current, bounds):
+        """Narrow a range with another range on the same column (e.g. 'A > 5 AND A <= 9')."""
+        if current is None:
+            return bounds
+        merged = dict(current)
+        if bounds['low'] is not None and (
+                merged['low'] is None or bounds['low'] > merged['low']
+                or (bounds['low'] == merged['low'] and not bounds['include_low'])):
+            merged['low'], merged['include_low'] = bounds['low'], bounds['include_low']
+        if bounds['high'] is not None and (
+                merged['high'] is None or bounds['high'] < merged['high']
+                or (bounds['high'] == merged['high'] and not bounds['include_high'])):
+            merged['high'], merged['include_high'] = bounds['high'], bounds['include_high']
+        return merged
 
     
     def filter_data_by_condition(self, data, where_clause):
@@ -191,38 +452,28 @@ class ExecutionEngine:
             #logging.debug("No where_clause provided, returning original data.")
             return data
         condition_function = self.parse_condition_to_function(where_clause)
-        filtered_data = [row for row in data if condition_function(row)]
-        return filtered_data
+        return filter(condition_function, data)
     
     def filter_select_columns(self, data, select_columns):
         
         if '*' in select_columns:
             return data
-        
-        final_data = []
-        for row in data:
-            filtered_row = {}
-            for column in select_columns:
-                if ' AS ' in column:
-                    # Split to get the function and alias
-                    func_part, alias = column.split(' AS ')
-                    alias = alias.strip()
-                    # Use the alias as the key to fetch from row
-                    filtered_row[alias] = row.get(alias)
-                else:
-                    # This will handle both aggregated columns without alias and regular columns
-                    func_match = re.match(r'(\w+)\((\w+)\)', column)
-                    if func_match:
-                        # It's an aggregated column without alias
-                        func_name, col_name = func_match.groups()
-                        agg_key = func_name.upper() + '(' + col_name + ')'
-                        filtered_row[column] = row.get(agg_key)
-                    else:
-                        # Regular column without any function
-                        filtered_row[column] = row.get(column)
 
-            final_data.append(filtered_row)
-        return final_data
+        # Work out once where each output column comes from, then stream the rows through
+        plan = []
+        for column in select_columns:
+            # Aggregates are stored under their canonical key, e.g. COUNT(*) for count(*)
+            aggregate = Aggregate.parse(column)
+            if aggregate is not None:
+                plan.append((aggregate.alias, aggregate.alias) if aggregate.alias else (column, aggregate.key))
+            elif ' AS ' in column:
+                # Split to get the column and alias, and use the alias as the key to fetch from row
+                alias = column.split(' AS ')[1].strip()
+                plan.append((alias, alias))
+            else:
+                # Regular column without any function
+                plan.append((column, column))
+        return ({name: row.get(key) for name, key in plan} for row in data)
 
 
     def parse_join_condition(self, condition):
@@ -242,7 +493,7 @@ class ExecutionEngine:
         main_table_name, main_alias = self.parse_table_alias(main_table)
         join_table_name, join_alias = self.parse_table_alias(join['join_table'])
 
-        main_data = self.storage_manager.get_table_data(main_table_name)
+        # The main side is the upstream operator's row stream; the joined table is read whole
         join_data = self.storage_manager.get_table_data(join_table_name)
 
         if main_data is None or join_data is None:
@@ -250,10 +501,18 @@ class ExecutionEngine:
             return []
 
         left_field, right_field = self.parse_join_condition(join['join_condition'])
+        if left_field.split('.')[0] == join_alias and right_field.split('.')[0] == main_alias:
+            left_field, right_field = right_field, left_field  # Written as "join.col = main.col"
         join_type = join.get('join_type', 'INNER').upper()
 
-        # Choose the join method based on the data size
-        join_method = self.decide_join_method(main_data, join_data, join_type)
+        # Choose the join method based on the data size and the indexes on the join column
+        join_index = self.storage_manager.get_index(join_table_name, right_field.split('.')[1])
+        join_method = self.decide_join_method(main_data, join_data, join_type, join_index)
+        if join_method == self.nested_loop_join:
+            # The row-at-a-time method indexes into its inputs, so give it lists
+            main_data, join_data = list(main_data), list(join_data)
+        elif join_method == self.merge_join:
+            join_method = functools.partial(join_method, join_index=join_index)
 
         # Execute the appropriate join method based on type
         if join_type in ["INNER JOIN", "JOIN"]:  # Treat 'JOIN' as 'INNER JOIN'
@@ -266,60 +525,226 @@ class ExecutionEngine:
             #logging.error(f"Unsupported join type: {join_type}")
             return []
 
-    def decide_join_method(self, main_data, join_data, join_type):
-        # If either dataset is large, use merge join, otherwise use nested loop
-        if len(main_data) > 1000 or len(join_data) > 1000:
-            #logging.debug("Using merge join due to large dataset size")
+    def decide_join_method(self, main_data, join_data, join_type, join_index=None):
+        # A joined table too large to hash in memory but indexed on the join column is already
+        # in key order, so merging it with the sorted main input beats partitioning both to disk
+        if join_index is not None and len(join_data) > self.hash_join_memory_rows:
+            #logging.debug("Using merge join on the join column's index")
             return self.merge_join
+        # Nested loops only pay off when both inputs are tiny; otherwise hash join in linear time
+        if not hasattr(main_data, '__len__') or len(main_data) * len(join_data) > 10000:
+            #logging.debug("Using hash join due to large dataset size")
+            return self.hash_join
         else:
             #logging.debug("Using nested loop join for smaller dataset size")
             return self.nested_loop_join
-        
-    def merge_join(self, main_data, join_data, left_field, right_field, main_alias, join_alias, select_columns, join_type):
-        # Extract just the column name from field references
+
+    def hash_join(self, main_data, join_data, left_field, right_field, main_alias, join_alias, select_columns, join_type):
+        """
+        Equi-join two inputs by building a hash table on the smaller one and probing it with the larger.
+
+        Every pair of rows with equal keys is returned, including duplicate keys on both sides.
+        If the build side has more than hash_join_memory_rows rows, both inputs are
+        hash-partitioned to temporary files and joined one partition pair at a time.
+
+        Args:
+            main_data: Row dicts; a list, a Table or an upstream row iterator (buffered up to
+                hash_join_memory_rows rows to see if it is the smaller input).
+            join_data: Sized iterable of row dicts (a list or a Table).
+            left_field, right_field (str): 'alias.column' keys of the main and join input.
+            join_type (str): 'inner', 'left' or 'right'.
+
+        Returns:
+            iterator of dict: The merged rows, produced as the probe side is read.
+        """
         _, left_column = left_field.split('.')
         _, right_column = right_field.split('.')
+        merge = self.make_row_merger(main_alias, join_alias, select_columns)
+
+        # Build on the smaller input; outer joins keep unmatched rows of whichever side is preserved.
+        # A streamed main input is buffered until it is known to be either smaller than the join
+        # input and within the memory budget, or not; only then can it be the build side.
+        if not hasattr(main_data, '__len__'):
+            main_data = iter(main_data)
+            limit = min(len(join_data), self.hash_join_memory_rows)
+            buffered = list(itertools.islice(main_data, limit + 1))
+            main_data = buffered if len(buffered) <= limit else itertools.chain(buffered, main_data)
+        if hasattr(main_data, '__len__') and len(main_data) <= len(join_data):
+            build, build_column, probe, probe_column = main_data, left_column, join_data, right_column
+            keep_build, keep_probe = join_type == 'left', join_type == 'right'
+            emit = merge
+        else:
+            build, build_column, probe, probe_column = join_data, right_column, main_data, left_column
+            keep_build, keep_probe = join_type == 'right', join_type == 'left'
+            emit = lambda build_row, probe_row: merge(probe_row, build_row)
+
+        if self.parallel_degree > 1 and len(build) >= self.parallel_join_min_rows:
+            plan = self.merge_plan(main_alias, join_alias, select_columns)
+            return self.parallel_executor().hash_join(build, build_column, probe, probe_column, keep_build, keep_probe,
+                                                      plan, build is main_data, self.hash_join_memory_rows,
+                                                      self.spill_directory)
+        if len(build) > self.hash_join_memory_rows:
+            return self.grace_hash_join(build, build_column, probe, probe_column, keep_build, keep_probe, emit)
+        return self.hash_join_rows(build, build_column, probe, probe_column, keep_build, keep_probe, emit)
+
+    @staticmethod
+    def hash_join_rows(build, build_column, probe, probe_column, keep_build, keep_probe, emit):
+        """Join one build/probe pair in memory, yielding emit(build_row, probe_row) for each result."""
+        buckets = {}
+        unkeyed = []  # NULL keys never match, but an outer join still returns them
+        for row in build:
+            key = row.get(build_column)
+            if key is None:
+                unkeyed.append(row)
+            elif key in buckets:
+                buckets[key].append(row)
+            else:
+                buckets[key] = [row]
+
+        matched_keys = set()
+        for row in probe:
+            key = row.get(probe_column)
+            matches = buckets.get(key) if key is not None else None
+            if matches:
+                for build_row in matches:
+                    yield emit(build_row, row)
+                if keep_build:
+                    matched_keys.add(key)
+            elif keep_probe:
+                yield emit({}, row)
+
+        if keep_build:
+            for key, rows in buckets.items():
+                if key not in matched_keys:
+                    for build_row in rows:
+                        yield emit(build_row, {})
+            for build_row in unkeyed:
+                yield emit(build_row, {})
+
+    def grace_hash_join(self, build, build_column, probe, probe_column, keep_build, keep_probe, emit):
+        """
+        Partitioned (grace) hash join: spill both inputs to temporary files by key hash,
+        then join each partition pair in memory. Equal keys always land in the same pair.
+        """
+        partition_count = max(2, -(-2 * len(build) // self.hash_join_memory_rows))
+        build_parts = [SpillFile(self.spill_directory) for _ in range(partition_count)]
+        probe_parts = [SpillFile(self.spill_directory) for _ in range(partition_count)]
+        try:
+            for row in build:
+                build_parts[hash(row.get(build_column)) % partition_count].write(row)
+            for row in probe:
+                probe_parts[hash(row.get(probe_column)) % partition_count].write(row)
+
+            for build_part, probe_part in zip(build_parts, probe_parts):
+                yield from self.hash_join_rows(build_part, build_column, probe_part, probe_column, keep_build, keep_probe, emit)
+        finally:
+            for part in build_parts + probe_parts:
+                part.close()
+
+    def make_row_merger(self, main_alias, join_alias, select_columns):
+        """
+        Return a function (main_row, join_row) -> merged row with the same output as merge_rows,
+        with the 'alias.column' select list split once instead of for every row.
+        """
+        return self.row_merger(self.merge_plan(main_alias, join_alias, select_columns))
+
+    @staticmethod
+    def merge_plan(main_alias, join_alias, select_columns):
+        """Split the select list into (output name, from main side, column name) triples."""
+        plan = []
+        for col in select_columns:
+            table_alias, column_name = col.split('.')
+            if table_alias == main_alias:
+                plan.append((col, True, column_name))
+            elif table_alias == join_alias:
+                plan.append((col, False, column_name))
+        return plan
+
+    @staticmethod
+    def row_merger(plan):
+        """Return the function (main_row, join_row) -> merged row for a merge plan."""
+        def merge(main_row, join_row):
+            return {col: (main_row if from_main else join_row).get(column_name) for col, from_main, column_name in plan}
+        return merge
+        
+    def merge_join(self, main_data, join_data, left_field, right_field, main_alias, join_alias, select_columns, join_type,
+                   join_index=None):
+        """
+        Equi-join two inputs by sorting both on the join key and merging them.
+
+        Inputs are sorted with the external sort, so inputs larger than sort_memory_rows
+        are sorted in runs on disk; a join input with a B-tree index on its join column
+        is read in key order from the index instead. Every pair of rows with equal keys
+        is returned, including duplicate keys on both sides; NULL keys never match.
 
-        # Sort data based on these extracted column names
-        main_data.sort(key=lambda x: x.get(left_column))
-        join_data.sort(key=lambda x: x.get(right_column))
+        Args:
+            join_index (BTree): The index of join_data (a Table) on its join column, or None.
+
+        Returns:
+            list[dict]: The merged rows.
+        """
+        _, left_column = left_field.split('.')
+        _, right_column = right_field.split('.')
+        merge = self.make_row_merger(main_alias, join_alias, select_columns)
+        keep_main, keep_join = join_type == 'left', join_type == 'right'
 
-        i, j = 0, 0
         result = []
-        while i < len(main_data) and j < len(join_data):
-            while i < len(main_data) and j < len(join_data) and main_data[i][left_column] < join_data[j][right_column]:
-                if join_type == 'left':
-                    # For LEFT JOIN, add main data with None for join columns if no match
-                    merged_row = self.merge_rows(main_data[i], {}, main_alias, join_alias, select_columns)
-                    result.append(merged_row)
-                i += 1
-            while i < len(main_data) and j < len(join_data) and main_data[i][left_column] > join_data[j][right_column]:
-                if join_type == 'right':
-                    # For RIGHT JOIN, add join data with None for main columns if no match
-                    merged_row = self.merge_rows({}, join_data[j], main_alias, join_alias, select_columns)
-                    result.append(merged_row)
-                j += 1
-            while i < len(main_data) and j < len(join_data) and main_data[i][left_column] == join_data[j][right_column]:
-                # Add matched rows
-                merged_row = self.merge_rows(main_data[i], join_data[j], main_alias, join_alias, select_columns)
-                result.append(merged_row)
-                i += 1
-                j += 1
+        unkeyed_main, unkeyed_join = [], []
+        main_sorted = external_sort(self.keyed_rows(main_data, left_column, unkeyed_main),
+                                    lambda row: row[left_column], memory_rows=self.sort_memory_rows, directory=self.spill_directory)
+        if join_index is not None:
+            # The index holds every non-NULL key, in order, with the positions of its rows
+            join_sorted = (join_data.row(position) for positions in join_index.values() for position in positions)
+            if keep_join:
+                unkeyed_join = [join_data.row(position)
+                                for position, key in enumerate(join_data.column(right_column)) if key is None]
+        else:
+            join_sorted = external_sort(self.keyed_rows(join_data, right_column, unkeyed_join),
+                                        lambda row: row[right_column], memory_rows=self.sort_memory_rows, directory=self.spill_directory)
+        main_groups = itertools.groupby(main_sorted, key=lambda row: row[left_column])
+        join_groups = itertools.groupby(join_sorted, key=lambda row: row[right_column])
+        main_key, main_rows = next(main_groups, (None, None))
+        join_key, join_rows = next(join_groups, (None, None))
+
+        while main_rows is not None and join_rows is not None:
+            if main_key < join_key:
+                if keep_main:
+                    result.extend(merge(row, {}) for row in main_rows)
+                main_key, main_rows = next(main_groups, (None, None))
+            elif join_key < main_key:
+                if keep_join:
+                    result.extend(merge({}, row) for row in join_rows)
+                join_key, join_rows = next(join_groups, (None, None))
+            else:
+                # Equal keys: every main row of the group pairs with every join row of the group
+                matches = list(join_rows)
+                for main_row in main_rows:
+                    result.extend(merge(main_row, join_row) for join_row in matches)
+                main_key, main_rows = next(main_groups, (None, None))
+                join_key, join_rows = next(join_groups, (None, None))
 
         # Handle remaining rows after main loop for outer joins
-        if join_type == 'left':
-            while i < len(main_data):
-                merged_row = self.merge_rows(main_data[i], {}, main_alias, join_alias, select_columns)
-                result.append(merged_row)
-                i += 1
-        elif join_type == 'right':
-            while j < len(join_data):
-                merged_row = self.merge_rows({}, join_data[j], main_alias, join_alias, select_columns)
-                result.append(merged_row)
-                j += 1
-
+        if keep_main:
+            while main_rows is not None:
+                result.extend(merge(row, {}) for row in main_rows)
+                main_key, main_rows = next(main_groups, (None, None))
+            result.extend(merge(row, {}) for row in unkeyed_main)
+        elif keep_join:
+            while join_rows is not None:
+                result.extend(merge({}, row) for row in join_rows)
+                join_key, join_rows = next(join_groups, (None, None))
+            result.extend(merge({}, row) for row in unkeyed_join)
         return result
 
+    @staticmethod
+    def keyed_rows(rows, column, unkeyed):
+        """Yield the rows with a non-NULL join key, setting the others aside in 'unkeyed'."""
+        for row in rows:
+            if row.get(column) is None:
+                unkeyed.append(row)
+            else:
+                yield row
+
     def nested_loop_join(self, main_data, join_data, left_field, right_field, main_alias, join_alias, select_columns, join_type):
         # Split fields to remove the table alias if present
         _, left_column = left_field.split('.')
@@ -439,73 +864,90 @@ class ExecutionEngine:
         return joined_data          
     
 
-    def parse_columns_for_aggregation(self, columns):
-        # This regex now correctly captures potential spaces around the AS keyword
-        agg_funcs = {}
-        for col in columns:
-            match = re.match(r'(\w+)\((\w+)\)\s*(AS\s*(\w+))?', col.strip(), re.IGNORECASE)
-            if match:
-                agg_func, column_name, _, alias = match.groups()
-                alias = alias or f"{agg_func.upper()}({column_name})"
-                agg_funcs[column_name] = (agg_func.upper(), alias)
-        return agg_funcs
-
-    def handle_order_by(self, data, order_by_clause):
-        import re
-        column, order = re.split(r'\s+', order_by_clause)
-        reverse = (order.upper() == 'DESC')
-        return sorted(data, key=lambda x: x[column], reverse=reverse)
-
-    def handle_having(self, grouped_data, having_clause):
-        # Example simple HAVING clause handler; expand as needed
-        data = self.filter_data_by_condition(grouped_data, having_clause)
-        return data
+    def handle_order_by(self, data, order_by, limit=None):
+        """
+        Sort rows by one or more ORDER BY terms. NULLs sort first, as the smallest value.
+
+        Args:
+            data (iterable of dict): The rows.
+            order_by (list of OrderItem): The parsed ORDER BY terms; aggregate terms are
+                already named by their key, e.g. AVG(col).
+            limit (int): Only the first this many rows are wanted; they are selected with
+                bounded memory instead of sorting everything.
+
+        Returns:
+            list of dict: The sorted rows.
+        """
+        terms = [(item.column, item.descending) for item in order_by]
+        if not terms:
+            return list(data)
+        directions = {descending for _, descending in terms}
+
+        if len(directions) == 1:
+            key = order_key([column for column, _ in terms])
+            reverse = directions.pop()
+            if limit is not None:
+                return top_n(data, limit, key, reverse)
+            return self.sort_rows(data, key, reverse)
+
+        if limit is None and isinstance(data, list) and len(data) <= self.sort_memory_rows:
+            # Mixed directions: stable sorts from the last term to the first
+            data = list(data)
+            for column, descending in reversed(terms):
+                data.sort(key=order_key([column]), reverse=descending)
+            return data
+
+        # Otherwise a key that compares each term in its own direction
+        plain_key = order_key([column for column, _ in terms])
+        descending = [descending for _, descending in terms]
+        key = lambda row: OrderKey(plain_key(row), descending)
+        if limit is not None:
+            return top_n(data, limit, key)
+        return self.sort_rows(data, key)
+
+    def sort_rows(self, data, key, reverse=False):
+        # Sort in memory when the rows fit the budget, otherwise by an external merge sort
+        if isinstance(data, list) and len(data) <= self.sort_memory_rows:
+            return sorted(data, key=key, reverse=reverse)
+        return list(external_sort(data, key, reverse, self.sort_memory_rows, self.spill_directory))
+
+    def handle_limit(self, data, limit, offset=0):
+        # Apply LIMIT/OFFSET to the (already ordered) rows
+        stop = None if limit is None else offset + limit
+        return list(itertools.islice(data, offset, stop))
+
+    def handle_having(self, grouped_data, having):
+        # The HAVING condition tree refers to aggregates by their keys, e.g. COUNT(*) > 1
+        return filter(compile_condition(having), grouped_data)
         
     def handle_insert(self, command):
+        rows = command.get('rows')
+        if rows and len(rows) > 1:
+            return self.dml_manager.insert_many(command['table'], rows)
         return self.dml_manager.insert(command['table'], command['data'])
 
+    def handle_copy(self, command):
+        return self.dml_manager.copy(command['table'], command['path'])
+
     def handle_delete(self, command):
-        return self.dml_manager.delete(command['table'], command['conditions'])
+        # Let an index narrow down the victims when the condition pins an indexed column
+        lookup = self.find_index_lookup(command['table'], {'where_clause': command['conditions']})
+        return self.dml_manager.delete(command['table'], command['conditions'], lookup)
 
     def handle_update(self, command):
-        return self.dml_manager.update(command['tables'], command['values'], command['where_condition'])
+        lookup = self.find_index_lookup(command['tables'], {'where_clause': command['where_condition']})
+        return self.dml_manager.update(command['tables'], command['values'], command['where_condition'],
+                                       command.get('expressions'), lookup)
 
     def handle_unsupported(self, command):
         return "Unsupported command type"
     
-    def handle_group_by(self, data, group_by_column, columns):
-        grouped_data = {}
-        agg_funcs = self.parse_columns_for_aggregation(columns)
-
-        # Grouping data
-        for row in data:
-            key = row[group_by_column]
-            if key not in grouped_data:
-                grouped_data[key] = []
-            grouped_data[key].append(row)
-
-        # Applying aggregation
-        result = []
-        for key, rows in grouped_data.items():
-            aggregated_row = {group_by_column: key}
-            for column_name, (agg_func, alias) in agg_funcs.items():
-                column_values = [self.safe_convert_to_numeric(row[column_name]) for row in rows if column_name in row and row[column_name] is not None]
-                if column_values:
-                    if agg_func == 'AVG':
-                        aggregated_row[alias] = sum(column_values) / len(column_values)
-                    elif agg_func == 'SUM':
-                        aggregated_row[alias] = sum(column_values)
-                    elif agg_func == 'MAX':
-                        aggregated_row[alias] = max(column_values)
-                    elif agg_func == 'MIN':
-                        aggregated_row[alias] = min(column_values)
-                    elif agg_func == 'COUNT':
-                        aggregated_row[alias] = len(column_values)
-            result.append(aggregated_row)
-
-        return result
-
     
+    def handle_group_by(self, data, command):
+        # GROUP BY may list several columns; aggregates used only in HAVING are computed too
+        group_columns, aggregates = self.aggregation_plan(command)
+        return HashAggregation(group_columns, aggregates).consume(data).results()
+
     def finalize_query_results(self, data, columns):
         # Ensure results use correct aliases or column names
         final_results = []
@@ -564,93 +1006,10 @@ class ExecutionEngine:
             return f"Error dropping index: {e}"
     
     def parse_condition_to_function(self, where_clause):
-        def eval_condition(row, conditions):
-            if 'BETWEEN' in conditions and 'AND' in conditions:
-                pattern = r"(\w+)\s*(BETWEEN)\s*(.*)\s*(AND)\s*(.*)"
-                match = re.match(pattern, conditions.strip(), re.IGNORECASE)
-                if not match:
-                    raise ValueError("Invalid BETWEEN clause format")
-                column, between_operator, value_1, and_operator, value_2 = match.groups()
-                # print([column, value_1, value_2])
-                return self.apply_operator(row, column.strip(), ">=", value_1.strip().strip("'")) and self.apply_operator(row, column.strip(), "<=", value_2.strip().strip("'"))
-            
-            if 'AND' in conditions and 'BETWEEN' not in conditions:
-                left, right = conditions.split('AND', 1)
-                return eval_condition(row, left.strip()) and eval_condition(row, right.strip())
-            if 'OR' in conditions:
-                left, right = conditions.split('OR', 1)
-                return eval_condition(row, left.strip()) or eval_condition(row, right.strip())
-            pattern = r"\(?(.*)\)?\s*(=|!|<>|<|>|<=|>=|LIKE|IN|BETWEEN)\s*(.*)"
-            match = re.match(pattern, conditions.strip(), re.IGNORECASE)
-            if not match:
-                raise ValueError("Invalid WHERE clause format")
-            column, operator, value = match.groups()
-            return self.apply_operator(row, column.strip(), operator.strip().upper(), value.strip().strip("'"))
-
-        return lambda row: eval_condition(row, where_clause)
-    
-    def apply_operator(self, row, column, operator, value):
-        #logging.debug(f"Applying operator: {operator} on column: {column} with value: {value}")
-        
-        if operator == "IN":
-            values = eval(value)
-            result = self.safe_convert_to_numeric_where(row.get(column)) in values
-            #logging.debug(f"IN operator result: {result}")
-            return result
-        elif operator == "LIKE":
-            regex = re.compile("^" + value.replace('%', '.*') + "$")
-            result = regex.match(row.get(column)) is not None
-            #logging.debug(f"LIKE operator result: {result}")
-            return result
-            """
-        elif "BETWEEN" in operator:
-            # Ensure proper handling of BETWEEN
-            value = value[len("BETWEEN"):].strip()  # Remove the 'BETWEEN' keyword and strip any leading/trailing whitespace
-            """
-        else:
-            value = self.safe_convert_to_numeric_where(value)
-            if operator == "=": operator = "=="
-            # elif operator == "!=": operator = "!="  # No change needed, just making it explicit
-            result = self.compare_values(row.get(column), value, operator)
-            #logging.debug(f"Comparison operator {operator} result: {result}")
-            return result
+        # Parse the clause once into an expression tree and compile it to a closure;
+        # literals, IN sets and LIKE patterns are converted up front, not per row
+        return condition_to_function(where_clause)
 
-    
-    def compare_values(self, row_value, value, operator):
-        # First, ensure that values are properly converted or reported if None
-        row_value = self.safe_convert_to_numeric_where(row_value)
-        value = self.safe_convert_to_numeric_where(value)
-
-        # Add logging to check values just before comparison
-        #logging.debug(f"Pre-comparison: Row Value: {row_value} ({type(row_value)}), Value: {value} ({type(value)}), Operator: {operator}")
-        
-        if operator == "!":
-            return row_value != value
-        elif operator == "==":
-            return row_value == value
-        elif operator == "<":
-            return row_value < value
-        elif operator == ">":
-            return row_value > value
-        elif operator == "<=":
-            return row_value <= value
-        elif operator == ">=":
-            return row_value >= value
-
-
-    def safe_convert_to_numeric_where(self, value):
-        try:
-            if value is None:
-                #logging.debug("Received None value; original value is None.")
-                return None
-            return int(value)
-        except ValueError:
-            try:
-                return float(value)
-            except ValueError:
-                #logging.error(f"Conversion failed for value: {value}, returning None.")
-                return value
-            
 # Example usage
 if __name__ == "__main__":
     engine = ExecutionEngine()
\ No newline at end of file
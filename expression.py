@@ -0,0 +1,596 @@
+# EXPRESSION.py
+
+import copy
+import operator
+import re
+
+# Tokens of a condition: quoted strings, numbers, names (optionally dotted), operators and punctuation
+TOKEN_PATTERN = re.compile(r"""
+    \s*(?:
+        (?P<string>'(?:[^']|'')*'|"(?:[^"]|"")*")
+      | (?P<number>\d+\.\d*|\.\d+|\d+)
+      | (?P<name>[A-Za-z_][\w.]*)
+      | (?P<op><=|>=|<>|!=|==|[=<>!(),*+\-/;?])
+    )""", re.VERBOSE)
+
+KEYWORDS = {'AND', 'OR', 'NOT', 'BETWEEN', 'IN', 'LIKE', 'IS', 'NULL'}
+
+COMPARATORS = {
+    '=': operator.eq,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<>': operator.ne,
+    '!': operator.ne,
+    '<': operator.lt,
+    '>': operator.gt,
+    '<=': operator.le,
+    '>=': operator.ge,
+}
+
+
+def to_numeric(value):
+    """Convert a value to int or float when it looks numeric, otherwise return it unchanged."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError:
+            return value
+
+
+def scan_tokens(text):
+    """
+    Split text into (kind, value, start, end) tokens, where start:end is the token's span in text.
+
+    Raises:
+        ValueError: If the text contains a character that cannot start a token.
+    """
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN_PATTERN.match(text, position)
+        if not match:
+            raise ValueError(f"Unexpected character in condition: {text[position:]!r}")
+        position = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        start = match.start(kind)
+        if kind == 'name' and value.upper() in KEYWORDS:
+            kind, value = 'keyword', value.upper()
+        tokens.append((kind, value, start, position))
+    return tokens
+
+
+def tokenize(text):
+    """
+    Split condition text into (kind, value) tokens.
+
+    Args:
+        text (str): The condition text.
+
+    Returns:
+        list of tuple: Tokens where kind is 'string', 'number', 'name', 'keyword' or 'op'.
+
+    Raises:
+        ValueError: If the text contains a character that cannot start a token.
+    """
+    tokens = [(kind, value) for kind, value, _, _ in scan_tokens(text)]
+    # A trailing statement terminator is not part of the condition
+    while tokens and tokens[-1] == ('op', ';'):
+        tokens.pop()
+    return tokens
+
+
+class Expression:
+    """Base class of the nodes of a parsed condition."""
+
+    def __repr__(self):
+        fields = ', '.join(f"{key}={value!r}" for key, value in vars(self).items())
+        return f"{type(self).__name__}({fields})"
+
+    def __eq__(self, other):
+        return type(self) is type(other) and vars(self) == vars(other)
+
+    def __hash__(self):
+        return hash(repr(self))
+
+
+class And(Expression):
+    def __init__(self, conditions):
+        self.conditions = conditions
+
+
+class Or(Expression):
+    def __init__(self, conditions):
+        self.conditions = conditions
+
+
+class Not(Expression):
+    def __init__(self, condition):
+        self.condition = condition
+
+
+class Comparison(Expression):
+    def __init__(self, column, operator, value):
+        self.column = column
+        self.operator = operator
+        self.value = value
+
+
+class Between(Expression):
+    def __init__(self, column, low, high):
+        self.column = column
+        self.low = low
+        self.high = high
+
+
+class In(Expression):
+    def __init__(self, column, values):
+        self.column = column
+        self.values = values
+
+
+class Like(Expression):
+    def __init__(self, column, pattern):
+        self.column = column
+        self.pattern = pattern
+
+
+class IsNull(Expression):
+    def __init__(self, column):
+        self.column = column
+
+
+class Parameter(Expression):
+    """A '?' placeholder, bound to a value of the Python type it is given."""
+
+    def __init__(self, index):
+        self.index = index
+
+
+class ConditionParser:
+    """
+    Recursive-descent parser for WHERE/HAVING conditions.
+
+    Precedence from loosest to tightest: OR, AND, NOT, then a single predicate
+    (comparison, BETWEEN, IN, LIKE, IS NULL) or a parenthesized condition.
+    The right-hand side of a predicate is always a literal; bare words are
+    read as strings, as in ``state_code = AK``. Quoted literals stay strings, so
+    ``zip = '02134'`` keeps its leading zero; compile_comparison compares them as
+    numbers only against numeric column values.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+        self.parameters = 0  # '?' placeholders read so far
+
+    def peek(self, offset=0):
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def advance(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def accept(self, kind, value=None):
+        token_kind, token_value = self.peek()
+        if token_kind == kind and (value is None or token_value == value):
+            self.position += 1
+            return True
+        return False
+
+    def expect(self, kind, value=None):
+        if not self.accept(kind, value):
+            raise ValueError(f"Expected {value or kind} in condition, found {self.peek()[1]!r}")
+
+    def parse(self):
+        if not self.tokens:
+            raise ValueError("Empty condition")
+        condition = self.parse_or()
+        if self.position != len(self.tokens):
+            raise ValueError(f"Unexpected {self.peek()[1]!r} in condition")
+        return condition
+
+    def parse_or(self):
+        conditions = [self.parse_and()]
+        while self.accept('keyword', 'OR'):
+            conditions.append(self.parse_and())
+        return conditions[0] if len(conditions) == 1 else Or(conditions)
+
+    def parse_and(self):
+        conditions = [self.parse_not()]
+        while self.accept('keyword', 'AND'):
+            conditions.append(self.parse_not())
+        return conditions[0] if len(conditions) == 1 else And(conditions)
+
+    def parse_not(self):
+        if self.accept('keyword', 'NOT'):
+            return Not(self.parse_not())
+        return self.parse_predicate()
+
+    def parse_predicate(self):
+        if self.accept('op', '('):
+            condition = self.parse_or()
+            self.expect('op', ')')
+            return condition
+
+        column = self.parse_column()
+        negated = self.accept('keyword', 'NOT')
+        kind, value = self.peek()
+
+        if kind == 'keyword' and value == 'BETWEEN':
+            self.advance()
+            low = self.parse_literal()
+            self.expect('keyword', 'AND')
+            condition = Between(column, low, self.parse_literal())
+        elif kind == 'keyword' and value == 'IN':
+            self.advance()
+            self.expect('op', '(')
+            values = [self.parse_literal()]
+            while self.accept('op', ','):
+                values.append(self.parse_literal())
+            self.expect('op', ')')
+            condition = In(column, values)
+        elif kind == 'keyword' and value == 'LIKE':
+            self.advance()
+            pattern = self.parse_literal(convert=False)
+            condition = Like(column, pattern if isinstance(pattern, Parameter) else str(pattern))
+        elif kind == 'keyword' and value == 'IS' and not negated:
+            self.advance()
+            negated = self.accept('keyword', 'NOT')
+            self.expect('keyword', 'NULL')
+            condition = IsNull(column)
+        elif kind == 'op' and value in COMPARATORS and not negated:
+            self.advance()
+            condition = Comparison(column, value, self.parse_literal())
+        else:
+            raise ValueError(f"Invalid condition near {value!r}")
+        return Not(condition) if negated else condition
+
+    def parse_column(self):
+        kind, value = self.advance()
+        if kind != 'name':
+            raise ValueError(f"Expected a column name in condition, found {value!r}")
+        if self.accept('op', '('):
+            # Aggregate references such as COUNT(col) name a column of grouped rows
+            argument = '*' if self.accept('op', '*') else self.parse_column()
+            self.expect('op', ')')
+            return f"{value.upper()}({argument})"
+        return value
+
+    def parse_literal(self, convert=True):
+        kind, value = self.advance()
+        if kind == 'op' and value == '?':
+            self.parameters += 1
+            return Parameter(self.parameters - 1)
+        if kind == 'op' and value == '-' and self.peek()[0] == 'number':
+            return -to_numeric(self.advance()[1])
+        if kind == 'number':
+            return to_numeric(value)
+        if kind == 'string':
+            return value[1:-1].replace(value[0] * 2, value[0])
+        if kind == 'keyword' and value == 'NULL':
+            return None
+        if kind == 'name':
+            return to_numeric(value) if convert else value
+        raise ValueError(f"Expected a value in condition, found {value!r}")
+
+
+class Column(Expression):
+    def __init__(self, name):
+        self.name = name
+
+
+class Literal(Expression):
+    def __init__(self, value):
+        self.value = value
+
+
+class Arithmetic(Expression):
+    def __init__(self, operator, left, right):
+        self.operator = operator
+        self.left = left
+        self.right = right
+
+
+class ValueParser(ConditionParser):
+    """
+    Parser for value expressions such as ``salary * 2 + bonus`` in UPDATE ... SET.
+
+    Unlike the right-hand side of a condition, bare names here are column references.
+    """
+
+    def parse(self):
+        if not self.tokens:
+            raise ValueError("Empty expression")
+        expression = self.parse_sum()
+        if self.position != len(self.tokens):
+            raise ValueError(f"Unexpected {self.peek()[1]!r} in expression")
+        return expression
+
+    def parse_sum(self):
+        expression = self.parse_product()
+        while self.peek() in (('op', '+'), ('op', '-')):
+            expression = Arithmetic(self.advance()[1], expression, self.parse_product())
+        return expression
+
+    def parse_product(self):
+        expression = self.parse_factor()
+        while self.peek() in (('op', '*'), ('op', '/')):
+            expression = Arithmetic(self.advance()[1], expression, self.parse_factor())
+        return expression
+
+    def parse_factor(self):
+        kind, value = self.peek()
+        if kind == 'op' and value == '(':
+            self.advance()
+            expression = self.parse_sum()
+            self.expect('op', ')')
+            return expression
+        if kind == 'op' and value == '-':
+            self.advance()
+            return Arithmetic('-', Literal(0), self.parse_factor())
+        if kind == 'name':
+            self.advance()
+            return Column(value)
+        return Literal(self.parse_literal())
+
+
+def parse_value_expression(text):
+    """
+    Parse an arithmetic value expression into a tree of Column, Literal and Arithmetic nodes.
+
+    Raises:
+        ValueError: If the expression is malformed.
+    """
+    if not text or not text.strip():
+        raise ValueError("Empty expression")
+    return ValueParser(tokenize(text)).parse()
+
+
+def divide(left, right):
+    # Integer operands divide like SQL integers: the quotient is truncated toward zero
+    if isinstance(left, int) and isinstance(right, int):
+        quotient = abs(left) // abs(right)
+        return quotient if (left >= 0) == (right >= 0) else -quotient
+    return left / right
+
+
+ARITHMETIC_OPERATORS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': divide,
+}
+
+
+def compile_value_expression(expression):
+    """
+    Compile a value expression tree into a closure taking a row and returning the value.
+
+    NULL operands give NULL, as do non-numeric operands of arithmetic.
+    """
+    if isinstance(expression, Literal):
+        value = expression.value
+        return lambda row: value
+    if isinstance(expression, Column):
+        name = expression.name
+        return lambda row: row.get(name)
+    if isinstance(expression, Arithmetic):
+        apply = ARITHMETIC_OPERATORS[expression.operator]
+        left = compile_value_expression(expression.left)
+        right = compile_value_expression(expression.right)
+
+        def evaluate(row):
+            left_value, right_value = to_numeric(left(row)), to_numeric(right(row))
+            if not isinstance(left_value, (int, float)) or not isinstance(right_value, (int, float)):
+                return None
+            if expression.operator == '/' and right_value == 0:
+                raise ValueError("Division by zero")
+            return apply(left_value, right_value)
+        return evaluate
+    raise ValueError(f"Cannot compile expression {expression!r}")
+
+
+def parse_condition(text):
+    """
+    Parse WHERE/HAVING text into an expression tree.
+
+    Args:
+        text (str): The condition, e.g. "A IN (2,3,4) AND B LIKE 'x%'".
+
+    Returns:
+        Expression: The root of the tree.
+
+    Raises:
+        ValueError: If the condition is malformed.
+    """
+    if not text or not text.strip():
+        raise ValueError("Empty condition")
+    return ConditionParser(tokenize(text)).parse()
+
+
+def parameter_binder(node):
+    """
+    Compile the binding of a parsed tree's Parameter nodes to values.
+
+    Only the nodes on the path to a Parameter are copied when binding; the rest of
+    the tree is shared, so parsed trees must not be changed in place.
+
+    Args:
+        node: An Expression, or a list of them.
+
+    Returns:
+        callable or None: A function values -> bound copy of the tree, where values
+        are indexed by Parameter.index; None if the tree has no Parameter.
+    """
+    if isinstance(node, Parameter):
+        index = node.index
+        return lambda values: values[index]
+
+    if isinstance(node, list):
+        binders = [parameter_binder(item) for item in node]
+        if not any(binders):
+            return None
+        parts = list(zip(binders, node))
+        return lambda values: [item if binder is None else binder(values) for binder, item in parts]
+
+    if not isinstance(node, Expression):
+        return None
+    fields = []
+    for name, value in vars(node).items():
+        binder = parameter_binder(value)
+        if binder is not None:
+            fields.append((name, binder))
+    if not fields:
+        return None
+    node_type, state, is_like = type(node), vars(node), isinstance(node, Like)
+
+    def bind(values):
+        bound = node_type.__new__(node_type)
+        bound.__dict__.update(state)
+        for name, binder in fields:
+            setattr(bound, name, binder(values))
+        if is_like:
+            bound.pattern = str(bound.pattern)
+        return bound
+    return bind
+
+
+def condition_columns(condition):
+    """Return the set of column names a condition refers to."""
+    if isinstance(condition, (And, Or)):
+        return set().union(*(condition_columns(part) for part in condition.conditions))
+    if isinstance(condition, Not):
+        return condition_columns(condition.condition)
+    return {condition.column}
+
+
+def rename_columns(condition, rename):
+    """Return a copy of a condition with every column name passed through rename(name)."""
+    if isinstance(condition, (And, Or)):
+        return type(condition)([rename_columns(part, rename) for part in condition.conditions])
+    if isinstance(condition, Not):
+        return Not(rename_columns(condition.condition, rename))
+    renamed = copy.copy(condition)
+    renamed.column = rename(condition.column)
+    return renamed
+
+
+def like_to_regex(pattern):
+    """Translate a SQL LIKE pattern ('%' any run, '_' one character) to a compiled regex."""
+    parts = []
+    for char in pattern:
+        if char == '%':
+            parts.append('.*')
+        elif char == '_':
+            parts.append('.')
+        else:
+            parts.append(re.escape(char))
+    return re.compile(''.join(parts), re.DOTALL)
+
+
+def compare_mixed(compare, value, literal):
+    """Slow path of a comparison whose row value and literal have different types."""
+    value = to_numeric(value)
+    if value is None:
+        return compare is operator.ne
+    try:
+        return compare(value, literal)
+    except TypeError:
+        return False
+
+
+def compile_condition(condition):
+    """
+    Compile an expression tree into a predicate closure taking a row.
+
+    Column names, converted literals, IN sets and LIKE regexes are bound once,
+    so evaluating a row does no parsing.
+
+    Args:
+        condition (Expression): A tree from parse_condition.
+
+    Returns:
+        callable: A function row -> bool; rows only need a get() method.
+    """
+    if isinstance(condition, And):
+        parts = [compile_condition(part) for part in condition.conditions]
+        if len(parts) == 2:
+            first, second = parts
+            return lambda row: first(row) and second(row)
+        return lambda row: all(part(row) for part in parts)
+
+    if isinstance(condition, Or):
+        parts = [compile_condition(part) for part in condition.conditions]
+        if len(parts) == 2:
+            first, second = parts
+            return lambda row: first(row) or second(row)
+        return lambda row: any(part(row) for part in parts)
+
+    if isinstance(condition, Not):
+        inner = compile_condition(condition.condition)
+        return lambda row: not inner(row)
+
+    if isinstance(condition, Comparison):
+        return compile_comparison(condition.column, COMPARATORS[condition.operator], condition.value)
+
+    if isinstance(condition, Between):
+        at_least = compile_comparison(condition.column, operator.ge, condition.low)
+        at_most = compile_comparison(condition.column, operator.le, condition.high)
+        return lambda row: at_least(row) and at_most(row)
+
+    if isinstance(condition, In):
+        column = condition.column
+        values = frozenset(condition.values)
+        numbers = frozenset(to_numeric(value) for value in condition.values)
+
+        def predicate(row):
+            value = row.get(column)
+            if value in values:
+                return True
+            if isinstance(value, str):
+                return to_numeric(value) in values
+            return value in numbers
+        return predicate
+
+    if isinstance(condition, Like):
+        column = condition.column
+        match = like_to_regex(condition.pattern).fullmatch
+
+        def predicate(row):
+            value = row.get(column)
+            if value is None:
+                return False
+            return match(value if isinstance(value, str) else str(value)) is not None
+        return predicate
+
+    if isinstance(condition, IsNull):
+        column = condition.column
+        return lambda row: row.get(column) is None
+
+    raise ValueError(f"Cannot compile condition {condition!r}")
+
+
+def compile_comparison(column, compare, literal):
+    literal_type = type(literal)
+    # A quoted literal is compared as text with text values, and as a number with numeric ones
+    numeric = to_numeric(literal) if literal_type is str else literal
+
+    def predicate(row):
+        value = row.get(column)
+        if type(value) is literal_type:
+            return compare(value, literal)
+        return compare_mixed(compare, value, numeric)
+    return predicate
+
+
+def condition_to_function(text):
+    """Parse and compile condition text in one step."""
+    return compile_condition(parse_condition(text))
@@ -0,0 +1,111 @@
+# LOCKING.py
+
+import contextlib
+import threading
+
+
+class ReadWriteLock:
+    """
+    A lock that many readers can hold at once, or one writer alone.
+
+    Writers are preferred: once a writer is waiting, new readers wait behind it, so a
+    steady stream of SELECTs cannot starve an UPDATE.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition(threading.Lock())
+        self.readers = 0
+        self.writer = False
+        self.waiting_writers = 0
+
+    def acquire_read(self):
+        with self.condition:
+            while self.writer or self.waiting_writers:
+                self.condition.wait()
+            self.readers += 1
+
+    def release_read(self):
+        with self.condition:
+            self.readers -= 1
+            if self.readers == 0:
+                self.condition.notify_all()
+
+    def acquire_write(self):
+        with self.condition:
+            self.waiting_writers += 1
+            try:
+                while self.writer or self.readers:
+                    self.condition.wait()
+            finally:
+                self.waiting_writers -= 1
+            self.writer = True
+
+    def release_write(self):
+        with self.condition:
+            self.writer = False
+            self.condition.notify_all()
+
+    @contextlib.contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextlib.contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+class LockManager:
+    """
+    Statement-level locking: a catalog lock plus one reader/writer lock per table.
+
+    Every DML statement or query holds the catalog lock shared, then its tables' locks
+    (shared for tables it reads, exclusive for the table it writes). DDL holds the
+    catalog lock exclusively, so schemas never change under a running statement.
+    Table locks are always taken in name order, which rules out deadlocks between
+    statements that lock several tables.
+    """
+
+    def __init__(self):
+        self.catalog = ReadWriteLock()
+        self.tables = {}
+        self.mutex = threading.Lock()
+
+    def table_lock(self, table_name):
+        with self.mutex:
+            lock = self.tables.get(table_name)
+            if lock is None:
+                lock = self.tables[table_name] = ReadWriteLock()
+            return lock
+
+    @contextlib.contextmanager
+    def statement(self, read_tables=(), write_tables=()):
+        """
+        Hold the locks a statement needs for as long as the with-block runs.
+
+        Args:
+            read_tables (iterable of str): Tables the statement reads.
+            write_tables (iterable of str): Tables the statement changes; a table in both
+                sets is locked for writing.
+        """
+        write_tables = set(write_tables)
+        modes = {table: 'read' for table in read_tables}
+        modes.update({table: 'write' for table in write_tables})
+        with self.catalog.read(), contextlib.ExitStack() as stack:
+            for table in sorted(modes):
+                lock = self.table_lock(table)
+                stack.enter_context(lock.write() if modes[table] == 'write' else lock.read())
+            yield
+
+    @contextlib.contextmanager
+    def exclusive(self):
+        """Hold the catalog lock exclusively, e.g. for CREATE or DROP; waits for running statements."""
+        with self.catalog.write():
+            yield
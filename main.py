@@ -1,14 +1,14 @@
 # main.py
 import time
 from query_input_manager import handle_input
-from storage import StorageManager
+from storage import get_storage_manager
 
 def main():
     print("Welcome to MyDBMS")
     print("Type SQL commands or 'exit' to quit.")
     
-    storage_manager = StorageManager()  # Initialize storage manager
-    storage_manager.define_schemas()  # Define schemas explicitly if not loaded from CSV
+    storage_manager = get_storage_manager()  # Shared with the execution engine
+    session = {}  # Statements PREPAREd in this console
     
     while True:
         user_input = input("dbms> ").strip()
@@ -18,7 +18,7 @@ def main():
         if user_input.startswith("'") and user_input.endswith("'"):
             user_input = user_input[1:-1]  # Remove single quotes around the command
         start_time = time.time()
-        result, error = handle_input(user_input)
+        result, error = handle_input(user_input, session=session)
         if error:
             print("Error:", error)
         elif result:
@@ -0,0 +1,190 @@
+# PARALLEL.py
+
+import collections
+import concurrent.futures
+import multiprocessing
+import threading
+from array import array
+from aggregation import HashAggregation
+from expression import compile_condition
+from spill import SpillFile
+from table import RowCursor
+
+
+def partition_ranges(length, parts):
+    """Split positions [0, length) into up to 'parts' contiguous (start, stop) ranges of near-equal size."""
+    parts = max(1, min(parts, length))
+    size, extra = divmod(length, parts)
+    ranges = []
+    start = 0
+    for part in range(parts):
+        stop = start + size + (1 if part < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+# Worker functions: they run in another process, so they take only picklable arguments
+# (a table chunk and the WHERE tree, compiled again in the worker) and return compact results.
+
+def filter_chunk(chunk, offset, condition):
+    """Return the positions (offset into the whole table) of the chunk's rows matching the WHERE condition."""
+    predicate = compile_condition(condition)
+    cursor = RowCursor(chunk)
+    positions = array('q')
+    for position in range(len(chunk)):
+        cursor.position = position
+        if predicate(cursor):
+            positions.append(offset + position)
+    return positions
+
+
+def aggregate_chunk(chunk, offset, condition, group_columns, aggregates):
+    """Run the filter and a partial hash aggregation over one chunk; return its groups of accumulator slots."""
+    rows = chunk.scan(compile_condition(condition) if condition is not None else None)
+    return HashAggregation(group_columns, aggregates).consume(rows).groups
+
+
+def join_partition(build, build_column, probe, probe_column, keep_build, keep_probe, plan, build_is_main):
+    """Hash join one partition pair and return the merged rows as a list."""
+    from execution_engine import ExecutionEngine  # Imported here: the engine module imports this one
+    merge = ExecutionEngine.row_merger(plan)
+    emit = merge if build_is_main else (lambda build_row, probe_row: merge(probe_row, build_row))
+    return list(ExecutionEngine.hash_join_rows(build, build_column, probe, probe_column, keep_build, keep_probe, emit))
+
+
+class ParallelExecutor:
+    """
+    Runs scans and aggregations over large tables on a pool of worker processes.
+
+    A table is split into contiguous row ranges, one per worker; each range is sent
+    with the WHERE condition (and the aggregates) and the partial results are merged in
+    range order, so the output matches the serial plan: matching positions come back
+    in table order and groups keep their order of first appearance.
+    """
+
+    def __init__(self, degree=1):
+        """
+        Args:
+            degree (int): Number of worker processes; 1 runs everything in the calling process.
+        """
+        self.degree = degree
+        self.pool = None
+        self.pool_lock = threading.Lock()
+
+    def executor(self):
+        with self.pool_lock:
+            if self.pool is None:
+                # fork: spawned workers would re-import the main module, and with it build a second
+                # storage manager that replays the write-ahead log. Workers only run the chunk
+                # functions below, which touch none of the locks other threads may hold.
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+                self.pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.degree, mp_context=context)
+            return self.pool
+
+    def map_chunks(self, table, function, *args):
+        """
+        Call function(chunk, start, *args) for each row range of the table, on the pool
+        (or in this process when degree is 1).
+
+        Returns:
+            list: The results, in range order.
+        """
+        ranges = partition_ranges(len(table), self.degree)
+        if self.degree <= 1:
+            return [function(table.slice(start, stop), start, *args) for start, stop in ranges]
+        pool = self.executor()
+        futures = [pool.submit(function, table.slice(start, stop), start, *args) for start, stop in ranges]
+        return [future.result() for future in futures]
+
+    def filter_positions(self, table, condition):
+        """
+        Returns:
+            list of int: The positions of the rows matching the WHERE condition, in table order.
+        """
+        positions = []
+        for chunk_positions in self.map_chunks(table, filter_chunk, condition):
+            positions.extend(chunk_positions)
+        return positions
+
+    def aggregate(self, table, condition, group_columns, aggregates):
+        """
+        Returns:
+            HashAggregation: The merged aggregation over the rows matching the WHERE condition (None for all rows).
+        """
+        aggregation = HashAggregation(group_columns, aggregates)
+        for groups in self.map_chunks(table, aggregate_chunk, condition, list(group_columns), list(aggregates)):
+            aggregation.merge(groups)
+        return aggregation
+
+    def hash_join(self, build, build_column, probe, probe_column, keep_build, keep_probe, plan, build_is_main,
+                  memory_rows=None, spill_directory=None):
+        """
+        Partitioned parallel hash join: both inputs are split by the hash of their join key
+        into partitions, so equal keys always meet in the same pair, and each pair is
+        joined in a worker process. Only the columns the join and the select list use are
+        shipped. INNER, LEFT and RIGHT joins are supported through keep_build / keep_probe,
+        as in ExecutionEngine.hash_join_rows.
+
+        Within the memory budget there is one partition per worker. Above it the partitions
+        are written to temporary files, and made small enough that the ones in flight
+        (one per worker) hold about half the budget of build rows; each pair is read back
+        only when it is sent to a worker.
+
+        Args:
+            build, probe: Row dicts of the two inputs.
+            build_column, probe_column (str): The join key column of each side.
+            keep_build, keep_probe (bool): Keep unmatched rows of that side (outer joins).
+            plan (list): The merge plan, from ExecutionEngine.merge_plan.
+            build_is_main (bool): Whether the build side is the main table of the join.
+            memory_rows (int): Most build rows to hold in memory; None for no limit.
+            spill_directory (str): Where partitions over the budget go; None for the system temp directory.
+
+        Yields:
+            dict: The merged rows, partition by partition.
+        """
+        spilled = memory_rows is not None and len(build) > memory_rows
+        if spilled:
+            partitions = max(self.degree, -(-2 * self.degree * len(build) // memory_rows))
+            build_parts = [SpillFile(spill_directory) for _ in range(partitions)]
+            probe_parts = [SpillFile(spill_directory) for _ in range(partitions)]
+        else:
+            partitions = self.degree
+            build_parts = [[] for _ in range(partitions)]
+            probe_parts = [[] for _ in range(partitions)]
+        build_columns = [build_column] + [name for _, from_main, name in plan if from_main == build_is_main]
+        probe_columns = [probe_column] + [name for _, from_main, name in plan if from_main != build_is_main]
+        try:
+            for rows, column, columns, parts in ((build, build_column, build_columns, build_parts),
+                                                 (probe, probe_column, probe_columns, probe_parts)):
+                columns = list(dict.fromkeys(columns))
+                writers = [part.write if spilled else part.append for part in parts]
+                for row in rows:
+                    writers[hash(row.get(column)) % partitions]({name: row.get(name) for name in columns})
+
+            load = list if spilled else (lambda part: part)
+            arguments = ((load(build_part), build_column, load(probe_part), probe_column, keep_build, keep_probe,
+                          plan, build_is_main) for build_part, probe_part in zip(build_parts, probe_parts))
+            if self.degree <= 1:
+                for args in arguments:
+                    yield from join_partition(*args)
+                return
+            pool = self.executor()
+            pending = collections.deque()
+            for args in arguments:
+                pending.append(pool.submit(join_partition, *args))
+                if len(pending) >= self.degree:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            if spilled:
+                for part in build_parts + probe_parts:
+                    part.close()
+
+    def shutdown(self):
+        with self.pool_lock:
+            if self.pool is not None:
+                self.pool.shutdown()
+                self.pool = None
@@ -0,0 +1,77 @@
+# PROTOCOL.py
+
+import json
+import struct
+
+# Every message is a 4-byte big-endian length followed by that many bytes of UTF-8 JSON.
+# A request is {"sql": "..."}, plus "params": [...] for '?' placeholders;
+# a response is {"result": ..., "error": ...}, as from handle_input.
+HEADER = struct.Struct('!I')
+MAX_MESSAGE_SIZE = 256 * 1024 * 1024
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 5510
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def encode_message(message):
+    """Serialize a message (a JSON-compatible dict) into a length-prefixed frame."""
+    body = json.dumps(message, separators=(',', ':'), default=str).encode('utf-8')
+    return HEADER.pack(len(body)) + body
+
+
+def decode_body(body):
+    try:
+        return json.loads(body)
+    except ValueError as e:
+        raise ProtocolError(f"Malformed message: {e}")
+
+
+def check_length(length):
+    if length > MAX_MESSAGE_SIZE:
+        raise ProtocolError(f"Message of {length} bytes exceeds the {MAX_MESSAGE_SIZE} byte limit")
+    return length
+
+
+async def read_message(reader):
+    """
+    Read one message from an asyncio StreamReader.
+
+    Returns:
+        dict or None: The message, or None if the peer closed the connection between messages.
+    """
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except EOFError:
+        return None
+    (length,) = HEADER.unpack(header)
+    return decode_body(await reader.readexactly(check_length(length)))
+
+
+def receive_message(sock):
+    """Read one message from a blocking socket, or return None if the peer closed it."""
+    header = receive_exactly(sock, HEADER.size)
+    if header is None:
+        return None
+    (length,) = HEADER.unpack(header)
+    body = receive_exactly(sock, check_length(length))
+    if body is None:
+        raise ProtocolError("Connection closed in the middle of a message")
+    return decode_body(body)
+
+
+def receive_exactly(sock, size):
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = sock.recv(min(remaining, 1024 * 1024))
+        if not chunk:
+            if remaining == size:
+                return None
+            raise ProtocolError("Connection closed in the middle of a message")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
@@ -3,9 +3,21 @@ from sql_parser import parse_sql
 
 engine = ExecutionEngine()
 
-def handle_input(user_input):
+def handle_input(user_input, parameters=None, session=None):
+    """
+    Parse and run one statement.
+
+    Args:
+        user_input (str): The SQL text; it may contain '?' placeholders.
+        parameters (list): Values for the placeholders, in order.
+        session (dict): The caller's prepared statements, kept between calls; each
+            connection or console passes its own. Without one, PREPARE is refused.
+
+    Returns:
+        tuple: (result, error), one of them None.
+    """
     #print(f"Query_Input_debug: {user_input}")  # Log input SQL for debugging
-    command = parse_sql(user_input)
+    command = parse_sql(user_input, parameters, session)
 
     if command:
         if 'error' in command:
@@ -0,0 +1,123 @@
+# server.py
+import argparse
+import asyncio
+import concurrent.futures
+import logging
+import os
+from protocol import DEFAULT_HOST, DEFAULT_PORT, ProtocolError, encode_message, read_message
+from query_input_manager import engine, handle_input
+
+
+class SQLServer:
+    """
+    A long-running server that accepts many client connections and runs their queries
+    against the one shared execution engine and storage manager of this process, so
+    tables are loaded once instead of once per client.
+
+    Connections are handled on an asyncio event loop; queries run on a worker thread
+    pool so a slow query does not stall the other connections' I/O. The engine's table
+    locks let SELECTs on the pool run side by side while writers to a table take turns.
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None, workers=4):
+        """
+        Args:
+            host (str): Interface to listen on for TCP connections.
+            port (int): TCP port; 0 picks a free one.
+            path (str): Listen on this Unix socket instead of TCP.
+            workers (int): Threads that run queries.
+        """
+        self.host = host
+        self.port = port
+        self.path = path
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix='query')
+        self.server = None
+        self.connections = 0
+
+    async def start(self):
+        if self.path:
+            if os.path.exists(self.path):
+                os.remove(self.path)  # A socket file left behind by an earlier run
+            self.server = await asyncio.start_unix_server(self.handle_connection, path=self.path)
+        else:
+            self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+            self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        self.executor.shutdown(wait=True)
+
+    async def handle_connection(self, reader, writer):
+        """Answer each request on a connection in order until the client disconnects."""
+        self.connections += 1
+        loop = asyncio.get_running_loop()
+        session = {}  # This connection's prepared statements; its requests run one at a time
+        try:
+            while True:
+                try:
+                    request = await read_message(reader)
+                except (ProtocolError, EOFError) as e:
+                    #logging.error(f"Dropping connection: {e}")
+                    break
+                if request is None:
+                    break
+                sql = request.get('sql') if isinstance(request, dict) else None
+                params = request.get('params') if isinstance(request, dict) else None
+                if not isinstance(sql, str):
+                    response = {'result': None, 'error': "Error: Request has no 'sql' string."}
+                elif params is not None and not isinstance(params, list):
+                    response = {'result': None, 'error': "Error: Request 'params' must be a list."}
+                else:
+                    response = await loop.run_in_executor(self.executor, self.execute, sql, params, session)
+                writer.write(encode_message(response))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    @staticmethod
+    def execute(sql, params=None, session=None):
+        try:
+            result, error = handle_input(sql, params, session)
+        except Exception as e:
+            #logging.error(f"Query failed: {e}")
+            result, error = None, f"Error: {e}"
+        return {'result': result, 'error': error}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve MyDBMS to many clients over TCP or a Unix socket.")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--socket', help="Listen on this Unix socket path instead of TCP")
+    parser.add_argument('--workers', type=int, default=4, help="Threads that run queries")
+    parser.add_argument('--parallel', type=int, default=1, help="Worker processes for large scans and aggregations")
+    parser.add_argument('--result-cache', type=int, default=0, metavar='MB', help="Memory for cached SELECT results; 0 disables")
+    args = parser.parse_args()
+    engine.parallel_degree = args.parallel
+    engine.enable_result_cache(args.result_cache * 1024 * 1024)
+    logging.disable(logging.DEBUG)  # The parser and storage log every statement at DEBUG level
+
+    async def run():
+        server = await SQLServer(args.host, args.port, args.socket, args.workers).start()
+        print(f"MyDBMS server listening on {args.socket or f'{args.host}:{server.port}'}")
+        try:
+            await server.serve_forever()
+        finally:
+            server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("Server stopped.")
+
+if __name__ == "__main__":
+    main()
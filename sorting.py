@@ -0,0 +1,164 @@
+# SORTING.py
+
+import heapq
+import itertools
+from spill import SpillFile
+
+
+class NullValue:
+    """The sort value of NULL: equal to itself and smaller than any other value."""
+
+    __slots__ = ()
+
+    def __lt__(self, other):
+        return other is not self
+
+    def __le__(self, other):
+        return True
+
+    def __gt__(self, other):
+        return False
+
+    def __ge__(self, other):
+        return other is self
+
+    def __repr__(self):
+        return 'NULL'
+
+
+NULL = NullValue()
+
+
+class OrderKey:
+    """Sort key for ORDER BY terms with mixed ASC/DESC directions."""
+
+    __slots__ = ('values', 'descending')
+
+    def __init__(self, values, descending):
+        self.values = values
+        self.descending = descending
+
+    def __lt__(self, other):
+        for value, other_value, descending in zip(self.values, other.values, self.descending):
+            if value != other_value:
+                return value > other_value if descending else value < other_value
+        return False
+
+
+def order_key(columns):
+    """Build a sort key over the given columns in which NULLs sort before every value."""
+    if len(columns) == 1:
+        column = columns[0]
+        return lambda row: NULL if (value := row.get(column)) is None else value
+    return lambda row: tuple([NULL if (value := row.get(column)) is None else value for column in columns])
+
+
+def top_n(data, limit, key, reverse=False):
+    """
+    Return sorted(data, key=key, reverse=reverse)[:limit] holding at most a bounded
+    buffer of rows, so memory and sort work depend on limit rather than on len(data).
+
+    Rows are collected in a buffer of a few times the limit; whenever it fills up it
+    is sorted and cut back to the best 'limit' rows. The worst of those is then a
+    cutoff, and later rows that do not beat it are skipped after one comparison.
+    Presorted input, the bad case of a binary heap, stays cheap because the buffer
+    is made of sorted runs.
+    """
+    if limit <= 0:
+        return []
+    capacity = max(limit * 4, 1024)
+    buffer = []
+    cutoff = None
+    for row in data:
+        if cutoff is not None:
+            row_key = key(row)
+            # Ties lose too: an earlier row with the same key already sorts first
+            if not (cutoff < row_key if reverse else row_key < cutoff):
+                continue
+        buffer.append(row)
+        if len(buffer) >= capacity:
+            buffer.sort(key=key, reverse=reverse)
+            del buffer[limit:]
+            cutoff = key(buffer[-1])
+    buffer.sort(key=key, reverse=reverse)
+    return buffer[:limit]
+
+
+def external_sort(rows, key, reverse=False, memory_rows=200000, directory=None):
+    """
+    Sort rows of any size while holding at most memory_rows of them in memory.
+
+    Rows are read into a buffer; each time it fills up, it is sorted and written to
+    a temporary file as a run. The runs are then merged k-way with heapq.merge,
+    which reads one batch per run at a time. Input that fits in the buffer is sorted
+    in memory without touching disk. The sort is stable, like sorted().
+
+    Args:
+        rows (iterable): The rows to sort.
+        key (callable): Sort key, as for sorted().
+        reverse (bool): Sort in descending order.
+        memory_rows (int): Most rows held in memory at once.
+        directory (str): Where runs are written; None uses the system temp directory.
+
+    Yields:
+        The rows in sorted order.
+    """
+    runs = []
+    buffer = []
+    try:
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) >= memory_rows:
+                buffer.sort(key=key, reverse=reverse)
+                run = SpillFile(directory)
+                runs.append(run)
+                for sorted_row in buffer:
+                    run.write(sorted_row)
+                run.flush()
+                buffer = []
+        buffer.sort(key=key, reverse=reverse)
+        if not runs:
+            yield from buffer
+            return
+        # The last, partial run stays in memory; earlier runs win ties, which keeps the sort stable
+        yield from heapq.merge(*runs, buffer, key=key, reverse=reverse)
+    finally:
+        for run in runs:
+            run.close()
+
+
+def distinct(rows, memory_rows=200000, directory=None):
+    """
+    Drop duplicate rows (dicts with the same values in the same column order).
+
+    Up to memory_rows distinct rows are tracked in a hash set and returned in order
+    of first appearance. Past that budget the remaining input goes through an
+    external sort so that duplicates become adjacent; that output is in sort order.
+
+    Yields:
+        dict: Each distinct row once.
+    """
+    seen = set()
+    rows = iter(rows)
+    for row in rows:
+        values = tuple(row.values())
+        if values in seen:
+            continue
+        if len(seen) >= memory_rows:
+            break
+        seen.add(values)
+        yield row
+    else:
+        return
+
+    # Over budget: rows already returned are still in 'seen', so only new values are kept
+    def values_key(row):
+        return tuple([NULL if value is None else value for value in row.values()])
+
+    previous = None
+    for row in external_sort(itertools.chain([row], rows), values_key, memory_rows=memory_rows, directory=directory):
+        values = tuple(row.values())
+        if values == previous or values in seen:
+            continue
+        previous = values
+        yield row
@@ -0,0 +1,52 @@
+# SPILL.py
+
+import pickle
+import tempfile
+
+
+class SpillFile:
+    """
+    An append-only temporary file of pickled records, used by operators that
+    must put part of their input on disk to stay within a memory budget.
+    Records are pickled in batches and read back as a stream.
+    """
+
+    def __init__(self, directory=None, batch_size=1024):
+        self.file = tempfile.TemporaryFile(dir=directory)
+        self.batch_size = batch_size
+        self.buffer = []
+        self.count = 0
+
+    def write(self, record):
+        self.buffer.append(record)
+        self.count += 1
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            pickle.dump(self.buffer, self.file, protocol=pickle.HIGHEST_PROTOCOL)
+            self.buffer = []
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        """Yield every record written so far, in write order."""
+        self.flush()
+        self.file.seek(0)
+        while True:
+            try:
+                batch = pickle.load(self.file)
+            except EOFError:
+                return
+            yield from batch
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
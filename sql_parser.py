@@ -5,13 +5,35 @@ import logging
 
 # from sql_parser import parse_sql
 from execution_engine import ExecutionEngine
+from cache import LRUCache
+from expression import ConditionParser, Column, Expression, ValueParser, parameter_binder, scan_tokens, to_numeric, tokenize
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def parse_sql(sql):
+# Parsed SELECT templates, keyed by the statement text with its literals replaced by '?'
+statement_cache = LRUCache(capacity=512)
+# String and number literals, and '?' placeholders; digits inside a name are not a literal
+LITERAL_PATTERN = re.compile(r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|\?|(?<![\w.])(?:\d+\.\d*|\.\d+|\d+)""")
+
+def parse_sql(sql, parameters=None, prepared=None):
+    """
+    Parse one SQL statement into the command dict the execution engine runs.
+
+    Args:
+        sql (str): The statement; it may contain '?' placeholders.
+        parameters (list): Values for the placeholders, in order.
+        prepared (dict): The session's prepared statements (lower-case name -> statement
+            text), which PREPARE, EXECUTE and DEALLOCATE use; each connection has its own.
+    """
     #logging.debug(f"Debug Parsing SQL: {sql}")  # Log input SQL for debugging
     sql = sql.strip()
+    if parameters is not None and not sql[:6].lower() == 'select':
+        # Only SELECT binds parameters to a parsed template; other statements get the values written in
+        try:
+            sql = bind_text(sql, parameters)
+        except ValueError as e:
+            return {'error': f'Error: {e}'}
     lower_sql = sql.lower()
     tokens = lower_sql.split()
     parsed_details = {
@@ -32,10 +54,12 @@ def parse_sql(sql):
     
     if tokens[0] == 'show' and 'tables' in tokens:
         return parse_show_tables(sql)
+    if tokens[0] == 'show' and 'cache' in lower_sql.rstrip(';').split():
+        return parse_show_cache(sql)
 
     # Parsing logic based on type of SQL command
     if command_type == 'select':
-        return parse_select(sql)
+        return parse_select(sql, parameters)
 
     elif command_type == 'update':
         # Handle UPDATE
@@ -46,17 +70,22 @@ def parse_sql(sql):
             where_string = sql[where_index + 7:].replace(';','')
             parsed_details['where_condition'] = where_string.strip()
         else:
-            set_str = sql[set_index:].strip()
+            set_str = sql[set_index:].strip().rstrip(';').strip()
             where_index = len(sql)
 
         # Table name
         parsed_details['tables'].append(sql[7:set_index - 5].strip())
 
-        # Parse set values
+        # Parse set values; anything other than a single value (e.g. salary * 2) is kept as an expression
         parsed_details['values'] = {}
+        parsed_details['expressions'] = {}
         for part in set_str.split(','):
-            column, value = part.split('=')
-            parsed_details['values'][column.strip()] = value.strip().strip("'")
+            column, value = part.split('=', 1)
+            value = value.strip()
+            if re.fullmatch(r"'[^']*'|-?[\w.]+", value):
+                parsed_details['values'][column.strip()] = value.strip("'")
+            else:
+                parsed_details['expressions'][column.strip()] = value
 
         return parse_update(parsed_details, sql)
 
@@ -71,6 +100,9 @@ def parse_sql(sql):
         parsed_details['values'] = [value.strip().strip("'") for value in values_str.split(',')]
         return parse_insert(sql)
 
+    elif command_type == 'copy' or (command_type == 'load' and 'data' in tokens):
+        return parse_copy(sql)
+
     elif command_type == 'delete':
         # Handle DELETE FROM table WHERE condition
         from_index = lower_sql.find(' from ') + 6
@@ -90,6 +122,14 @@ def parse_sql(sql):
         return parse_create_table(sql)
     elif command_type == 'drop' and 'table' in tokens:
         return parse_drop_table(sql)
+    elif command_type in ('prepare', 'execute', 'deallocate') and prepared is None:
+        return {'error': f"Error: {command_type.upper()} needs a session to keep prepared statements in."}
+    elif command_type == 'prepare':
+        return parse_prepare(sql, prepared)
+    elif command_type == 'execute':
+        return parse_execute(sql, prepared)
+    elif command_type == 'deallocate':
+        return parse_deallocate(sql, prepared)
     
 
     
@@ -105,6 +145,14 @@ def parse_show_tables(sql):
         return {'error': 'Unsupported SQL command or malformed SQL', 'sql': sql}
 
 
+def parse_show_cache(sql):
+    # SHOW CACHE reports the result cache's hits, misses and size
+    if re.match(r"^\s*SHOW\s+CACHE\s*;?\s*$", sql, re.IGNORECASE):
+        return {'type': 'show_cache'}
+    else:
+        return {'error': 'Unsupported SQL command or malformed SQL', 'sql': sql}
+
+
 def parse_create_index(sql):
     # Updated regex to handle optional spaces more flexibly
     match = re.match(r"CREATE INDEX\s+(\w+)\s+ON\s+(\w+)\s+\((\w+)\)", sql, re.I)
@@ -142,65 +190,431 @@ def parse_drop_table(sql):
         return {'error': 'Unsupported SQL command or malformed SQL', 'sql': sql}
 
 
-def parse_select(sql):
-    #logging.debug(f"Parsing SELECT SQL: {sql}")
-    # Simplified and corrected regex pattern to handle SQL syntax variations
-    pattern = r'''
-    SELECT\s+(.*?)\s+FROM\s+([\w]+(?:\s+AS\s+\w+)?)
-    (.*?);?$
-    '''
+# Words that end a select item, table reference or clause, so they cannot be names or aliases there
+RESERVED_WORDS = {'SELECT', 'DISTINCT', 'FROM', 'WHERE', 'GROUP', 'BY', 'HAVING', 'ORDER', 'LIMIT', 'OFFSET',
+                  'JOIN', 'INNER', 'LEFT', 'RIGHT', 'FULL', 'OUTER', 'CROSS', 'ON', 'AS', 'ASC', 'DESC'}
+JOIN_WORDS = {'JOIN', 'INNER', 'LEFT', 'RIGHT', 'FULL'}
 
-    match = re.match(pattern, sql, re.IGNORECASE | re.VERBOSE)
-    if not match:
+
+class Aggregate(Expression):
+    def __init__(self, function, argument):
+        self.function = function
+        self.argument = argument
+
+
+class SelectItem(Expression):
+    def __init__(self, expression, alias, text):
+        self.expression = expression
+        self.alias = alias
+        self.text = text  # As written, which is also the name of the output column
+
+
+class TableReference(Expression):
+    def __init__(self, name, alias=None):
+        self.name = name
+        self.alias = alias
+
+    def text(self):
+        return f"{self.name} AS {self.alias}" if self.alias else self.name
+
+
+class Join(Expression):
+    def __init__(self, join_type, table, left, right):
+        self.join_type = join_type
+        self.table = table
+        self.left = left
+        self.right = right
+
+
+class OrderItem(Expression):
+    def __init__(self, column, descending=False):
+        self.column = column
+        self.descending = descending
+
+
+class SelectStatement(Expression):
+    def __init__(self):
+        self.distinct = False
+        self.items = []
+        self.table = None
+        self.joins = []
+        self.where = None
+        self.group_by = []
+        self.having = None
+        self.order_by = []
+        self.limit = None
+        self.offset = None
+
+
+class SelectParser(ValueParser):
+    """
+    Recursive-descent parser for SELECT, in one pass over the tokens of the statement.
+
+    It uses the condition tokenizer, so quoted literals are single tokens and a 'WHERE'
+    or 'JOIN' inside a string no longer splits a clause. WHERE and HAVING are parsed
+    with the inherited condition grammar into the trees compile_condition takes.
+    The source text of each clause is recorded too, for the engine's command dict.
+    """
+
+    def __init__(self, sql):
+        scanned = scan_tokens(sql)
+        while scanned and scanned[-1][:2] == ('op', ';'):
+            scanned.pop()
+        super().__init__([(kind, value) for kind, value, _, _ in scanned])
+        self.sql = sql
+        self.spans = [(start, end) for _, _, start, end in scanned]
+        # Source text of each clause and select item, with the index of its first '?' placeholder
+        self.clauses = {}
+        self.items = []
+
+    def text(self, start):
+        """Return the source text of the tokens from 'start' up to the current position."""
+        if start >= self.position:
+            return ''
+        return self.sql[self.spans[start][0]:self.spans[self.position - 1][1]]
+
+    def word(self, offset=0):
+        kind, value = self.peek(offset)
+        return value.upper() if kind in ('name', 'keyword') else None
+
+    def accept_word(self, *words):
+        """Consume a run of keywords, e.g. 'GROUP', 'BY', if it comes next."""
+        if all(self.word(offset) == word for offset, word in enumerate(words)):
+            self.position += len(words)
+            return True
+        return False
+
+    def expect_word(self, *words):
+        if not self.accept_word(*words):
+            raise ValueError(f"Expected {' '.join(words)}, found {self.peek()[1]!r}")
+
+    def parse_name(self, what):
+        kind, value = self.advance()
+        if kind != 'name' or value.upper() in RESERVED_WORDS:
+            raise ValueError(f"Expected {what}, found {value!r}")
+        return value
+
+    def parse(self):
+        statement = SelectStatement()
+        self.expect_word('SELECT')
+        statement.distinct = self.accept_word('DISTINCT')
+        statement.items = [self.parse_select_item()]
+        while self.accept('op', ','):
+            statement.items.append(self.parse_select_item())
+        self.expect_word('FROM')
+        statement.table = self.parse_table_reference()
+        while self.word() in JOIN_WORDS:
+            statement.joins.append(self.parse_join())
+        if self.accept_word('WHERE'):
+            statement.where = self.parse_clause('where', self.parse_or)
+        if self.accept_word('GROUP', 'BY'):
+            statement.group_by = self.parse_clause('group_by', lambda: self.parse_list(self.parse_column))
+        if self.accept_word('HAVING'):
+            statement.having = self.parse_clause('having', self.parse_or)
+        if self.accept_word('ORDER', 'BY'):
+            statement.order_by = self.parse_clause('order_by', lambda: self.parse_list(self.parse_order_item))
+        if self.accept_word('LIMIT'):
+            first = self.parse_count()
+            if self.accept('op', ','):
+                statement.offset, statement.limit = first, self.parse_count()  # LIMIT offset, count
+            else:
+                statement.limit = first
+                if self.accept_word('OFFSET'):
+                    statement.offset = self.parse_count()
+        if self.position != len(self.tokens):
+            raise ValueError(f"Unexpected {self.peek()[1]!r}")
+        return statement
+
+    def parse_clause(self, name, parse):
+        start, first = self.position, self.parameters
+        result = parse()
+        self.clauses[name] = (self.text(start), first)
+        return result
+
+    def parse_list(self, parse_item):
+        items = [parse_item()]
+        while self.accept('op', ','):
+            items.append(parse_item())
+        return items
+
+    def parse_select_item(self):
+        start, first = self.position, self.parameters
+        if self.word() in RESERVED_WORDS:
+            raise ValueError(f"Expected a column, found {self.peek()[1]!r}")
+        if self.accept('op', '*'):
+            expression = Column('*')
+        elif self.peek()[0] == 'name' and self.peek(1) == ('op', '('):
+            function = self.advance()[1].upper()
+            self.expect('op', '(')
+            argument = '*' if self.accept('op', '*') else self.parse_column()
+            self.expect('op', ')')
+            expression = Aggregate(function, argument)
+        else:
+            expression = self.parse_sum()
+        alias = None
+        if self.accept_word('AS') and self.word() != 'FROM':
+            alias = self.parse_name('an alias')
+        # A dangling AS before FROM is kept in the item text, which names the output column
+        self.items.append((self.text(start), first))
+        return SelectItem(expression, alias, self.text(start))
+
+    def parse_table_reference(self):
+        name = self.parse_name('a table name')
+        alias = None
+        if self.accept_word('AS') or (self.peek()[0] == 'name' and self.word() not in RESERVED_WORDS):
+            alias = self.parse_name('an alias')
+        return TableReference(name, alias)
+
+    def parse_join(self):
+        join_type = 'JOIN'
+        if not self.accept_word('JOIN'):
+            join_type = self.advance()[1].upper() + ' JOIN'
+            self.accept_word('OUTER')
+            self.expect_word('JOIN')
+        table = self.parse_table_reference()
+        self.expect_word('ON')
+        left = self.parse_name('a column')
+        self.expect('op', '=')
+        return Join(join_type, table, left, self.parse_name('a column'))
+
+    def parse_order_item(self):
+        column = self.parse_column()
+        if self.accept_word('DESC'):
+            return OrderItem(column, True)
+        self.accept_word('ASC')
+        return OrderItem(column)
+
+    def parse_count(self):
+        if self.peek() == ('op', '?'):
+            return self.parse_literal(convert=False)  # Checked when the value is bound
+        kind, value = self.advance()
+        if kind != 'number' or not value.isdigit():
+            raise ValueError(f"Expected a row count, found {value!r}")
+        return int(value)
+
+
+class SelectTemplate:
+    """
+    A SELECT parsed once, with '?' in place of its literals, and bound to the values
+    of each statement of that shape. Binding copies the tree and fills in the
+    clause texts, so one template can be bound by several threads at once.
+    """
+
+    def __init__(self, sql):
+        parser = SelectParser(sql)
+        self.statement = parser.parse()
+        self.binder = parameter_binder(self.statement)
+        self.parameter_count = parser.parameters
+        self.items = [(text.split('?'), first) for text, first in parser.items]
+        self.clauses = {name: (text.split('?'), first) for name, (text, first) in parser.clauses.items()}
+
+    @staticmethod
+    def render(template, literals):
+        """Fill the placeholders of a template text with the SQL text of their values."""
+        pieces, first = template
+        parts = [pieces[0]]
+        for offset, piece in enumerate(pieces[1:]):
+            parts.append(literals[first + offset])
+            parts.append(piece)
+        return ''.join(parts)
+
+    def bind(self, arguments):
+        """
+        Args:
+            arguments (list of tuple): (value, SQL text) of each placeholder, from parameterize.
+
+        Returns:
+            dict: The command for the execution engine: the text of each clause, plus the
+            parsed SelectStatement under 'statement' so later stages need not parse it again.
+        """
+        if len(arguments) != self.parameter_count:
+            raise ValueError(f"Expected {self.parameter_count} parameters, got {len(arguments)}")
+        literals = [text for _, text in arguments]
+        statement = self.binder([value for value, _ in arguments]) if self.binder else self.statement
+        for item, template in zip(statement.items, self.items):
+            if len(template[0]) > 1:
+                item.text = self.render(template, literals)  # A copy: the item holds a Parameter
+        for count in (statement.limit, statement.offset):
+            if count is not None and (type(count) is not int or count < 0):
+                raise ValueError(f"Expected a row count, found {count!r}")
+        clauses = {name: self.render(template, literals) for name, template in self.clauses.items()}
+
+        return {
+            'type': 'select',
+            'main_table': statement.table.text(),
+            'columns': [item.text for item in statement.items],
+            'join': [{
+                'join_type': join.join_type,
+                'join_table': join.table.text(),
+                'join_condition': f"{join.left} = {join.right}"
+            } for join in statement.joins],
+            'where_clause': clauses.get('where'),
+            'group_by': clauses.get('group_by'),
+            'order_by': clauses.get('order_by'),
+            'having': clauses.get('having'),
+            'limit': statement.limit,
+            'offset': statement.offset,
+            'distinct': statement.distinct,
+            'statement': statement
+        }
+
+
+def render_literal(value):
+    """Write a parameter value as a SQL literal."""
+    if value is None:
+        return 'NULL'
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return repr(value)
+    if isinstance(value, bool):
+        return str(int(value))
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def parameterize(sql, parameters=None):
+    """
+    Replace every literal of a statement, and every '?' placeholder, with a '?'.
+
+    Args:
+        sql (str): The statement.
+        parameters (list): Values for the statement's own '?' placeholders, in order.
+
+    Returns:
+        tuple: (template text, list of (value, SQL text) for each '?' of the template).
+
+    Raises:
+        ValueError: If the parameters do not match the statement's placeholders.
+    """
+    parameters = list(parameters or ())
+    pieces = []
+    arguments = []
+    end = 0
+    supplied = 0
+    for match in LITERAL_PATTERN.finditer(sql):
+        text, start = match.group(), match.start()
+        if text == '?':
+            if supplied == len(parameters):
+                raise ValueError("Not enough parameters for the '?' placeholders")
+            arguments.append((parameters[supplied], render_literal(parameters[supplied])))
+            supplied += 1
+        elif text[0] in '\'"':
+            arguments.append((text[1:-1].replace(text[0] * 2, text[0]), text))
+        else:
+            before = start - 1
+            while before >= 0 and sql[before].isspace():
+                before -= 1
+            if before >= 0 and sql[before] == '-':
+                continue  # A number after '-' stays in the template, where the parser reads the sign
+            arguments.append((to_numeric(text), text))
+        pieces.append(sql[end:start])
+        pieces.append('?')
+        end = match.end()
+    if supplied != len(parameters):
+        raise ValueError(f"{len(parameters)} parameters given for {supplied} '?' placeholders")
+    pieces.append(sql[end:])
+    return ''.join(pieces), arguments
+
+
+def parse_select(sql, parameters=None):
+    """
+    Parses a SELECT statement.
+
+    The statement's literals are replaced by placeholders and the parsed template is
+    cached under that text, so statements that differ only in their literals (or
+    parameter values) are parsed once and only bound after that.
+    """
+    #logging.debug(f"Parsing SELECT SQL: {sql}")
+    try:
+        template_sql, arguments = parameterize(sql, parameters)
+        return select_template(template_sql).bind(arguments)
+    except ValueError as e:
         #logging.error("Invalid SELECT syntax: " + sql)
-        return {'error': 'Invalid SELECT syntax'}
-
-    select_fields, main_table, remaining = match.groups()
-
-    result = {
-        'type': 'select',
-        'main_table': main_table.strip(),
-        'columns': [col.strip() for col in select_fields.split(',')],
-        'join': [],
-        'where_clause': None,
-        'group_by': None,
-        'order_by': None,
-        'having': None
-    }
+        return {'error': f'Invalid SELECT syntax: {e}'}
 
-    # Process remaining clauses dynamically
-    if 'JOIN' in remaining.upper():
-        join_pattern = r'(LEFT|RIGHT|FULL|INNER|OUTER)?\s+JOIN\s+([\w]+(?:\s+AS\s+\w+)?|\w+)\s+ON\s+([\w\s\.=]+)'
-        join_matches = re.finditer(join_pattern, remaining, re.IGNORECASE)
-        for jmatch in join_matches:
-            join_type, join_table, join_condition = jmatch.groups()
-            result['join'].append({
-                'join_type': (join_type + ' JOIN').strip() if join_type else 'JOIN',
-                'join_table': join_table.strip(),
-                'join_condition': join_condition.strip()
-            })
-    
-    # Dynamically find the end index for each clause
-    clauses = ['WHERE', 'GROUP BY', 'ORDER BY', 'HAVING']
-    clause_positions = {clause: remaining.upper().find(clause) for clause in clauses if remaining.upper().find(clause) != -1}
-    sorted_clauses = sorted(clause_positions.items(), key=lambda x: x[1])
 
-    for i, (clause, pos) in enumerate(sorted_clauses):
-        # Find the start of the next clause to delimit current clause
-        next_pos = len(remaining) if i == len(sorted_clauses) - 1 else sorted_clauses[i + 1][1]
-        clause_content = remaining[pos + len(clause):next_pos].strip()
+def select_template(template_sql):
+    """Return the cached SelectTemplate of a template text, parsing it on a miss."""
+    key = template_sql.rstrip('; \t\r\n')
+    template = statement_cache.get(key)
+    if template is None:
+        template = SelectTemplate(key)
+        statement_cache.put(key, template)
+    return template
+
 
-        if clause == 'WHERE':
-            result['where_clause'] = clause_content
-        elif clause == 'GROUP BY':
-            result['group_by'] = clause_content
-        elif clause == 'ORDER BY':
-            result['order_by'] = clause_content
-        elif clause == 'HAVING':
-            result['having'] = clause_content
+def bind_text(sql, parameters):
+    """Return a statement with its '?' placeholders replaced by the parameters written as SQL literals."""
+    template, arguments = parameterize(sql, parameters)
+    # Every literal of the template is a '?' now, so each '?' in it is a placeholder
+    pieces = template.split('?')
+    return pieces[0] + ''.join(text + piece for (_, text), piece in zip(arguments, pieces[1:]))
 
 
-    return result
+def parse_prepare(sql, prepared):
+    """
+    Parses and registers a prepared statement, in either form:
+    PREPARE name FROM 'SELECT ... WHERE a = ?';
+    PREPARE name AS SELECT ... WHERE a = ?;
+    """
+    match = re.match(r"^\s*PREPARE\s+(\w+)\s+(?:FROM\s+'((?:[^']|'')*)'\s*;?|AS\s+(.+))\s*$", sql, re.IGNORECASE | re.DOTALL)
+    if not match:
+        return {'error': 'Invalid PREPARE syntax', 'sql': sql}
+    name, quoted, statement = match.groups()
+    statement = quoted.replace("''", "'") if quoted is not None else statement
+    try:
+        placeholders = sum(1 for kind, value, _, _ in scan_tokens(statement) if (kind, value) == ('op', '?'))
+        if statement.split()[0].lower() == 'select':
+            # Parse it now, so errors show up here and EXECUTE finds the template cached
+            select_template(parameterize(statement, [None] * placeholders)[0])
+    except (ValueError, IndexError) as e:
+        return {'error': f'Invalid PREPARE syntax: {e or "empty statement"}'}
+    prepared[name.lower()] = statement
+    return {'type': 'prepare', 'name': name, 'parameters': placeholders}
+
+
+def parse_execute(sql, prepared):
+    """
+    Parses a prepared statement's execution, in either form:
+    EXECUTE name USING 'AK', 2018;
+    EXECUTE name('AK', 2018);
+    and returns the command of the prepared statement bound to those values.
+    """
+    try:
+        parser = ConditionParser(tokenize(sql))
+        parser.advance()  # EXECUTE
+        kind, name = parser.advance()
+        if kind != 'name':
+            raise ValueError(f"Expected a statement name, found {name!r}")
+        values = []
+        if parser.peek()[0] == 'name' and parser.peek()[1].upper() == 'USING':
+            parser.advance()
+            values.append(parser.parse_literal(convert=False))
+            while parser.accept('op', ','):
+                values.append(parser.parse_literal(convert=False))
+        elif parser.accept('op', '('):
+            if not parser.accept('op', ')'):
+                values.append(parser.parse_literal(convert=False))
+                while parser.accept('op', ','):
+                    values.append(parser.parse_literal(convert=False))
+                parser.expect('op', ')')
+        if parser.position != len(parser.tokens):
+            raise ValueError(f"Unexpected {parser.peek()[1]!r}")
+    except ValueError as e:
+        return {'error': f'Invalid EXECUTE syntax: {e}'}
+    statement = prepared.get(name.lower())
+    if statement is None:
+        return {'error': f"Error: No prepared statement named '{name}'."}
+    return parse_sql(statement, values, prepared)
+
+
+def parse_deallocate(sql, prepared):
+    """Parses DEALLOCATE [PREPARE] name, dropping the prepared statement."""
+    match = re.match(r"^\s*DEALLOCATE\s+(?:PREPARE\s+)?(\w+)\s*;?\s*$", sql, re.IGNORECASE)
+    if not match:
+        return {'error': 'Invalid DEALLOCATE syntax', 'sql': sql}
+    name = match.group(1)
+    if prepared.pop(name.lower(), None) is None:
+        return {'error': f"Error: No prepared statement named '{name}'."}
+    return {'type': 'deallocate', 'name': name}
 
 def parse_update(parsed_details, sql):
     # This function could further process or validate the parsed details
@@ -303,24 +717,63 @@ def parse_column_definition(column_def):
 
     return column_name, constraints
 
+def unquote(value):
+    """Return the text of a quoted SQL string with its doubled quotes undone; other values are returned as they are."""
+    if len(value) >= 2 and value[0] == value[-1] == "'":
+        return value[1:-1].replace("''", "'")
+    return value
+
+
 def parse_insert(sql):
-    """Parses an INSERT INTO SQL statement."""
-    pattern = r'INSERT INTO\s+(\w+)\s+\((.*)\)\s+VALUES\s+\((.*)\)'
-    match = re.match(pattern, sql, re.IGNORECASE)
+    """
+    Parses an INSERT INTO SQL statement with one or more value tuples:
+    INSERT INTO table (a, b) VALUES (1, 'x'), (2, 'y');
+    """
+    pattern = r'INSERT INTO\s+(\w+)\s+\((.*?)\)\s+VALUES\s+(\(.*\))\s*;?\s*$'
+    match = re.match(pattern, sql, re.IGNORECASE | re.DOTALL)
     if not match:
         return {'error': 'Invalid INSERT syntax'}
 
     table_name, columns, values = match.groups()
     columns = [col.strip() for col in columns.split(',')]
-    values = [value.strip().strip("'") for value in values.split(',')]
-    data = dict(zip(columns, values))
+    rows = []
+    # Each tuple is split on the commas outside quoted strings, in which '' stands for a quote
+    for values_str in re.findall(r"\(((?:'(?:[^']|'')*'|[^'()])*)\)", values):
+        row_values = [unquote(value.strip()) for value in re.findall(r"\s*('(?:[^']|'')*'|[^,]+)", values_str)]
+        if len(row_values) != len(columns):
+            return {'error': 'Invalid INSERT syntax: each VALUES tuple must match the column list'}
+        rows.append(dict(zip(columns, row_values)))
+    if not rows:
+        return {'error': 'Invalid INSERT syntax'}
 
     return {
         'type': 'insert',
         'table': table_name,
-        'data': data
+        'data': rows[0],
+        'rows': rows
     }
-    
+
+
+def parse_copy(sql):
+    """
+    Parses a bulk load from a CSV file with a header row, in either form:
+    COPY table FROM 'file.csv';
+    LOAD DATA INFILE 'file.csv' INTO TABLE table;
+    """
+    match = re.match(r"^\s*COPY\s+(\w+)\s+FROM\s+'([^']+)'\s*;?\s*$", sql, re.IGNORECASE)
+    if match:
+        table_name, path = match.groups()
+    else:
+        match = re.match(r"^\s*LOAD\s+DATA\s+(?:LOCAL\s+)?INFILE\s+'([^']+)'\s+INTO\s+TABLE\s+(\w+)\s*;?\s*$", sql, re.IGNORECASE)
+        if not match:
+            return {'error': 'Invalid COPY syntax', 'sql': sql}
+        path, table_name = match.groups()
+    return {
+        'type': 'copy',
+        'table': table_name,
+        'path': path
+    }
+
 def get_table_columns(self, table):
     # Assuming a method that retrieves a list of all column names for a given table
     return list(self.tables[table].columns.keys())
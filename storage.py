@@ -1,14 +1,41 @@
 # STORAGE.py
 
+import atexit
+import bisect
+import contextlib
 import csv
 import json
 import os
 import logging
+import threading
 from BTrees.OOBTree import BTree
+from table import RowCursor, Table, to_native
+from wal import CheckpointState, WriteAheadLog
+from locking import LockManager
 import unittest
 
 # conda install blist
 
+# One StorageManager per data directory, shared by every manager in the process
+_storage_managers = {}
+
+
+def get_storage_manager(data_directory="data"):
+    """
+    Return the process-wide StorageManager for a data directory, creating it on first use.
+
+    Args:
+        data_directory (str): Directory holding the table CSV files and schemas.
+
+    Returns:
+        StorageManager: The shared storage manager for that directory.
+    """
+    key = os.path.abspath(data_directory)
+    if key not in _storage_managers:
+        _storage_managers[key] = StorageManager(data_directory)
+    return _storage_managers[key]
+
+
 class StorageManager:
     def __init__(self, data_directory="data"):
             # Ensure the data_directory is correctly set
@@ -20,10 +47,27 @@ class StorageManager:
                     os.makedirs(self.schema_directory)
             self.schemas = {}
             self.data = {}
-            self.indexes = {}  # Dictionary to hold BTree indexes for each table
+            self.indexes = {}  # (table, column, index name) -> BTree of value -> row positions
+            self.file_signatures = {}  # File path -> (mtime_ns, size) when it was last loaded
+            self.directory_signatures = None  # Of the schema and data directories, at the last full refresh
+            self.table_versions = {}  # Table name -> counter bumped whenever its data or schema changes
+            self.primary_key_indexes = {}  # Table name -> set of primary key tuples, built on first use
+            # Changes go to the write-ahead log first; a checkpoint later folds them into the CSV files
+            self.lock = threading.RLock()
+            self.locks = LockManager()  # Statement-level catalog and table locks, taken by the execution engine
+            self.local = threading.local()  # The calling thread's snapshot, if it is inside one
+            self.wal = WriteAheadLog(os.path.join(self.data_directory, 'wal.log'))
+            self.checkpoint_state = CheckpointState(os.path.join(self.data_directory, 'wal.checkpoint'))
+            self.dirty_tables = set()  # Tables changed since their CSV file was last written
+            self.checkpoint_interval = 30  # Seconds between background checkpoints
+            self.checkpoint_bytes = 16 * 1024 * 1024  # Log size that triggers an early checkpoint
+            self.checkpoint_requested = threading.Event()
             self.define_schemas()
             self.load_schemas()
             self.load_all_data()
+            self.recover()
+            threading.Thread(target=self.run_checkpoints, name='checkpoint', daemon=True).start()
+            atexit.register(self.checkpoint)
             # self.initialize_indexes()
             
     def define_schemas(self):
@@ -167,14 +211,238 @@ class StorageManager:
             if filename.endswith('.csv'):
                 table_name = filename[:-4]  # Strip the '.csv' part
                 if table_name in self.schemas:  # Only load data for defined schemas
-                    file_path = os.path.join(self.data_directory, filename)
-                    self.data[table_name] = self.read_csv(file_path)
-                    self.load_indexes_for_table(table_name) 
-                    
-    def load_indexes_for_table(self, table_name):
+                    self.load_table(table_name)
+
+    def load_table(self, table_name):
+        """Read one table's CSV file into memory and remember the file signature it was read at."""
+        file_path = os.path.join(self.data_directory, f"{table_name}.csv")
+        self.file_signatures[file_path] = self.file_signature(file_path)
+        self.data[table_name] = self.read_table(table_name, file_path)
+        self.primary_key_indexes.pop(table_name, None)
+        self.load_indexes_for_table(table_name)
+        self.bump_table_version(table_name)
+
+    @staticmethod
+    def file_signature(file_path):
+        """Return (mtime_ns, size) for a file, or None if it does not exist."""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def bump_table_version(self, table_name):
+        self.table_versions[table_name] = self.table_versions.get(table_name, 0) + 1
+
+    def invalidate_table(self, table_name):
+        """Forget the cached file signature so the next refresh re-reads the table."""
+        self.file_signatures.pop(os.path.join(self.data_directory, f"{table_name}.csv"), None)
+        self.bump_table_version(table_name)
+
+    def refresh(self, table_names=None):
+        """
+        Bring schemas and table data up to date, reloading only files that changed on disk.
+
+        Args:
+            table_names (iterable of str): Only check these tables' files, unless a file was
+                added to or removed from the schema or data directory since the last full refresh.
+        """
+        with self.lock:
+            directories = (self.file_signature(self.schema_directory), self.file_signature(self.data_directory))
+            if table_names is None or directories != self.directory_signatures:
+                self.refresh_schemas()
+                self.refresh_data()
+                self.directory_signatures = directories
+                return
+            for table_name in table_names:
+                schema_path = os.path.join(self.schema_directory, f"{table_name}.json")
+                if table_name in self.schemas and self.file_signatures.get(schema_path) != self.file_signature(schema_path):
+                    self.refresh_schema(table_name, schema_path)
+                file_path = os.path.join(self.data_directory, f"{table_name}.csv")
+                if table_name in self.data and self.file_signatures.get(file_path) != self.file_signature(file_path):
+                    self.load_table(table_name)
+
+    def refresh_schemas(self):
+        schema_files = {}
+        for filename in os.listdir(self.schema_directory):
+            if filename.endswith(".json"):
+                schema_files[filename[:-5]] = os.path.join(self.schema_directory, filename)
+
+        # A schema file disappeared (e.g. a dropped table): rebuild the catalog from scratch
+        known = [path for path in self.file_signatures if path.startswith(self.schema_directory + os.sep)]
+        if any(not os.path.exists(path) for path in known):
+            self.load_latest_schema()
+            return
+
+        for table_name, schema_path in schema_files.items():
+            if table_name not in self.schemas or self.file_signatures.get(schema_path) != self.file_signature(schema_path):
+                self.refresh_schema(table_name, schema_path)
+
+    def refresh_schema(self, table_name, schema_path):
+        self.file_signatures[schema_path] = self.file_signature(schema_path)
+        self.schemas[table_name] = self.load_schema(schema_path)
+        self.primary_key_indexes.pop(table_name, None)  # The key columns may have changed
+        self.bump_table_version(table_name)
+        if table_name in self.data:
+            self.load_indexes_for_table(table_name, rebuild=False)  # Pick up added or dropped indexes
+
+    def refresh_data(self):
+        csv_tables = set()
+        for filename in os.listdir(self.data_directory):
+            if filename.endswith('.csv'):
+                table_name = filename[:-4]
+                if table_name not in self.schemas:
+                    continue
+                csv_tables.add(table_name)
+                file_path = os.path.join(self.data_directory, filename)
+                if table_name not in self.data or self.file_signatures.get(file_path) != self.file_signature(file_path):
+                    self.load_table(table_name)
+
+        for table_name in list(self.data):
+            if table_name not in csv_tables:
+                del self.data[table_name]
+                self.primary_key_indexes.pop(table_name, None)
+                self.file_signatures.pop(os.path.join(self.data_directory, f"{table_name}.csv"), None)
+                self.bump_table_version(table_name)
+
+    def foreign_key_tables(self, table_name):
+        """Return the tables that reference table_name, or that it references, through a foreign key."""
+        tables = set()
+        for name, schema in list(self.schemas.items()):
+            foreign_keys = schema.get('foreign_keys') or {}
+            details = foreign_keys.values() if isinstance(foreign_keys, dict) else foreign_keys
+            for detail in details:
+                if not isinstance(detail, dict):
+                    continue
+                referenced = (detail.get('references') or {}).get('table')
+                if name == table_name and referenced:
+                    tables.add(referenced)
+                elif referenced == table_name:
+                    tables.add(name)
+        tables.discard(table_name)
+        return tables
+
+    def index_definitions(self, table_name):
+        """Return the table's declared indexes as {'name', 'column'} dicts (older schemas list bare column names)."""
+        definitions = []
+        for index in self.schemas.get(table_name, {}).get('indexes', []):
+            if isinstance(index, str):
+                index = {'name': f"{index}_index", 'column': index}
+            definitions.append(index)
+        return definitions
+
+    def load_indexes_for_table(self, table_name, rebuild=True):
+        """
+        Build the B-tree of every index declared in the table's schema and drop undeclared ones.
+
+        Args:
+            table_name (str): The table whose indexes to load.
+            rebuild (bool): Rebuild indexes that already exist, e.g. after row positions changed.
+        """
+        declared = {(table_name, index['column'], index['name']) for index in self.index_definitions(table_name)}
+        for key in [key for key in list(self.indexes) if key[0] == table_name and key not in declared]:
+            del self.indexes[key]
+        for key in declared:
+            if rebuild or key not in self.indexes:
+                tree = self.build_index(table_name, key[1])
+                if tree is not None:
+                    self.indexes[key] = tree
+                else:
+                    self.indexes.pop(key, None)
+
+    def build_index(self, table_name, column_name):
+        """
+        Build a B-tree mapping each value of a column to the positions of the rows holding it.
+
+        Returns:
+            BTree or None: The index, or None if the column's values cannot be ordered together.
+        """
+        table = self.data.get(table_name)
+        if table is None or column_name not in table.columns:
+            return BTree()
+        postings = {}
+        for position, key in enumerate(table.column(column_name)):
+            if key is None:
+                continue  # NULLs are never matched by an equality lookup
+            if key in postings:
+                postings[key].append(position)
+            else:
+                postings[key] = [position]
+        tree = BTree()
+        try:
+            tree.update(sorted(postings.items()))
+        except TypeError:
+            #logging.error(f"Cannot index {table_name}({column_name}): mixed value types")
+            return None
+        return tree
+
+    def get_index(self, table_name, column_name):
+        """Return the B-tree of any index on the column, or None. Inside a snapshot, its version of the index."""
+        snapshot = getattr(self.local, 'snapshot', None)
+        if snapshot is not None and table_name in snapshot:
+            return snapshot[table_name][1].get(column_name)
+        for (table, column, _), tree in list(self.indexes.items()):
+            if table == table_name and column == column_name:
+                return tree
+        return None
+
+    def primary_key_columns(self, table_name):
+        """Return the table's primary key columns as a list (empty if it has none)."""
+        primary_key = self.schemas.get(table_name, {}).get('primary_key')
+        if not primary_key:
+            return []
+        return [primary_key] if isinstance(primary_key, str) else list(primary_key)
+
+    def primary_key_index(self, table_name):
+        """
+        Return the set of primary key tuples of a table, building it on first use.
+
+        Keys are tuples of the stored (typed) values, one per primary key column, so
+        composite keys are compared as a whole. The set is kept up to date by inserts,
+        updates and deletes, which makes a uniqueness check a single hash lookup.
+
+        Returns:
+            set or None: The key tuples, or None if the table has no primary key.
+        """
+        keys = self.primary_key_indexes.get(table_name)
+        if keys is None:
+            primary_keys = self.primary_key_columns(table_name)
+            if not primary_keys:
+                return None
+            table = self.data.get(table_name)
+            if table is None or len(table) == 0:
+                keys = set()
+            else:
+                keys = set(zip(*[table.column(column) for column in primary_keys]))
+            self.primary_key_indexes[table_name] = keys
+        return keys
+
+    def primary_key_of(self, table_name, position):
+        """Return the primary key tuple of the row at a position."""
+        table = self.data[table_name]
+        return tuple(table.column(column)[position] for column in self.primary_key_columns(table_name))
+
+    def read_table(self, table_name, file_path):
+        """
+        Load a CSV file into a typed, columnar Table using the table's schema types.
+
+        Args:
+            table_name (str): The table whose schema drives the column types.
+            file_path (str): Path of the CSV file.
+
+        Returns:
+            Table: The loaded table (empty if the file cannot be read).
+        """
         schema = self.schemas.get(table_name, {})
-        for index in schema.get('indexes', []):
-            self.indexes[(table_name, index['column'], index['name'])] = BTree()
+        try:
+            with open(file_path, mode='r', encoding='utf-8-sig', newline='') as file:
+                reader = csv.reader(file)
+                header = next(reader, None)
+                records = [record for record in reader if record]
+        except Exception as e:
+            #logging.error(f"Failed to read {file_path}: {e}")
+            return Table(schema)
+        return Table.from_records(schema, header, records)
 
     def read_csv(self, file_path):
         try:
@@ -190,7 +458,10 @@ class StorageManager:
         for filename in os.listdir(self.schema_directory):
             if filename.endswith(".json"):
                 table_name = filename[:-5]  # Remove the .json extension
-                self.schemas[table_name] = self.load_schema(os.path.join(self.schema_directory, filename))
+                schema_path = os.path.join(self.schema_directory, filename)
+                self.file_signatures[schema_path] = self.file_signature(schema_path)
+                self.schemas[table_name] = self.load_schema(schema_path)
+                self.bump_table_version(table_name)
 
     def load_schema(self, schema_path):
         schema = {}
@@ -209,10 +480,15 @@ class StorageManager:
     
     def load_latest_schema(self):
         self.schemas = {}
+        self.primary_key_indexes = {}
+        for path in [path for path in self.file_signatures if path.startswith(self.schema_directory + os.sep)]:
+            del self.file_signatures[path]
         self.define_schemas()
         self.load_schemas()
     
     def load_latest_data(self):
+        # Forced full reload; statements should prefer refresh(), which skips unchanged files
+        self.checkpoint()  # Logged changes must reach the files before they are re-read
         self.data = {}
         self.load_all_data()
 
@@ -233,6 +509,7 @@ class StorageManager:
             schema_file = os.path.join(self.schema_directory, f"{table_name}.json")
             with open(schema_file, "w") as json_file:
                 json.dump(schema, json_file)
+            self.bump_table_version(table_name)
             return "Schema for {0} created successfully.".format(table_name)
         else:
             return "Error: Schema for {0} already exists.".format(table_name)
@@ -241,6 +518,11 @@ class StorageManager:
         schema_file = os.path.join(self.schema_directory, f"{table_name}.json")
         if os.path.exists(schema_file):
             os.remove(schema_file)
+            with self.lock:
+                # The table's logged changes are discarded with it by the next checkpoint
+                self.dirty_tables.discard(table_name)
+                self.checkpoint_state.forget(table_name)
+                self.bump_table_version(table_name)
             self.load_latest_schema()
             self.load_latest_data()
             return "Schema file {0} is dropped successfully".format(table_name)
@@ -253,63 +535,515 @@ class StorageManager:
             return "Error: Invalid condition syntax"
 
         try:
-            initial_data = self.get_table_data_w_datatype(table_name)
-            print(initial_data)
-            new_data = [row for row in initial_data if not condition_func(row)]
-            rows_deleted = len(initial_data) - len(new_data)
+            initial_data = self.get_table_data(table_name)
+            cursor = RowCursor(initial_data)
+            victims = []
+            for position in range(len(initial_data)):
+                cursor.position = position
+                if condition_func(cursor):
+                    victims.append(position)
 
             #logging.debug(f"Initial data: {initial_data}")
             #logging.debug(f"New data after deletion: {new_data}")
 
-            if rows_deleted > 0:
-                self.data[table_name] = new_data
-                result = self.write_csv(table_name)  # Write changes back to the CSV file
+            if victims:
+                result = self.delete_rows(table_name, victims)
                 if result is not None:
                     return result
-                return f"Deleted {rows_deleted} rows."
+                return f"Deleted {len(victims)} rows."
             else:
                 return "No rows matched the condition."
         except Exception as e:
             #logging.error(f"Deletion failed: {e}")
             return f"Error: Failed to delete data due to {e}"
 
+    def delete_rows(self, table_name, positions):
+        """
+        Delete the rows at the given positions.
+
+        The deletion is logged and applied in memory; the table file is rewritten by
+        the next checkpoint.
+
+        Args:
+            table_name (str): The table to delete from.
+            positions (iterable of int): Positions of the rows to delete.
+
+        Returns:
+            str or None: An error message, or None on success.
+        """
+        positions = sorted(set(positions))
+
+        def prepare():
+            record = {'op': 'delete', 'table': table_name, 'positions': positions,
+                      'keys': self.log_keys(table_name, positions)}
+            return record, lambda: self.apply_delete(table_name, positions)
+        return self.log_change(prepare)
+
+    def apply_delete(self, table_name, positions):
+        table = self.get_table_data(table_name)
+        victims = set(positions)
+        keep = [position for position in range(len(table)) if position not in victims]
+        keys = self.primary_key_indexes.get(table_name)
+        if keys is not None:
+            for position in victims:
+                keys.discard(self.primary_key_of(table_name, position))
+        if victims:
+            self.index_delete(table_name, table, sorted(victims))
+        self.data[table_name] = table.take(keep)
+        self.bump_table_version(table_name)
+
+    def index_delete(self, table_name, table, victims):
+        """
+        Take deleted rows out of every index of a table, and move the positions of the
+        rows after them down by the number of deleted rows before them.
+
+        Args:
+            table (Table): The table as it was before the delete.
+            victims (list of int): The deleted positions, sorted.
+        """
+        if table.readers:
+            self.copy_indexes(table_name)  # A snapshot still reads the current trees
+        first = victims[0]
+        for (index_table, column, _), tree in list(self.indexes.items()):
+            if index_table != table_name:
+                continue
+            values = table.column(column)
+            for position in victims:
+                key = values[position]
+                if key is None:
+                    continue
+                postings = tree.get(key)
+                if postings is not None:
+                    postings.remove(position)
+                    if not postings:
+                        del tree[key]
+            for postings in tree.values():
+                if any(position > first for position in postings):
+                    postings[:] = [position - bisect.bisect_left(victims, position) for position in postings]
+
+    def update_rows(self, table_name, changes):
+        """
+        Overwrite column values of existing rows in place.
+
+        Rows keep their positions, so indexes are adjusted only for the changed keys
+        of the indexed columns that were assigned. The update is logged and applied in
+        memory; the table file is rewritten by the next checkpoint.
+
+        Args:
+            table_name (str): The table to update.
+            changes (dict): Row position -> {column: new native value}.
+
+        Returns:
+            str or None: An error message, or None on success.
+        """
+        def prepare():
+            positions = list(changes)
+            keys = self.log_keys(table_name, positions) or [None] * len(positions)
+            record = {'op': 'update', 'table': table_name,
+                      'changes': [[position, key, changes[position]] for position, key in zip(positions, keys)]}
+            return record, lambda: self.apply_update(table_name, changes)
+        return self.log_change(prepare)
+
+    def apply_update(self, table_name, changes):
+        table = self.writable_table(table_name)
+        indexes = [(column, tree) for (index_table, column, _), tree in list(self.indexes.items()) if index_table == table_name]
+        keys = self.primary_key_indexes.get(table_name)
+        primary_keys = self.primary_key_columns(table_name)
+        if keys is not None and any(column in values for values in changes.values() for column in primary_keys):
+            # Remove every old key before adding the new ones, so rows may swap keys
+            moved = [position for position, values in changes.items() if any(column in values for column in primary_keys)]
+            for position in moved:
+                keys.discard(self.primary_key_of(table_name, position))
+        else:
+            moved = []
+        for position, values in changes.items():
+            for column, value in values.items():
+                old_value = table.column(column)[position]
+                if old_value == value and type(old_value) is type(value):
+                    continue
+                table.set(position, column, value)
+                for index_column, tree in indexes:
+                    if index_column == column:
+                        self.index_move(tree, position, old_value, table.column(column)[position])
+        for position in moved:
+            keys.add(self.primary_key_of(table_name, position))
+        self.bump_table_version(table_name)
+
+    @staticmethod
+    def index_move(tree, position, old_key, new_key):
+        """Move a row position from one key's postings to another's in an index."""
+        if old_key is not None:
+            positions = tree.get(old_key)
+            if positions is not None:
+                positions.remove(position)
+                if positions:
+                    tree[old_key] = positions
+                else:
+                    del tree[old_key]
+        if new_key is not None:
+            positions = tree.get(new_key)
+            if positions is None:
+                tree[new_key] = [position]
+            else:
+                positions.append(position)
+
     def write_csv(self, table_name):
+        """
+        Write a table from memory to its CSV file.
+
+        The rows go to a temporary file that then replaces the table file, so a crash
+        mid-write leaves the previous version of the file intact.
+
+        Returns:
+            str or None: An error message, or None on success.
+        """
         filename = os.path.join(self.data_directory, f"{table_name}.csv")
+        temporary = filename + '.tmp'
         try:
-            with open(filename, mode='w', newline='', encoding='utf-8') as file:
-                writer = csv.DictWriter(file, fieldnames=self.schemas[table_name]['columns'].keys())
-                writer.writeheader()
-                writer.writerows(self.data[table_name])
+            table = self.data[table_name]
+            fieldnames = list(self.schemas[table_name]['columns'].keys())
+            with open(temporary, mode='w', newline='', encoding='utf-8') as file:
+                writer = csv.writer(file)
+                writer.writerow(fieldnames)
+                # Write straight from the columns instead of building a dict per row
+                missing = [None] * len(table)
+                writer.writerows(zip(*[table.columns.get(name, missing) for name in fieldnames]))
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary, filename)
             #logging.info(f"Data for {table_name} successfully written to CSV.")
         except Exception as e:
             #logging.error(f"Failed to write to {filename}: {e}")
             return f"Error: Failed to write data due to {e}"
+        # The file now matches memory, so the next refresh can keep the cached table
+        self.file_signatures[filename] = self.file_signature(filename)
 
-    def insert_data(self, table_name, data):
-        # Check if schema exists for the table
-        if table_name in self.schemas:
+    def log_keys(self, table_name, positions):
+        """Return the primary key of each row position for a log record, or None without a primary key."""
+        if not self.primary_key_columns(table_name):
+            return None
+        return [self.primary_key_of(table_name, position) for position in positions]
+
+    def log_change(self, prepare):
+        """
+        Write a change record to the log, apply it in memory, then wait until the record
+        is on disk.
+
+        prepare() is called with self.lock held and returns the record and a function
+        applying it, so the log keeps the order the changes were applied in. The wait for
+        the fsync happens after the lock is released, so concurrent writers share one
+        group commit. If the commit fails, the change is rolled back (see roll_back).
+
+        Returns:
+            str or None: An error message, or None once the change is durable.
+        """
+        with self.lock:
+            record, apply = prepare()
+            try:
+                lsn = self.wal.append(record)
+            except Exception as e:
+                #logging.error(f"Failed to write to the log: {e}")
+                return f"Error: Failed to write data due to {e}"
+            apply()
+            self.dirty_tables.add(record['table'])
+        try:
+            self.wal.commit(lsn)
+        except Exception as e:
+            #logging.error(f"Failed to sync the log: {e}")
+            self.roll_back()
+            return f"Error: Failed to write data due to {e}"
+        if self.wal.size() >= self.checkpoint_bytes:
+            self.checkpoint_requested.set()
+        return None
+
+    def roll_back(self):
+        """
+        Undo the changes whose log records may not be on disk, after a commit failed.
+
+        The changed tables are reloaded from their files and the log is replayed only up
+        to the last record known to be durable. The tables are then written out and the
+        log, whose tail cannot be trusted, is emptied.
+
+        Returns:
+            str or None: An error message, or None on success.
+        """
+        with self.lock:
+            durable_lsn = self.wal.durable_lsn
+            for table_name in list(self.dirty_tables):
+                if table_name in self.schemas:
+                    self.load_table(table_name)
+            self.replay(record for record in self.wal.records() if record['lsn'] <= durable_lsn)
+            self.wal.abandon()
+            return self.write_checkpoint()
+
+    def checkpoint(self):
+        """
+        Write every table changed since the last checkpoint to its CSV file, record
+        that in the checkpoint file, and empty the log.
+
+        The log is synced first, so no change reaches a table file before its record
+        is durable; if it cannot be, the changes it may have lost are rolled back instead.
+
+        Returns:
+            str or None: An error message, or None on success.
+        """
+        with self.lock:
+            try:
+                self.wal.commit()
+            except Exception:
+                return self.roll_back()
+            return self.write_checkpoint()
+
+    def write_checkpoint(self):
+        """Write out the changed tables and empty the log, without syncing the log first."""
+        with self.lock:
+            lsn = self.wal.written_lsn
+            for table_name in sorted(self.dirty_tables):
+                if table_name in self.data and table_name in self.schemas:
+                    result = self.write_csv(table_name)
+                    if result is not None:
+                        return result  # The log is kept, so nothing is lost
+                    self.checkpoint_state.save([table_name], lsn)
+                self.dirty_tables.discard(table_name)
+            if self.wal.size() or self.wal.written_lsn > self.checkpoint_state.lsn:
+                self.checkpoint_state.save([], lsn)
+                self.wal.truncate()
+        return None
+
+    def run_checkpoints(self):
+        """Background thread: checkpoint periodically, or early when the log grows large."""
+        while True:
+            self.checkpoint_requested.wait(self.checkpoint_interval)
+            self.checkpoint_requested.clear()
+            if self.dirty_tables:
+                try:
+                    self.checkpoint()
+                except Exception as e:
+                    #logging.error(f"Checkpoint failed: {e}")
+                    pass
+
+    def recover(self):
+        """
+        Replay the log records that are not yet in the table files, then checkpoint.
+
+        Records already contained in a table file (per the checkpoint file) are skipped.
+        Inserts of a primary key that already exists are skipped too, and updates and
+        deletes find their rows by primary key, so replaying a record twice is harmless.
+        """
+        with self.lock:
+            self.replay(self.wal.records())
+            self.wal.next_lsn = max(self.wal.next_lsn, self.checkpoint_state.lsn + 1)
+            self.wal.written_lsn = self.wal.durable_lsn = self.wal.next_lsn - 1
+            self.checkpoint()
+
+    def replay(self, records):
+        """Apply logged changes that are not yet in the table files. Called with self.lock held."""
+        key_positions = {}  # Table name -> {primary key: position}, built on the first row not found where logged
+        for record in records:
+            table_name = record['table']
+            if table_name not in self.schemas or self.checkpoint_state.applied(table_name, record['lsn']):
+                continue
             if table_name not in self.data:
-                self.data[table_name] = []
-            self.data[table_name].append(data)
-            self.write_csv(table_name)  # Ensure data is written to file after insertion
-            return "Data inserted successfully."
-        else:
+                self.data[table_name] = Table(self.schemas[table_name])
+            if record['op'] == 'insert':
+                columns = list(self.schemas[table_name]['columns'])
+                rows = [dict(zip(columns, values)) for values in record['rows']]
+                existing = self.primary_key_index(table_name)
+                if existing is not None:
+                    rows = [row for row, key in zip(rows, record['keys']) if tuple(key) not in existing]
+                start = len(self.data[table_name])
+                self.apply_insert(table_name, rows)
+                positions = key_positions.get(table_name)
+                if positions is not None:
+                    for position in range(start, len(self.data[table_name])):
+                        positions[self.primary_key_of(table_name, position)] = position
+            elif record['op'] == 'update':
+                changes = {}
+                for position, key, values in record['changes']:
+                    position = self.locate_row(table_name, position, key, key_positions)
+                    if position is not None:
+                        changes[position] = values
+                self.apply_update(table_name, changes)
+                primary_keys = self.primary_key_columns(table_name)
+                if any(column in values for values in changes.values() for column in primary_keys):
+                    key_positions.pop(table_name, None)
+            else:
+                keys = record['keys'] or [None] * len(record['positions'])
+                positions = [self.locate_row(table_name, position, key, key_positions)
+                             for position, key in zip(record['positions'], keys)]
+                self.apply_delete(table_name, [position for position in positions if position is not None])
+                key_positions.pop(table_name, None)  # The rows after each deleted one moved up
+            self.dirty_tables.add(table_name)
+
+    def locate_row(self, table_name, position, key, key_positions):
+        """
+        Return the current position of a logged row: by primary key if there is one, else as logged.
+
+        Args:
+            key_positions (dict): The replay's maps of primary key to position, per table;
+                a table's map is built here the first time a row is not where it was logged.
+        """
+        table = self.data[table_name]
+        if key is None:
+            return position if position < len(table) else None
+        key = tuple(key)
+        if position < len(table) and self.primary_key_of(table_name, position) == key:
+            return position
+        positions = key_positions.get(table_name)
+        if positions is None:
+            columns = [table.column(column) for column in self.primary_key_columns(table_name)]
+            positions = key_positions[table_name] = {candidate_key: candidate
+                                                     for candidate, candidate_key in enumerate(zip(*columns))}
+        return positions.get(key)
+
+    def compact_table(self, table_name):
+        """Rewrite a table's CSV file from memory in canonical form (header, schema column order, CRLF endings)."""
+        if table_name not in self.data:
             return "Error: Table does not exist."
+        with self.lock:
+            result = self.write_csv(table_name)
+            if result is not None:
+                return result
+            if table_name in self.dirty_tables:
+                self.checkpoint_state.save([table_name], self.wal.written_lsn)
+                self.dirty_tables.discard(table_name)
+        return f"Table {table_name} compacted."
+
+    @contextlib.contextmanager
+    def snapshot(self, table_names):
+        """
+        Read a consistent version of some tables for the rest of a with-block.
+
+        The tables' current versions, with their indexes, are pinned all at once, and
+        get_table_data and get_index return the pinned versions to the calling thread.
+        Writers do not wait for the snapshot: a writer that finds the current version
+        pinned changes a copy of it instead (copy-on-write), and the old version is freed
+        as soon as the last snapshot reading it ends.
+
+        Args:
+            table_names (iterable of str): The tables the reader will use.
+        """
+        previous = getattr(self.local, 'snapshot', None) or {}
+        with self.lock:
+            versions = {}
+            for table_name in table_names:
+                table = self.data.get(table_name)
+                if table is None or table_name in versions or table_name in previous:
+                    continue  # A nested snapshot keeps reading the enclosing snapshot's version
+                table.readers += 1
+                indexes = {column: tree for (index_table, column, _), tree in self.indexes.items() if index_table == table_name}
+                versions[table_name] = (table, indexes)
+        self.local.snapshot = {**previous, **versions}
+        try:
+            yield
+        finally:
+            self.local.snapshot = previous or None
+            with self.lock:
+                for table, _ in versions.values():
+                    table.readers -= 1
+
+    def writable_table(self, table_name):
+        """
+        Return the version of a table a writer may change in place. If a snapshot is
+        reading the current version, it and its indexes are copied first and the copy
+        becomes current. Called with self.lock held.
+        """
+        table = self.data[table_name]
+        if not table.readers:
+            return table
+        table = self.data[table_name] = table.copy()
+        self.copy_indexes(table_name)
+        return table
+
+    def copy_indexes(self, table_name):
+        """Replace the trees of a table's indexes with copies, leaving the old ones to the snapshots reading them."""
+        for key, tree in list(self.indexes.items()):
+            if key[0] == table_name:
+                copy = BTree()
+                copy.update([(value, list(positions)) for value, positions in tree.items()])
+                self.indexes[key] = copy
+
+    def insert_data(self, table_name, data):
+        result = self.insert_rows(table_name, [data])
+        return result if result is not None else "Data inserted successfully."
         
+    def insert_rows(self, table_name, rows):
+        """
+        Insert a batch of already validated rows with one log record.
+
+        The indexes are extended once for the whole batch: the new positions are grouped
+        by key and the keys are merged into each B-tree in sorted order.
+
+        Args:
+            table_name (str): The table to insert into.
+            rows (list of dict): Rows keyed by column name.
+
+        Returns:
+            str or None: An error message, or None on success.
+        """
+        if table_name not in self.schemas:
+            return "Error: Table does not exist."
+        def prepare():
+            if table_name not in self.data:
+                self.data[table_name] = Table(self.schemas[table_name])
+                self.primary_key_indexes.pop(table_name, None)
+            columns = list(self.schemas[table_name]['columns'])
+            primary_keys = self.primary_key_columns(table_name)
+            table = self.data[table_name]
+            record = {'op': 'insert', 'table': table_name,
+                      'rows': [[row.get(column) for column in columns] for row in rows],
+                      'keys': [[to_native(row.get(column), table.column_types[column]) for column in primary_keys] for row in rows] if primary_keys else None}
+            return record, lambda: self.apply_insert(table_name, rows)
+        return self.log_change(prepare)
+
+    def apply_insert(self, table_name, rows):
+        table = self.writable_table(table_name)
+        start = len(table)
+        for row in rows:
+            table.append(row)
+        self.index_insert_many(table_name, range(start, len(table)))
+        keys = self.primary_key_indexes.get(table_name)
+        if keys is not None:
+            for position in range(start, len(table)):
+                keys.add(self.primary_key_of(table_name, position))
+        self.bump_table_version(table_name)
+
+    def index_insert_many(self, table_name, positions):
+        """Add the rows at the given positions to every index of the table, one sorted merge per index."""
+        table = self.data[table_name]
+        for (index_table, column, _), tree in list(self.indexes.items()):
+            if index_table != table_name:
+                continue
+            values = table.column(column)
+            postings = {}
+            for position in positions:
+                key = values[position]
+                if key is None:
+                    continue
+                if key in postings:
+                    postings[key].append(position)
+                else:
+                    postings[key] = [position]
+            new_keys = []
+            for key in sorted(postings):
+                existing = tree.get(key)
+                if existing is None:
+                    new_keys.append((key, postings[key]))
+                else:
+                    existing.extend(postings[key])
+            tree.update(new_keys)
+
     def get_table_data(self, table_name):
+        snapshot = getattr(self.local, 'snapshot', None)
+        if snapshot is not None and table_name in snapshot:
+            return snapshot[table_name][0]
         table_data = self.data.get(table_name, [])
         # print(f"Table Data for {table_name}: {table_data}")  # Debugging statement
         return table_data
     
     def get_table_data_w_datatype(self, table_name):
-        table_data = self.data.get(table_name, [])
-        table_schema = self.get_schema(table_name)
-        int_col = []
-        for col in table_schema['columns']:
-            if(table_schema['columns'][col]['type']) == 'int':
-                int_col.append(col)
-        for data in table_data:
-            data.update((k, int(v)) for k, v in data.items() if k in int_col)
+        # Tables are typed when they are loaded; this returns the rows as a list of dicts
+        table_data = list(self.data.get(table_name, []))
 
         # print(f"Table Data for {table_name}: {table_data}")  # Debugging statement
         return table_data
@@ -334,7 +1068,7 @@ class StorageManager:
         
     def create_index(self, table_name, column_name, index_name):
         # Ensure the table exists
-        self.load_latest_data()
+        self.refresh_data()
         if not self.table_exists(table_name):
             return f"Error: Table '{table_name}' does not exist."
 
@@ -367,18 +1101,14 @@ class StorageManager:
         # Add the index to the runtime dictionary if it does not exist
         index_key = (table_name, column_name, index_name)
         if index_key not in self.indexes:
-            self.indexes[index_key] = BTree()
-
             # Populate the BTree with existing data
-            for row in self.data.get(table_name, []):
-                key = row[column_name]
-                if key in self.indexes[index_key]:
-                    self.indexes[index_key][key].append(row)
-                else:
-                    self.indexes[index_key][key] = [row]
+            tree = self.build_index(table_name, column_name)
+            if tree is not None:
+                self.indexes[index_key] = tree
 
         self.save_schema(table_name)
-        self.load_latest_schema()
+        self.refresh_schemas()
+        self.bump_table_version(table_name)
         return f"Index {index_name} created on {table_name}({column_name})."
     
     def save_schema(self, table_name):
@@ -394,7 +1124,7 @@ class StorageManager:
         
     def drop_index(self, table_name, index_name):
         # Verify index existence
-        self.load_latest_schema()
+        self.refresh_schemas()
         if not self.index_exists(table_name, index_name, check_file=True):
             return f"Error: Index '{index_name}' does not exist on table '{table_name}'."
 
@@ -409,14 +1139,15 @@ class StorageManager:
             del self.indexes[key]
 
         # self.save_schema(table_name)
-        self.load_latest_schema()
+        self.refresh_schemas()
+        self.bump_table_version(table_name)
         return f"Index '{index_name}' dropped from '{table_name}'."
 
 
     def index_exists(self, table_name, index_name, check_file=False):
         # Check in-memory first
-        self.load_latest_schema()
-        self.load_indexes_for_table(table_name)
+        self.refresh_schemas()
+        self.load_indexes_for_table(table_name, rebuild=False)
         in_memory_check = any(key[2] == index_name and key[0] == table_name for key in self.indexes.keys())
         if in_memory_check:
             return True
@@ -483,11 +1214,7 @@ class StorageManager:
         Returns:
             bool: True if an index exists, False otherwise.
         """
-        schema = self.get_schema_index(table)
-        if schema:
-            indexes = schema.get('indexes', [])
-            return any(index['column'] == column for index in indexes)
-        return False
+        return self.get_index(table, column) is not None
     
     def get_schema_index(self, table_name):
         """
@@ -520,29 +1247,3 @@ class StorageManager:
         """
         # This will return a list of all table names for which schemas are defined.
         return [filename[:-4] for filename in os.listdir(self.data_directory) if filename.endswith('.csv')]
-
-    def update_table_data_2(self, table_name, new_values, retrieved_data, condition_func):
-        """
-        Updates data in a table based on the specified conditions and new values.
-
-        Args:
-            table_name (str): The table to update.
-            new_values (dict): New values for the update operation.
-            retrieved_data (list of dict): Data retrieved based on conditions.
-            condition_func (callable): Function to filter data to update.
-
-        Returns:
-            int: Number of rows updated.
-        """
-        updated_data = []
-        for row in retrieved_data:
-            if condition_func(row):
-                row.update(new_values)
-                updated_data.append(row)
-
-        # Now delete old data and insert updated data
-        self.delete_data(table_name, condition_func)
-        for row in updated_data:
-            self.insert_data(table_name, row)
-
-        return len(updated_data)
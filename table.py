@@ -0,0 +1,217 @@
+# TABLE.py
+
+import sys
+from array import array
+
+# Schema types stored as 64-bit integers
+INTEGER_TYPES = {'int', 'year'}
+
+
+def convert_value(value, column_type):
+    """
+    Convert a raw CSV or SQL value to the native value for a schema column type.
+
+    Args:
+        value: The raw value, usually a string.
+        column_type (str): The schema type ('int', 'year', 'varchar', ...).
+
+    Returns:
+        int, str or None: The native value; empty integers become None.
+
+    Raises:
+        ValueError: If an integer column receives a non-numeric value.
+    """
+    if value is None:
+        return None
+    if column_type in INTEGER_TYPES:
+        if isinstance(value, int):
+            return value
+        text = str(value).strip()
+        if text == '':
+            return None
+        return int(text)
+    return sys.intern(str(value))
+
+
+def to_native(value, column_type):
+    """Like convert_value, but keeps values that do not fit the column type as they are."""
+    try:
+        return convert_value(value, column_type)
+    except ValueError:
+        return value
+
+
+class Table:
+    """
+    A table held as typed columns: array('q') for int/year columns and lists of
+    interned strings for varchar columns. Values are converted once, when the
+    table is loaded or a row is added, so scans work on native values.
+    """
+
+    def __init__(self, schema, column_names=None):
+        columns = schema.get('columns', {}) if schema else {}
+        self.column_names = list(column_names) if column_names else list(columns)
+        self.column_types = {
+            name: columns.get(name, {}).get('type', 'varchar').lower() for name in self.column_names
+        }
+        self.columns = {name: self._empty_column(name) for name in self.column_names}
+        self.length = 0
+        self.readers = 0  # Snapshots currently reading this version; writers copy it while non-zero
+
+    @classmethod
+    def from_records(cls, schema, header, records):
+        """
+        Build a table from CSV records (lists of strings) in a single pass per column.
+
+        Args:
+            schema (dict): The table schema.
+            header (list): Column names in file order.
+            records (list of list): The data rows.
+
+        Returns:
+            Table: The loaded table.
+        """
+        table = cls(schema, header)
+        width = len(table.column_names)
+        if records and width:
+            records = [r if len(r) == width else (r + [''] * width)[:width] for r in records]
+            for name, values in zip(table.column_names, zip(*records)):
+                table.columns[name] = table._build_column(name, values)
+            table.length = len(records)
+        return table
+
+    def _empty_column(self, name):
+        return array('q') if self.column_types[name] in INTEGER_TYPES else []
+
+    def _build_column(self, name, values):
+        column_type = self.column_types[name]
+        if column_type in INTEGER_TYPES:
+            try:
+                return array('q', map(int, values))
+            except (ValueError, OverflowError):
+                # NULLs or malformed numbers: fall back to a plain list of native values
+                return [to_native(value, column_type) for value in values]
+        return list(map(sys.intern, values))
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        names = self.column_names
+        for values in zip(*[self.columns[name] for name in names]):
+            yield dict(zip(names, values))
+
+    def column(self, name):
+        """Return the stored sequence of native values for a column."""
+        return self.columns[name]
+
+    def row(self, position):
+        """Materialize the row at a position as a dict."""
+        return {name: self.columns[name][position] for name in self.column_names}
+
+    def rows(self, positions):
+        """Materialize the rows at the given positions as dicts."""
+        return [self.row(position) for position in positions]
+
+    def scan(self, predicate=None):
+        """
+        Yield rows as dicts, evaluating the predicate on a reusable cursor first so
+        rows that do not match are never materialized.
+
+        Args:
+            predicate (callable): Optional function taking a row-like object.
+
+        Yields:
+            dict: Each matching row.
+        """
+        if predicate is None:
+            yield from self
+            return
+        cursor = RowCursor(self)
+        for position in range(self.length):
+            cursor.position = position
+            if predicate(cursor):
+                yield self.row(position)
+
+    def append(self, row):
+        """Append a row given as a dict, converting its values to the column types."""
+        for name in self.column_names:
+            self._append_value(name, to_native(row.get(name), self.column_types[name]))
+        self.length += 1
+
+    def _append_value(self, name, value):
+        column = self.columns[name]
+        try:
+            column.append(value)
+        except (TypeError, OverflowError):
+            # A NULL, non-numeric or oversized value cannot live in a typed array
+            column = self.columns[name] = list(column)
+            column.append(value)
+
+    def set(self, position, name, value):
+        """Overwrite one stored value in place, converting it to the column type."""
+        value = to_native(value, self.column_types[name])
+        column = self.columns[name]
+        try:
+            column[position] = value
+        except (TypeError, OverflowError):
+            column = self.columns[name] = list(column)
+            column[position] = value
+
+    def take(self, positions):
+        """Return a new table holding only the rows at the given positions, in order."""
+        table = Table.__new__(Table)
+        table.column_names = list(self.column_names)
+        table.column_types = dict(self.column_types)
+        table.columns = {}
+        for name, column in self.columns.items():
+            if isinstance(column, array):
+                table.columns[name] = array(column.typecode, [column[i] for i in positions])
+            else:
+                table.columns[name] = [column[i] for i in positions]
+        table.length = len(positions)
+        table.readers = 0
+        return table
+
+    def slice(self, start, stop):
+        """Return a new table holding the rows in positions [start, stop), e.g. to ship to a worker process."""
+        table = Table.__new__(Table)
+        table.column_names = list(self.column_names)
+        table.column_types = dict(self.column_types)
+        table.columns = {name: column[start:stop] for name, column in self.columns.items()}
+        table.length = len(range(start, min(stop, self.length)))
+        table.readers = 0
+        return table
+
+    def copy(self):
+        """Return an independent copy of the table, for a writer to change while readers keep this one."""
+        table = Table.__new__(Table)
+        table.column_names = list(self.column_names)
+        table.column_types = dict(self.column_types)
+        table.columns = {name: column[:] for name, column in self.columns.items()}
+        table.length = self.length
+        table.readers = 0
+        return table
+
+
+class RowCursor:
+    """A read-only, dict-like view of one table row that is moved from row to row."""
+
+    __slots__ = ('table', 'position')
+
+    def __init__(self, table, position=0):
+        self.table = table
+        self.position = position
+
+    def __getitem__(self, name):
+        return self.table.columns[name][self.position]
+
+    def __contains__(self, name):
+        return name in self.table.columns
+
+    def get(self, name, default=None):
+        column = self.table.columns.get(name)
+        return default if column is None else column[self.position]
+
+    def keys(self):
+        return list(self.table.column_names)
@@ -0,0 +1,28 @@
+# CONFTEST.py
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from execution_engine import ExecutionEngine
+from sql_parser import parse_sql
+from storage import get_storage_manager
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """An ExecutionEngine over an empty data directory."""
+    return ExecutionEngine(get_storage_manager(str(tmp_path / "data")))
+
+
+@pytest.fixture
+def run(engine):
+    """Parse and execute one statement, failing the test on a parse error."""
+    def run(sql, parameters=None, session=None):
+        command = parse_sql(sql, parameters, session)
+        assert command and 'error' not in command, command
+        return engine.execute_query(command)
+    return run
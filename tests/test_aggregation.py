@@ -0,0 +1,28 @@
+# TEST_AGGREGATION.py
+
+
+def create_sales(run):
+    run("CREATE TABLE sales (region VARCHAR(10), amount INT)")
+    run("INSERT INTO sales (region, amount) VALUES ('east', 10), ('east', 5), ('west', 7);")
+
+
+def test_lowercase_aggregates(engine, run):
+    create_sales(run)
+    assert run("SELECT count(*) FROM sales") == [{'count(*)': 3}]
+    assert run("SELECT sum(amount), max(amount) FROM sales") == [{'sum(amount)': 22, 'max(amount)': 10}]
+    assert run("SELECT count(*) as n FROM sales") == [{'n': 3}]
+
+
+def test_lowercase_aggregates_with_group_by(engine, run):
+    create_sales(run)
+    rows = run("SELECT region, count(*), sum(amount) FROM sales GROUP BY region ORDER BY region")
+    assert rows == [{'region': 'east', 'count(*)': 2, 'sum(amount)': 15},
+                    {'region': 'west', 'count(*)': 1, 'sum(amount)': 7}]
+
+
+def test_having_and_order_by_on_aggregates(engine, run):
+    create_sales(run)
+    run("INSERT INTO sales (region, amount) VALUES ('north', 1), ('north', 2), ('north', 3);")
+    rows = run("SELECT region, count(*) FROM sales GROUP BY region HAVING count(*) > 1 AND sum(amount) < ? "
+               "ORDER BY count(*) DESC, region", [100])
+    assert rows == [{'region': 'north', 'count(*)': 3}, {'region': 'east', 'count(*)': 2}]
@@ -0,0 +1,42 @@
+# TEST_DML.py
+
+
+def create_accounts(run):
+    run("CREATE TABLE accounts (id INT PRIMARY KEY, owner VARCHAR(10), balance INT)")
+    run("INSERT INTO accounts (id, owner, balance) VALUES (1, 'ann', 10), (2, 'bob', 20), (3, 'cy', 30);")
+
+
+def test_update_may_set_a_row_to_its_own_primary_key(engine, run):
+    create_accounts(run)
+    assert run("UPDATE accounts SET id = 2 WHERE id = 2;") == 'Updated 1 rows in accounts.'
+    assert run("UPDATE accounts SET id = 2, owner = 'bo' WHERE owner = 'bob';") == 'Updated 1 rows in accounts.'
+    assert 'duplication' in run("UPDATE accounts SET id = 1 WHERE id = 2;")
+    assert run("SELECT * FROM accounts WHERE id = 2") == [{'id': 2, 'owner': 'bo', 'balance': 20}]
+
+
+def balances(run):
+    return [(row['id'], row['balance']) for row in run("SELECT * FROM accounts")]
+
+
+def test_delete_removes_every_matching_row_at_once(engine, run):
+    create_accounts(run)
+    run("INSERT INTO accounts (id, owner, balance) VALUES (4, 'dee', 40), (5, 'eve', 50);")
+    assert run("DELETE FROM accounts WHERE balance > 15 AND owner <> 'dee';") == 'Deleted 3 rows from accounts.'
+    assert balances(run) == [(1, 10), (4, 40)]
+    assert run("DELETE FROM accounts WHERE id = 99;") == 'No rows matched the conditions or needed deletion.'
+    assert run("DELETE FROM accounts;") == 'Deleted 2 rows from accounts.'
+    assert balances(run) == []
+    run("INSERT INTO accounts (id, owner, balance) VALUES (1, 'new', 1);")  # Deleted keys are free again
+    assert balances(run) == [(1, 1)]
+
+
+def test_update_sets_expressions_on_every_matching_row(engine, run):
+    create_accounts(run)
+    run("CREATE INDEX balance_idx ON accounts (balance)")
+    assert run("UPDATE accounts SET balance = balance * 2 + 1 WHERE id >= 2;") == 'Updated 2 rows in accounts.'
+    assert balances(run) == [(1, 10), (2, 41), (3, 61)]
+    assert run("UPDATE accounts SET balance = 0, owner = 'x' WHERE owner = 'ann' OR balance = 61;") == 'Updated 2 rows in accounts.'
+    assert [(row['owner'], row['balance']) for row in run("SELECT * FROM accounts")] == [('x', 0), ('bob', 41), ('x', 0)]
+    assert [row['id'] for row in run("SELECT * FROM accounts WHERE balance = 0")] == [1, 3]  # Through the index
+    assert run("UPDATE accounts SET balance = 5;") == 'Updated 3 rows in accounts.'
+    assert balances(run) == [(1, 5), (2, 5), (3, 5)]
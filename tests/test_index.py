@@ -0,0 +1,67 @@
+# TEST_INDEX.py
+
+from sql_parser import parse_sql
+
+
+def create_zip_table(run, table_name, indexed):
+    run(f"CREATE TABLE {table_name} (zip VARCHAR(5), city VARCHAR(20))")
+    for zip_code, city in [('02134', 'Allston'), ('2134', 'Nowhere'), ('10001', 'New York')]:
+        run(f"INSERT INTO {table_name} (zip, city) VALUES ('{zip_code}', '{city}');")
+    if indexed:
+        run(f"CREATE INDEX {table_name}_zip ON {table_name} (zip)")
+
+
+def cities(rows):
+    return sorted(row['city'] for row in rows)
+
+
+def test_quoted_key_with_leading_zero_matches_on_both_paths(engine, run):
+    results = {}
+    for table_name, indexed in (('scanned', False), ('indexed', True)):
+        create_zip_table(run, table_name, indexed)
+        results[indexed] = (cities(run(f"SELECT * FROM {table_name} WHERE zip = '02134'")),
+                            cities(run(f"SELECT * FROM {table_name} WHERE zip IN ('02134', '10001')")))
+    assert results[False] == results[True] == (['Allston'], ['Allston', 'New York'])
+
+
+def test_indexed_update_and_delete_find_leading_zero_keys(engine, run):
+    create_zip_table(run, 'places', indexed=True)
+    run("UPDATE places SET city = 'Boston' WHERE zip = '02134';")
+    assert cities(run("SELECT * FROM places WHERE zip = '02134'")) == ['Boston']
+    run("DELETE FROM places WHERE zip = '02134';")
+    assert cities(run("SELECT * FROM places")) == ['New York', 'Nowhere']
+
+
+def test_quoted_number_still_matches_integer_column(engine, run):
+    run("CREATE TABLE years (year INT, label VARCHAR(10))")
+    run("INSERT INTO years (year, label) VALUES (2018, 'a');")
+    run("INSERT INTO years (year, label) VALUES (2019, 'b');")
+    assert [row['label'] for row in run("SELECT * FROM years WHERE year = '2018'")] == ['a']
+    run("CREATE INDEX year_idx ON years (year)")
+    assert [row['label'] for row in run("SELECT * FROM years WHERE year = '2018'")] == ['a']
+    assert [row['label'] for row in run("SELECT * FROM years WHERE year > '2018'")] == ['b']
+
+
+def test_delete_keeps_indexes_in_step_with_the_rows(engine, run):
+    storage = engine.storage_manager
+    run("CREATE TABLE items (id INT, color VARCHAR(10))")
+    colors = ['red', 'green', 'blue']
+    run("INSERT INTO items (id, color) VALUES " + ", ".join(f"({i}, '{colors[i % 3]}')" for i in range(30)) + ";")
+    run("CREATE INDEX items_id ON items (id)")
+    run("CREATE INDEX items_color ON items (color)")
+    run("DELETE FROM items WHERE id < 4 OR color = 'green';")
+    run("DELETE FROM items WHERE id = 27;")
+    for column in ('id', 'color'):
+        tree = storage.get_index('items', column)
+        rebuilt = storage.build_index('items', column)
+        assert {key: sorted(positions) for key, positions in tree.items()} == dict(rebuilt.items())
+    assert [row['id'] for row in run("SELECT * FROM items WHERE color = 'blue'")] == [5, 8, 11, 14, 17, 20, 23, 26, 29]
+    assert run("SELECT * FROM items WHERE id = 29") == [{'id': 29, 'color': 'blue'}]
+
+
+def test_aliased_table_uses_its_index(engine, run):
+    create_zip_table(run, 'places', indexed=True)
+    command = parse_sql("SELECT city FROM places AS p WHERE p.zip = '10001'")
+    assert engine.find_index_lookup(command['main_table'], command) == ('zip', ['10001'])
+    assert cities(run("SELECT city FROM places AS p WHERE p.zip = '10001'")) == ['New York']
+    assert cities(run("SELECT city FROM places AS p WHERE p.zip < '2' AND p.city LIKE 'N%'")) == ['New York']
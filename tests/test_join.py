@@ -0,0 +1,69 @@
+# TEST_JOIN.py
+
+import pytest
+
+
+def expected_join(main_rows, join_rows, join_type):
+    rows = [(m['k'], m['v'], j['w']) for m in main_rows for j in join_rows if m['k'] == j['k']]
+    if join_type == 'left':
+        rows += [(m['k'], m['v'], None) for m in main_rows if not any(m['k'] == j['k'] for j in join_rows)]
+    if join_type == 'right':
+        rows += [(None, None, j['w']) for j in join_rows if not any(m['k'] == j['k'] for m in main_rows)]
+    return sorted(rows, key=repr)
+
+
+@pytest.mark.parametrize('join_type', ['inner', 'left', 'right'])
+@pytest.mark.parametrize('main_size', [5, 40])
+def test_hash_join_with_streamed_main_input(engine, join_type, main_size):
+    main_rows = [{'k': i % 7, 'v': i} for i in range(main_size)]
+    join_rows = [{'k': i % 11, 'w': i} for i in range(20)]
+    engine.hash_join_memory_rows = 10  # the 40-row stream neither fits nor is the smaller side
+    rows = engine.hash_join((row for row in main_rows), join_rows, 'a.k', 'b.k', 'a', 'b',
+                            ['a.k', 'a.v', 'b.w'], join_type)
+    result = sorted(((row['a.k'], row['a.v'], row['b.w']) for row in rows), key=repr)
+    assert result == expected_join(main_rows, join_rows, join_type)
+
+
+def test_small_streamed_main_input_is_the_build_side(engine, monkeypatch):
+    builds = []
+    hash_join_rows = engine.hash_join_rows
+
+    def recording(build, *args):
+        builds.append(build)
+        return hash_join_rows(build, *args)
+    monkeypatch.setattr(engine, 'hash_join_rows', recording)
+    main_rows = [{'k': 1, 'v': 1}, {'k': 2, 'v': 2}]
+    join_rows = [{'k': i, 'w': i} for i in range(100)]
+    rows = list(engine.hash_join(iter(main_rows), join_rows, 'a.k', 'b.k', 'a', 'b', ['a.v', 'b.w'], 'inner'))
+    assert sorted(row['b.w'] for row in rows) == [1, 2]
+    assert builds == [main_rows]
+
+
+@pytest.mark.parametrize('join_type', ['JOIN', 'LEFT JOIN', 'RIGHT JOIN'])
+def test_large_indexed_join_input_uses_merge_join(engine, run, monkeypatch, join_type):
+    run("CREATE TABLE orders (id INT, customer INT)")
+    run("CREATE TABLE customers (id INT, name VARCHAR(10))")
+    run("INSERT INTO orders (id, customer) VALUES " + ", ".join(f"({i}, {i % 9})" for i in range(30)) + ";")
+    run("INSERT INTO customers (id, name) VALUES " + ", ".join(f"({i}, 'c{i}')" for i in range(3, 15)) + ";")
+    query = (f"SELECT o.id, c.name FROM orders AS o {join_type} customers AS c ON o.customer = c.id "
+             "WHERE o.id < 25")
+    hashed = run(query)
+
+    run("CREATE INDEX customers_id ON customers (id)")
+    methods = []
+    decide_join_method = engine.decide_join_method
+    monkeypatch.setattr(engine, 'decide_join_method', lambda *args: methods.append(decide_join_method(*args)) or methods[-1])
+    engine.hash_join_memory_rows = 5
+    merged = run(query)
+    assert methods == [engine.merge_join]
+    assert sorted(merged, key=repr) == sorted(hashed, key=repr) and len(merged) >= 15
+
+
+def test_where_on_joined_columns_filters_after_the_join(engine, run):
+    run("CREATE TABLE teams (id INT, name VARCHAR(10))")
+    run("CREATE TABLE players (id INT, team INT)")
+    run("INSERT INTO teams (id, name) VALUES (1, 'red'), (2, 'blue');")
+    run("INSERT INTO players (id, team) VALUES (10, 1), (11, 2), (12, 2);")
+    rows = run("SELECT p.id, t.name FROM players AS p JOIN teams AS t ON p.team = t.id "
+               "WHERE t.name = 'blue' AND p.id > 11")
+    assert rows == [{'p.id': 12, 't.name': 'blue'}]
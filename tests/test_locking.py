@@ -0,0 +1,48 @@
+# TEST_LOCKING.py
+
+import threading
+
+
+def start(function, *args):
+    thread = threading.Thread(target=function, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_concurrent_inserts_all_land(engine, run):
+    run("CREATE TABLE hits (id INT PRIMARY KEY, worker INT)")
+    def insert(worker):
+        for number in range(25):
+            assert run(f"INSERT INTO hits (id, worker) VALUES ({worker * 100 + number}, {worker});") == 'Data inserted successfully.'
+    for thread in [start(insert, worker) for worker in range(8)]:
+        thread.join()
+    assert run("SELECT COUNT(*) FROM hits") == [{'COUNT(*)': 200}]
+
+
+def test_a_writer_waits_for_the_table_but_not_for_other_tables_or_readers(engine, run):
+    run("CREATE TABLE left_side (id INT, name VARCHAR(10))")
+    run("CREATE TABLE right_side (id INT, name VARCHAR(10))")
+    run("INSERT INTO left_side (id, name) VALUES (1, 'a');")
+    with engine.storage_manager.locks.statement(write_tables=['left_side']):
+        blocked = start(run, "INSERT INTO left_side (id, name) VALUES (2, 'b');")
+        other = start(run, "INSERT INTO right_side (id, name) VALUES (1, 'c');")
+        other.join(timeout=5)
+        assert not other.is_alive()
+        assert run("SELECT * FROM left_side") == [{'id': 1, 'name': 'a'}]  # Queries read a snapshot
+        blocked.join(timeout=0.2)
+        assert blocked.is_alive()
+    blocked.join(timeout=5)
+    assert not blocked.is_alive()
+    assert [row['id'] for row in run("SELECT * FROM left_side")] == [1, 2]
+
+
+def test_ddl_waits_for_running_statements(engine, run):
+    run("CREATE TABLE first (id INT)")
+    with engine.storage_manager.locks.statement(read_tables=['first']):
+        ddl = start(run, "CREATE TABLE second (id INT)")
+        ddl.join(timeout=0.2)
+        assert ddl.is_alive()
+        assert 'second' not in engine.storage_manager.schemas
+    ddl.join(timeout=5)
+    assert not ddl.is_alive()
+    assert 'second' in engine.storage_manager.schemas
@@ -0,0 +1,42 @@
+# TEST_PARALLEL.py
+
+import pytest
+
+QUERIES = [
+    "SELECT * FROM readings WHERE value > 40",
+    "SELECT r.id FROM readings AS r WHERE r.value <= 10",
+    "SELECT COUNT(*), SUM(value), AVG(value), MIN(value), MAX(value) FROM readings WHERE sensor <> 's3'",
+    "SELECT sensor, COUNT(value), AVG(value) FROM readings GROUP BY sensor",
+    "SELECT sensor, MAX(value) FROM readings GROUP BY sensor HAVING MAX(value) > 45 ORDER BY sensor",
+    "SELECT DISTINCT sensor FROM readings WHERE value < 25",
+    "SELECT * FROM readings WHERE value > 20 ORDER BY value DESC LIMIT 4",
+    "SELECT r.id, s.place FROM readings AS r JOIN sensors AS s ON r.sensor = s.sensor",
+    "SELECT s.place, r.value FROM sensors AS s LEFT JOIN readings AS r ON s.sensor = r.sensor",
+]
+
+
+@pytest.fixture
+def readings(engine, run):
+    run("CREATE TABLE readings (id INT PRIMARY KEY, sensor VARCHAR(5), value INT)")
+    run("INSERT INTO readings (id, sensor, value) VALUES "
+        + ", ".join(f"({number}, 's{number % 5}', {number * 7 % 50})" for number in range(300)) + ";")
+    run("CREATE TABLE sensors (sensor VARCHAR(5), place VARCHAR(10))")
+    run("INSERT INTO sensors (sensor, place) VALUES ('s0', 'roof'), ('s1', 'hall'), ('s2', 'cellar'), ('s9', 'shed');")
+    yield
+    if engine.parallel is not None:
+        engine.parallel.shutdown()
+
+
+def comparable(sql, result):
+    assert isinstance(result, list), result
+    return result if 'ORDER BY' in sql else sorted(map(repr, result))
+
+
+@pytest.mark.parametrize('degree', [2, 3])
+def test_parallel_plans_return_the_serial_results(engine, run, readings, degree):
+    serial = [comparable(sql, run(sql)) for sql in QUERIES]
+    engine.parallel_degree = degree
+    engine.parallel_min_rows = engine.parallel_join_min_rows = 1
+    engine.hash_join_memory_rows = 2  # The partitions of the join go to disk
+    assert [comparable(sql, run(sql)) for sql in QUERIES] == serial
+    assert engine.parallel is not None and engine.parallel.degree == degree
@@ -0,0 +1,33 @@
+# TEST_PARAMETERS.py
+
+from sql_parser import parse_sql
+
+
+def test_bound_insert_value_with_apostrophe(engine, run):
+    run("CREATE TABLE people (id INT, name VARCHAR(20))")
+    assert run("INSERT INTO people (id, name) VALUES (?, ?);", [1, "O'Brien"]) == 'Data inserted successfully.'
+    run("INSERT INTO people (id, name) VALUES (2, 'D''Arcy'), (3, 'it''s, here');")
+    rows = run("SELECT * FROM people")
+    assert sorted(row['name'] for row in rows) == ["D'Arcy", "O'Brien", "it's, here"]
+    assert run("SELECT * FROM people WHERE name = ?", ["O'Brien"]) == [{'id': 1, 'name': "O'Brien"}]
+
+
+def test_parameters_bind_by_python_type(engine, run):
+    run("CREATE TABLE codes (code VARCHAR(5), n INT)")
+    run("INSERT INTO codes (code, n) VALUES (?, ?);", ['007', 7])
+    run("INSERT INTO codes (code, n) VALUES (?, ?);", ['7', 8])
+    assert run("SELECT * FROM codes WHERE code = ?", ['007']) == [{'code': '007', 'n': 7}]
+    assert run("SELECT * FROM codes WHERE n = ?", [7]) == [{'code': '007', 'n': 7}]
+
+
+def test_prepared_statements_belong_to_their_session(engine, run):
+    run("CREATE TABLE codes (code VARCHAR(5), n INT)")
+    run("INSERT INTO codes (code, n) VALUES ('007', 7);")
+    first, second = {}, {}
+    run("PREPARE by_code FROM 'SELECT n FROM codes WHERE code = ?'", session=first)
+    assert run("EXECUTE by_code USING '007'", session=first) == [{'n': 7}]
+    assert parse_sql("EXECUTE by_code USING '007'", prepared=second)['error'] == \
+        "Error: No prepared statement named 'by_code'."
+    assert 'error' in parse_sql("EXECUTE by_code USING '007'")
+    run("DEALLOCATE by_code", session=first)
+    assert first == {}
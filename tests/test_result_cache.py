@@ -0,0 +1,50 @@
+# TEST_RESULT_CACHE.py
+
+
+def create_prices(engine, run):
+    run("CREATE TABLE prices (id INT PRIMARY KEY, item VARCHAR(10), price INT)")
+    run("INSERT INTO prices (id, item, price) VALUES (1, 'tea', 3), (2, 'cake', 5), (3, 'jam', 4);")
+    engine.enable_result_cache(1024 * 1024)
+
+
+def test_statements_differing_in_formatting_share_an_entry(engine, run):
+    create_prices(engine, run)
+    first = run("SELECT item FROM prices WHERE price=4")
+    assert run("select item  from prices where price = 4;") == first == [{'item': 'jam'}]
+    stats = engine.result_cache_stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+    run("SELECT item FROM prices WHERE price = '4'")  # A text literal is another query
+    assert engine.result_cache_stats()['entries'] == 2
+
+
+def test_show_cache_reports_the_stats(engine, run):
+    assert run("SHOW CACHE") == "Result cache is disabled."
+    create_prices(engine, run)
+    run("SELECT * FROM prices")
+    run("SELECT * FROM prices")
+    assert run("SHOW CACHE;").splitlines()[:2] == ['hits: 1', 'misses: 1']
+
+
+def test_writes_and_ddl_invalidate_cached_results(engine, run):
+    create_prices(engine, run)
+    query = "SELECT item FROM prices WHERE price > 3"
+    steps = [
+        ("INSERT INTO prices (id, item, price) VALUES (4, 'pie', 6);", ['cake', 'jam', 'pie']),
+        ("UPDATE prices SET price = 9 WHERE item = 'tea';", ['cake', 'jam', 'pie', 'tea']),
+        ("DELETE FROM prices WHERE item = 'jam';", ['cake', 'pie', 'tea']),
+        ("CREATE INDEX price_idx ON prices (price)", ['cake', 'pie', 'tea']),
+        ("DROP INDEX price_idx ON prices;", ['cake', 'pie', 'tea']),
+    ]
+    assert sorted(row['item'] for row in run(query)) == ['cake', 'jam']
+    for number, (statement, expected) in enumerate(steps, 1):
+        run(statement)
+        assert sorted(row['item'] for row in run(query)) == expected, statement
+        assert engine.result_cache_stats()['invalidations'] == number, statement
+    assert run(query) == run(query)
+    assert engine.result_cache_stats()['hits'] == 2
+
+
+def test_cached_rows_are_copies(engine, run):
+    create_prices(engine, run)
+    run("SELECT * FROM prices WHERE id = 1")[0]['item'] = 'changed'
+    assert run("SELECT * FROM prices WHERE id = 1") == [{'id': 1, 'item': 'tea', 'price': 3}]
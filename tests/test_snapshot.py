@@ -0,0 +1,42 @@
+# TEST_SNAPSHOT.py
+
+import threading
+
+
+def write_in_another_thread(run, *statements):
+    results = []
+    thread = threading.Thread(target=lambda: results.extend(run(sql) for sql in statements), daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+    assert not thread.is_alive(), "the writer waited for the snapshot"
+    return results
+
+
+def rows(table):
+    return sorted((row['id'], row['name']) for row in table)
+
+
+def test_snapshot_keeps_reading_the_version_it_pinned(engine, run):
+    storage = engine.storage_manager
+    run("CREATE TABLE items (id INT PRIMARY KEY, name VARCHAR(10))")
+    run("INSERT INTO items (id, name) VALUES (1, 'a'), (2, 'b'), (3, 'c');")
+    run("CREATE INDEX name_idx ON items (name)")
+    before = [(1, 'a'), (2, 'b'), (3, 'c')]
+
+    with storage.snapshot(['items']):
+        pinned = storage.get_table_data('items')
+        results = write_in_another_thread(
+            run,
+            "UPDATE items SET name = 'z' WHERE id = 1;",
+            "DELETE FROM items WHERE id = 2;",
+            "INSERT INTO items (id, name) VALUES (4, 'd');")
+        assert results == ['Updated 1 rows in items.', 'Deleted 1 rows from items.', 'Data inserted successfully.']
+        assert storage.get_table_data('items') is pinned
+        assert rows(pinned) == before
+        assert rows(engine.dml_manager.select_with_index('items', 'name', 'b')) == [(2, 'b')]
+        assert engine.dml_manager.select_with_index('items', 'name', 'z') == []
+
+    after = [(1, 'z'), (3, 'c'), (4, 'd')]
+    assert rows(storage.get_table_data('items')) == rows(run("SELECT * FROM items")) == after
+    assert rows(engine.dml_manager.select_with_index('items', 'name', 'z')) == [(1, 'z')]
+    assert rows(pinned) == before  # The old version was copied, never changed in place
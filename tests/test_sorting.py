@@ -0,0 +1,60 @@
+# TEST_SORTING.py
+
+import random
+
+import pytest
+
+from sorting import distinct, external_sort, order_key, top_n
+
+
+def shuffled_rows(count, seed=7):
+    generator = random.Random(seed)
+    return [{'id': number, 'group': generator.randrange(20), 'score': generator.randrange(1000)} for number in range(count)]
+
+
+@pytest.mark.parametrize('limit', [0, 1, 5, 300, 5000])
+@pytest.mark.parametrize('reverse', [False, True])
+def test_top_n_matches_a_full_sort(limit, reverse):
+    rows = shuffled_rows(3000)
+    key = order_key(['group'])  # Many ties, which must keep their input order as sorted() does
+    assert top_n(rows, limit, key, reverse) == sorted(rows, key=key, reverse=reverse)[:limit]
+    presorted = sorted(rows, key=key)
+    assert top_n(presorted, limit, key, reverse) == sorted(presorted, key=key, reverse=reverse)[:limit]
+
+
+def test_order_by_with_limit_and_offset(engine, run):
+    run("CREATE TABLE scores (id INT PRIMARY KEY, grp INT, score INT)")
+    rows = shuffled_rows(400)
+    run("INSERT INTO scores (id, grp, score) VALUES "
+        + ", ".join(f"({row['id']}, {row['group']}, {row['score']})" for row in rows) + ";")
+    expected = [row['id'] for row in sorted(rows, key=lambda row: (-row['group'], row['score'], row['id']))]
+    result = run("SELECT id FROM scores ORDER BY grp DESC, score, id LIMIT 10 OFFSET 5")
+    assert [row['id'] for row in result] == expected[5:15]
+    assert [row['id'] for row in run("SELECT id FROM scores ORDER BY grp DESC, score, id LIMIT 5, 10")] == expected[5:15]
+
+
+@pytest.mark.parametrize('reverse', [False, True])
+def test_external_sort_matches_sorted_across_runs(tmp_path, reverse):
+    rows = shuffled_rows(2500)
+    key = order_key(['group'])
+    spilled = list(external_sort(rows, key, reverse, memory_rows=100, directory=str(tmp_path)))
+    assert spilled == sorted(rows, key=key, reverse=reverse)  # Stable, like sorted()
+    assert list(external_sort(rows, key, reverse, memory_rows=10000)) == spilled
+
+
+def test_distinct_past_its_memory_budget(tmp_path):
+    rows = [{'group': row['group'], 'even': row['score'] % 2} for row in shuffled_rows(2000)]
+    expected = {tuple(row.values()) for row in rows}
+    result = [tuple(row.values()) for row in distinct(rows, memory_rows=10, directory=str(tmp_path))]
+    assert len(result) == len(expected) and set(result) == expected
+
+
+def test_order_by_and_distinct_spill_to_disk(engine, run):
+    run("CREATE TABLE scores (id INT PRIMARY KEY, grp INT, score INT)")
+    rows = shuffled_rows(400)
+    run("INSERT INTO scores (id, grp, score) VALUES "
+        + ", ".join(f"({row['id']}, {row['group']}, {row['score']})" for row in rows) + ";")
+    in_memory = (run("SELECT * FROM scores ORDER BY score DESC, id"), run("SELECT DISTINCT grp FROM scores"))
+    engine.sort_memory_rows = 16
+    assert run("SELECT * FROM scores ORDER BY score DESC, id") == in_memory[0]
+    assert sorted(map(repr, run("SELECT DISTINCT grp FROM scores"))) == sorted(map(repr, in_memory[1]))
@@ -0,0 +1,39 @@
+# TEST_WAL.py
+
+import os
+
+import wal
+
+
+def test_failed_log_sync_rolls_the_change_back(engine, run, monkeypatch):
+    storage = engine.storage_manager
+    run("CREATE TABLE events (id INT, name VARCHAR(10))")
+    run("INSERT INTO events (id, name) VALUES (1, 'kept');")  # Durable, but not checkpointed yet
+
+    def failing_fsync(fd):
+        raise OSError("disk full")
+    monkeypatch.setattr(wal.os, 'fsync', failing_fsync)
+    result = run("INSERT INTO events (id, name) VALUES (2, 'lost');")
+    assert 'Failed to write data' in result
+    monkeypatch.undo()
+
+    assert run("SELECT * FROM events") == [{'id': 1, 'name': 'kept'}]
+    with open(os.path.join(storage.data_directory, 'events.csv')) as file:
+        assert 'lost' not in file.read()
+    assert storage.checkpoint() is None
+
+    run("INSERT INTO events (id, name) VALUES (3, 'after');")
+    assert [row['id'] for row in run("SELECT * FROM events")] == [1, 3]
+
+
+def test_replay_finds_moved_rows_by_primary_key(engine, run):
+    storage = engine.storage_manager
+    run("CREATE TABLE events (id INT PRIMARY KEY, name VARCHAR(10))")
+    run("INSERT INTO events (id, name) VALUES (1, 'a'), (2, 'b'), (3, 'c'), (4, 'd'), (5, 'e');")
+    records = [
+        {'lsn': 10 ** 6, 'table': 'events', 'op': 'delete', 'positions': [0, 1], 'keys': [[4], [2]]},
+        {'lsn': 10 ** 6 + 1, 'table': 'events', 'op': 'update', 'changes': [[0, [5], {'name': 'moved'}]]},
+    ]
+    with storage.lock:
+        storage.replay(records)
+    assert run("SELECT * FROM events") == [{'id': 1, 'name': 'a'}, {'id': 3, 'name': 'c'}, {'id': 5, 'name': 'moved'}]
@@ -0,0 +1,187 @@
+# WAL.py
+
+import json
+import os
+import threading
+import zlib
+
+
+class WriteAheadLog:
+    """
+    An append-only log of table changes, written before the changes are applied.
+
+    Each record is one line: a CRC32 of the JSON body, a space, then the JSON body.
+    A line whose checksum does not match (a write torn by a crash) ends the log.
+
+    Commits are fsynced in groups: the first writer to commit becomes the leader and
+    syncs everything appended so far, while writers that commit meanwhile wait and are
+    covered by that one fsync (or the next one).
+    """
+
+    def __init__(self, path, sync=True, group_commit_delay=0.0):
+        """
+        Args:
+            path (str): The log file.
+            sync (bool): fsync on commit; without it a commit only flushes to the OS.
+            group_commit_delay (float): Seconds a leader waits before syncing, letting
+                more concurrent commits join its group.
+        """
+        self.path = path
+        self.sync = sync
+        self.group_commit_delay = group_commit_delay
+        self.lock = threading.Lock()
+        self.synced = threading.Condition(self.lock)
+        self.next_lsn = 1
+        self.written_lsn = 0  # Last LSN handed to the file
+        self.durable_lsn = 0  # Last LSN known to be on disk
+        self.syncing = False
+        self.failed = None  # The error of a failed fsync; nothing commits until the log is truncated
+        self.abandoned = []  # (after, through) LSN ranges given up after a failed fsync
+        self.file = open(self.path, 'ab')
+
+    @staticmethod
+    def encode(record):
+        body = json.dumps(record, separators=(',', ':')).encode('utf-8')
+        return b'%08x %s\n' % (zlib.crc32(body), body)
+
+    def records(self):
+        """
+        Yield the complete records in the log, in order, and cut off a torn tail.
+
+        Also moves next_lsn past the last record found.
+        """
+        valid_size = 0
+        with open(self.path, 'rb') as file:
+            for line in file:
+                checksum, _, body = line.rstrip(b'\n').partition(b' ')
+                if not line.endswith(b'\n') or checksum != b'%08x' % zlib.crc32(body):
+                    break
+                record = json.loads(body)
+                self.next_lsn = max(self.next_lsn, record['lsn'] + 1)
+                valid_size += len(line)
+                yield record
+        if valid_size != os.path.getsize(self.path):
+            with open(self.path, 'r+b') as file:
+                file.truncate(valid_size)
+
+    def append(self, record):
+        """
+        Write a record to the log (not yet durable) and return its LSN.
+
+        Args:
+            record (dict): A JSON-serializable change record; its 'lsn' is set here.
+
+        Returns:
+            int: The record's log sequence number.
+        """
+        with self.lock:
+            lsn = record['lsn'] = self.next_lsn
+            self.file.write(self.encode(record))
+            self.next_lsn += 1
+            self.written_lsn = lsn
+            return lsn
+
+    def commit(self, lsn=None):
+        """
+        Block until the record with this LSN (by default the last one written), and
+        every record before it, is on disk.
+
+        Raises:
+            OSError: If an fsync failed. The records after durable_lsn may then be lost,
+                so every later commit fails too until the log is truncated, and so does
+                the commit of a record given up by abandon().
+        """
+        with self.lock:
+            if lsn is None:
+                lsn = self.written_lsn
+            elif any(after < lsn <= through for after, through in self.abandoned):
+                raise OSError("The record was rolled back after the log could not be synced")
+            while self.durable_lsn < lsn:
+                if self.failed is not None:
+                    raise OSError(f"The log could not be synced: {self.failed}")
+                if self.syncing:
+                    self.synced.wait()  # Another writer's fsync may cover this record
+                    continue
+                self.syncing = True
+                self.lock.release()
+                try:
+                    if self.group_commit_delay:
+                        threading.Event().wait(self.group_commit_delay)
+                    with self.lock:
+                        target = self.written_lsn
+                    self.file.flush()
+                    if self.sync:
+                        os.fsync(self.file.fileno())
+                except Exception as e:
+                    self.failed = e
+                    raise
+                finally:
+                    self.lock.acquire()
+                    self.syncing = False
+                    self.synced.notify_all()
+                self.durable_lsn = max(self.durable_lsn, target)
+
+    def abandon(self):
+        """Give up the records written after durable_lsn: their commits fail from now on."""
+        with self.lock:
+            if self.written_lsn > self.durable_lsn:
+                self.abandoned.append((self.durable_lsn, self.written_lsn))
+
+    def size(self):
+        return self.file.tell()
+
+    def truncate(self):
+        """Empty the log once its records are in the table files. LSNs keep counting up."""
+        with self.lock:
+            while self.syncing:
+                self.synced.wait()
+            self.file.close()
+            self.file = open(self.path, 'wb')
+            self.file.flush()
+            if self.sync:
+                os.fsync(self.file.fileno())
+            self.durable_lsn = self.written_lsn
+            self.failed = None
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+class CheckpointState:
+    """
+    The checkpoint file: for each table, the LSN of the last log record contained in
+    its CSV file. Replay skips records at or below it, so a table written out just
+    before a crash is not changed twice.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.tables = {}
+        self.lsn = 0
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as file:
+                    state = json.load(file)
+                self.tables = state.get('tables', {})
+                self.lsn = state.get('lsn', 0)
+            except (OSError, ValueError):
+                pass  # A torn checkpoint file; replay falls back on primary keys
+
+    def applied(self, table_name, lsn):
+        return lsn <= self.tables.get(table_name, 0)
+
+    def save(self, tables, lsn):
+        """Record that the given tables hold every change up to lsn, replacing the file atomically."""
+        for table_name in tables:
+            self.tables[table_name] = lsn
+        self.lsn = max(self.lsn, lsn)
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as file:
+            json.dump({'lsn': self.lsn, 'tables': self.tables}, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, self.path)
+
+    def forget(self, table_name):
+        self.tables.pop(table_name, None)